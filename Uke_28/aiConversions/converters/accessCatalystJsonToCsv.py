@@ -1,21 +1,25 @@
-import json
 import csv
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import find_artifact, read_rows
 
-# Input and output file paths
-INPUT_FILEPATH = "json/accesscatalyst_data.json"
+# Input and output file paths (the .jsonl form is used when that is what exists)
+INPUT_FILEPATH = find_artifact("json", "accesscatalyst_data.json") or "json/accesscatalyst_data.json"
 OUTPUT_FILEPATH = "csv/accesscatalyst_data.csv"
 
-# Load JSON data
-with open(INPUT_FILEPATH, 'r', encoding='utf-8') as f:
-    accesscatalyst_data = json.load(f)
+# Read JSON rows one at a time
+accesscatalyst_data = read_rows(INPUT_FILEPATH)
 
 # Extract keys for CSV header
-keys = accesscatalyst_data[0].keys()
+first = next(accesscatalyst_data)
+keys = first.keys()
 
 # Write to CSV
 with open(OUTPUT_FILEPATH, 'w', encoding='utf-8', newline='') as csvfile:
     writer = csv.DictWriter(csvfile, fieldnames=keys)
     writer.writeheader()
+    writer.writerow(first)
     writer.writerows(accesscatalyst_data)
 
 print(f"Data successfully converted to {OUTPUT_FILEPATH}")
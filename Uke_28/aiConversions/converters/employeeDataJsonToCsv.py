@@ -1,17 +1,21 @@
-import pandas as pd
-import json
+import csv
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import find_artifact, read_rows
 
-# Load JSON
-input_path = "json/employee_data_full.json"
+# Load JSON (or JSON Lines) rows one at a time
+input_path = find_artifact("json", "employee_data_full.json") or "json/employee_data_full.json"
 output_path = "csv/employee_data.csv"
 
-with open(input_path, "r", encoding="utf-8") as f:
-    employee_data = json.load(f)
+employee_data = read_rows(input_path)
+first = next(employee_data)
 
-# Convert to DataFrame
-employee_df = pd.DataFrame(employee_data)
-
-# Save to CSV
-employee_df.to_csv(output_path, index=False)
+# Save to CSV, streaming
+with open(output_path, "w", encoding="utf-8", newline="") as f:
+    writer = csv.DictWriter(f, fieldnames=list(first))
+    writer.writeheader()
+    writer.writerow(first)
+    writer.writerows(employee_data)
 
 print(f"✅ Employee data successfully converted to CSV and saved to '{output_path}'.")
@@ -1,22 +1,27 @@
-import pandas as pd
-import json
+import csv
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import find_artifact, read_rows
 
-# Load JSON
-input_path = "json/organization_data_with_gpt.json"
+# Load JSON (or JSON Lines) rows one at a time
+input_path = find_artifact("json", "organization_data_with_gpt.json") or "json/organization_data_with_gpt.json"
 output_path = "csv/organization_data_clean.csv"
 
-with open(input_path, "r", encoding="utf-8") as f:
-    org_data = json.load(f)
-
-# Ensure MOTHERORG is always int or None
-for org in org_data:
+# Ensure MOTHERORG is always int or None (written as an empty cell)
+def clean(org):
     if org.get("MOTHERORG") is not None:
         org["MOTHERORG"] = int(org["MOTHERORG"])
+    return org
 
-# Convert to DataFrame
-org_df = pd.DataFrame(org_data)
+org_data = map(clean, read_rows(input_path))
+first = next(org_data)
 
-# Save to CSV WITHOUT index
-org_df.to_csv(output_path, index=False, float_format='%.0f', na_rep='')
+# Save to CSV WITHOUT index, streaming
+with open(output_path, "w", encoding="utf-8", newline="") as f:
+    writer = csv.DictWriter(f, fieldnames=list(first))
+    writer.writeheader()
+    writer.writerow(first)
+    writer.writerows(org_data)
 
 print(f"✅ Organization data successfully cleaned and converted to CSV and saved to '{output_path}'.")
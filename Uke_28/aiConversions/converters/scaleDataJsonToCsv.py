@@ -1,17 +1,21 @@
-import pandas as pd
-import json
+import csv
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import find_artifact, read_rows
 
-# Load JSON
-input_path = "json/scale_data_full.json"
+# Load JSON (or JSON Lines) rows one at a time
+input_path = find_artifact("json", "scale_data_full.json") or "json/scale_data_full.json"
 output_path = "csv/scale_data.csv"
 
-with open(input_path, "r", encoding="utf-8") as f:
-    scale_data = json.load(f)
+scale_data = read_rows(input_path)
+first = next(scale_data)
 
-# Convert to DataFrame
-scale_df = pd.DataFrame(scale_data)
-
-# Save to CSV
-scale_df.to_csv(output_path, index=False)
+# Save to CSV, streaming
+with open(output_path, "w", encoding="utf-8", newline="") as f:
+    writer = csv.DictWriter(f, fieldnames=list(first))
+    writer.writeheader()
+    writer.writerow(first)
+    writer.writerows(scale_data)
 
 print(f"✅ Scale data successfully converted to CSV and saved to '{output_path}'.")
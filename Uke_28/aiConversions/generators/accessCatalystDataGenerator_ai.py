@@ -5,19 +5,30 @@ except Exception:
     pass  # Ignore if not supported
 
 import random
-import json
-import uuid
-from faker import Faker
-from datetime import datetime, timedelta
+from datetime import timedelta
 import os
-
-fake = Faker()
-
-def generate_accesscatalyst_for_employees(employees):
-    access_entries = []
-    access_id = 1
-
-    for emp in employees:
+from faker import Faker
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import artifact_path, artifact_filename, count_artifact_rows, read_rows, write_rows
+from utils.counter_rng import derive_key, row_seed
+from utils.runtime import random_uuid, run_seed, run_time
+from utils.sharding import sharded_rows
+
+def accesscatalyst_key(seed):
+    return derive_key(seed, "accesscatalyst")
+
+def iter_accesscatalyst_for_employees(employees, first_id=1, key=None, now=None):
+    # One entry per employee, yielded as it is built so the table is never held in memory.
+    # Every entry gets its own random.Random and Faker seed from (key, ACCESSCATALYST),
+    # so an entry is the same in any shard or slice (utils/counter_rng.py)
+    key = key if key is not None else accesscatalyst_key(run_seed())
+    now = now or run_time()
+    rng = random.Random()
+    fake = Faker()  # reseeded per row, so not the shared instance
+
+    for access_id, emp in enumerate(employees, first_id):
+        rng.seed(row_seed(key, access_id))
+        fake.seed_instance(row_seed(key, access_id, 1))
         employee_id = emp["EMPLOYEE"]
         first_name = emp["GIVENNAME"].lower()
         last_name = emp["SURNAME"].lower()
@@ -25,65 +36,86 @@ def generate_accesscatalyst_for_employees(employees):
         password = fake.password(length=12)
 
         # Random last logon: 70% chance
-        lastlogon = (datetime.now() - timedelta(days=random.randint(1, 730))).strftime("%Y-%m-%d %H:%M:%S") if random.random() < 0.7 else None
+        lastlogon = (now - timedelta(days=rng.randint(1, 730))).strftime("%Y-%m-%d %H:%M:%S") if rng.random() < 0.7 else None
 
         # Random modified date
-        modified_date = datetime.now() - timedelta(days=random.randint(0, 730))
+        modified_date = now - timedelta(days=rng.randint(0, 730))
 
         # Random created date (before modified)
-        created_date = modified_date - timedelta(days=random.randint(1, 365))
+        created_date = modified_date - timedelta(days=rng.randint(1, 365))
 
         # Random pwd change date (after created)
-        pwd_change_date = created_date + timedelta(days=random.randint(1, 180))
+        pwd_change_date = created_date + timedelta(days=rng.randint(1, 180))
 
         # Disabled account (10%)
-        disabled = 1 if random.random() < 0.1 else 0
+        disabled = 1 if rng.random() < 0.1 else 0
 
         # Random deactivated date if disabled
-        deactivated_on = (modified_date + timedelta(days=random.randint(1, 60))).strftime("%Y-%m-%d %H:%M:%S") if disabled else None
+        deactivated_on = (modified_date + timedelta(days=rng.randint(1, 60))).strftime("%Y-%m-%d %H:%M:%S") if disabled else None
 
         access_entry = {
             "ACCESSCATALYST": access_id,
-            "POLICY": random.randint(1, 5),
+            "POLICY": rng.randint(1, 5),
             "EMPLOYEE": employee_id,
             "USERNAME": username,
             "PASSWORD": password,
             "DESCRIPTION": fake.sentence(nb_words=6),
-            "FAILEDLOGON": random.randint(0, 5),
-            "SESSIONID": str(uuid.uuid4())[:20],
-            "ACCESSDISABLED": random.choice([0, 1]),
+            "FAILEDLOGON": rng.randint(0, 5),
+            "SESSIONID": str(random_uuid(rng))[:20],
+            "ACCESSDISABLED": rng.choice([0, 1]),
             "LASTLOGON": lastlogon,
-            "USERPROTECT": random.choice([0, 1]),
-            "LANGUAGE": random.randint(1, 10),
-            "DEFAULTDETAILS": random.choice([0, 1]),
+            "USERPROTECT": rng.choice([0, 1]),
+            "LANGUAGE": rng.randint(1, 10),
+            "DEFAULTDETAILS": rng.choice([0, 1]),
             "DN": f"CN={first_name}.{last_name},OU=Users,DC=example,DC=com",
             "ORGANIZATION": fake.company(),
-            "EDITOR": random.randint(1, 1000),
-            "DATEFORMAT": random.randint(1, 3),
+            "EDITOR": rng.randint(1, 1000),
+            "DATEFORMAT": rng.randint(1, 3),
             "PWDCHANGE": pwd_change_date.strftime("%Y-%m-%d %H:%M:%S"),
             "MODIFIED": modified_date.strftime("%Y-%m-%d %H:%M:%S"),
             "CREATED": created_date.strftime("%Y-%m-%d %H:%M:%S"),
-            "ISFIRSTTIMELOGON": random.choice([0, 1]),
+            "ISFIRSTTIMELOGON": rng.choice([0, 1]),
             "EMPLOYEE_ID": f"EMP-{employee_id}",
-            "KEYBASED_SSO_KEY": uuid.uuid4().hex,
+            "KEYBASED_SSO_KEY": random_uuid(rng).hex,
             "IMPORT_MODIFIED": fake.text(max_nb_chars=50),
-            "LOCKEDTIME": (modified_date + timedelta(days=random.randint(1, 30))).strftime("%Y-%m-%d %H:%M:%S") if random.random() < 0.2 else None,
-            "PRIMARY_PROFILE": random.randint(1, 100),
-            "PROFILE_ID": f"PROF-{random.randint(100, 999)}",
+            "LOCKEDTIME": (modified_date + timedelta(days=rng.randint(1, 30))).strftime("%Y-%m-%d %H:%M:%S") if rng.random() < 0.2 else None,
+            "PRIMARY_PROFILE": rng.randint(1, 100),
+            "PROFILE_ID": f"PROF-{rng.randint(100, 999)}",
             "SECRET_KEY": fake.lexify(text='??????????'),
-            "GUID": str(uuid.uuid4()),
+            "GUID": str(random_uuid(rng)),
             "DEACTIVATED_ON": deactivated_on,
-            "ACCOUNT_GUID": str(uuid.uuid4()),
-            "USED_INTEGRATION_IDS": ",".join([str(uuid.uuid4()) for _ in range(random.randint(1, 3))]),
-            "IS_DELETED": random.choice([0, 1]),
-            "IS_ANONYMIZED": random.choice([0, 1]),
+            "ACCOUNT_GUID": str(random_uuid(rng)),
+            "USED_INTEGRATION_IDS": ",".join([str(random_uuid(rng)) for _ in range(rng.randint(1, 3))]),
+            "IS_DELETED": rng.choice([0, 1]),
+            "IS_ANONYMIZED": rng.choice([0, 1]),
             "DISABLED": disabled
         }
 
-        access_entries.append(access_entry)
-        access_id += 1
+        yield access_entry
 
-    return access_entries
+def generate_accesscatalyst_for_employees(employees):
+    return list(iter_accesscatalyst_for_employees(employees))
+
+def iter_rows(seed, start, stop, as_of=None, **employee_context):
+    """Entries [start, stop) for `seed` (entry i belongs to employee row i), in O(stop - start).
+
+    The parent employees are recomputed with employee_row's generator instead
+    of being read from an artifact; `employee_context` is passed on to it.
+    """
+    from generators.employeeAiDataGenerator import iter_rows as iter_employee_rows
+    employees = iter_employee_rows(seed, start, stop, as_of=as_of, **employee_context)
+    return iter_accesscatalyst_for_employees(employees, max(0, start) + 1, accesscatalyst_key(seed), as_of)
+
+def accesscatalyst_row(seed, i, as_of=None, **employee_context):
+    for row in iter_rows(seed, i, i + 1, as_of, **employee_context):
+        return row
+    raise IndexError(f"accesscatalyst row {i} out of range")
+
+# Worker for utils/sharding.py: entries for employee rows [shard.start, shard.stop),
+# ACCESSCATALYST IDs following the row number
+def accesscatalyst_shard(shard):
+    employees = read_rows(shard.args["employee_path"], shard.start, shard.stop)
+    return iter_accesscatalyst_for_employees(employees, shard.start + 1, shard.key, shard.as_of)
 
 def is_dry_run():
     return "--dry-run" in sys.argv
@@ -94,14 +126,20 @@ def get_output_dir():
             return arg
     return "."
 
-# Load employees
-with open(os.path.join('data', 'output', 'latest', 'employee_data_full.json'), "r") as f:
-    employee_data = json.load(f)
+# Generate and save. Returns (rows, stats); rows is None because employees are
+# read and entries written one at a time.
+def generate(output_dir, dry_run=False, rows=None):
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Employees produced upstream in this run, one entry each
+    employee_path = artifact_path(output_dir, 'employee_data_full.json')
+    entries = sharded_rows("accesscatalyst", count_artifact_rows(employee_path), accesscatalyst_shard,
+                           {"employee_path": employee_path}, output_dir)
 
-accesscatalyst_data = generate_accesscatalyst_for_employees(employee_data)
+    output_path = os.path.join(output_dir, artifact_filename("accesscatalyst_data.json"))
+    count = write_rows(output_path, entries)
+    print(f"✅ Generated {count} ACCESSCATALYST entries and saved to '{output_path}'")
+    return None, {"rows": count, "output": output_path}
 
-output_dir = get_output_dir()
-os.makedirs(output_dir, exist_ok=True)
-with open(os.path.join(output_dir, "accesscatalyst_data.json"), "w") as f:
-    json.dump(accesscatalyst_data, f, indent=2)
-print(f"✅ Generated {len(accesscatalyst_data)} ACCESSCATALYST entries and saved to '{os.path.join(output_dir, 'accesscatalyst_data.json')}'")
+if __name__ == "__main__":
+    generate(get_output_dir(), dry_run=is_dry_run())
@@ -1,24 +1,22 @@
-import sqlalchemy
-from sqlalchemy import create_engine, MetaData, Table, select
 from faker import Faker
 import random
 import sys
+import json
 import os
-import pyodbc
 from datetime import datetime, date, timedelta
-from openai import AzureOpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.llm_client import chat, get_usage
+from utils.token_budget import BudgetExhausted
+from utils.value_pools import ValuePools, DEFAULT_POOL_SIZE, DEFAULT_DIVERSITY
+from utils.scale import SCALE_ENV, SCALE_FACTOR_ENV, resolve_scale
+from utils.db_backend import DB_BACKEND_ENV, DB_PATH_ENV, get_db_backend
 
 fake = Faker()
 
-def get_sql_server_engine():
-    # Bruk samme connection string som i load_generated_data.py
-    conn_str = (
-        "DRIVER={ODBC Driver 17 for SQL Server};"
-        "SERVER=DESKTOP-R9S4CFK;"
-        "DATABASE=sql_alchemy_test;"
-        "UID=sa;PWD=(catalystone123);"
-    )
-    return pyodbc.connect(conn_str)
+def get_backend():
+    # Databasen fra --db-backend/--db-path eller DB_BACKEND/DB_PATH (se utils/db_backend.py);
+    # på SQL Server brukes databasen sql_alchemy_test
+    return get_db_backend("sql_alchemy_test")
 
 def read_Database_table(table_name, db_connection):
     cursor = db_connection.cursor()
@@ -33,17 +31,7 @@ def rule_engine(field_name, field_type, description, settings, is_custom):
         return "use_ai"
     return "use_faker"
 
-def get_azure_openai_client(api_key_path):
-    with open(api_key_path, "r") as f:
-        api_key = f.read().strip()
-    client = AzureOpenAI(
-        api_key=api_key,
-        api_version="2025-01-01-preview",
-        azure_endpoint="https://azureopenai-sin-dev.openai.azure.com"
-    )
-    return client
-
-def generate_data_with_ai(client, field_name, field_type, description, settings, is_custom, max_length=None):
+def generate_data_with_ai(field_name, field_type, description, settings, is_custom, max_length=None):
     # Strengere prompt for å få korte, enkle verdier
     prompt = (
         f"Generate a realistic, short, single value for the field '{field_name}' of type '{field_type}'. "
@@ -52,26 +40,60 @@ def generate_data_with_ai(client, field_name, field_type, description, settings,
         f"No quotes, no markdown, no extra text."
     )
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You generate realistic fake test data. Only output the value, never an explanation or code block."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500
+        ai_value = chat(
+            prompt,
+            max_tokens=500,
+            temperature=1.0,
+            system="You generate realistic fake test data. Only output the value, never an explanation or code block."
         )
-        if response and hasattr(response, 'choices') and response.choices and hasattr(response.choices[0], 'message') and hasattr(response.choices[0].message, 'content'):
-            ai_value = response.choices[0].message.content.strip()
+        if ai_value:
             if max_length and isinstance(ai_value, str):
                 ai_value = ai_value[:max_length]
             return ai_value
         else:
             print(f"[WARNING] Tomt eller ugyldig AI-svar for {field_name}. Bruker fallback-verdi.")
             return "AI"
+    except BudgetExhausted:
+        # Tokenbudsjettet er brukt opp; resten av AI-feltene fylles med Faker
+        return generate_data_with_faker(field_name, field_type, description, settings, is_custom)
     except Exception as e:
         print(f"[ERROR] AI-generering feilet for {field_name}: {e}. Bruker fallback-verdi.")
         return "AI"
 
+def generate_value_pool(table_name, field_name, field_type, max_length, size, attempts=3):
+    # Én AI-forespørsel per kolonne i stedet for per celle; mangler fylles på med nye forespørsler
+    values = []
+    for _ in range(attempts):
+        missing = size - len(values)
+        if missing <= 0:
+            break
+        prompt = (
+            f"Generate {missing} distinct, realistic, short values for the column '{field_name}' "
+            f"of type '{field_type}' in the table '{table_name}'. "
+            f"Each value must fit within the max length {max_length if max_length else ''}. "
+            f"Return only a JSON array of strings, no explanation, no markdown."
+        )
+        try:
+            reply = chat(
+                prompt,
+                max_tokens=min(4000, 50 + missing * max(10, (max_length or 40) // 2)),
+                temperature=1.0,
+                system="You generate realistic fake test data. Only output the requested JSON, never an explanation."
+            )
+            start, end = reply.find("["), reply.rfind("]")
+            batch = json.loads(reply[start:end + 1]) if 0 <= start < end else []
+        except Exception as e:
+            print(f"[ERROR] AI-generering av verdipool feilet for {table_name}.{field_name}: {e}")
+            break
+        for value in batch if isinstance(batch, list) else []:
+            if isinstance(value, (str, int, float)) and str(value).strip():
+                value = str(value).strip()[:max_length] if max_length else str(value).strip()
+                if value not in values:
+                    values.append(value)
+    if len(values) < size:
+        print(f"[WARNING] Verdipool for {table_name}.{field_name} har {len(values)} av {size} verdier.")
+    return values[:size]
+
 def generate_data_with_faker(field_name, field_type, description, settings, is_custom):
     # Enkel mapping for noen vanlige felttyper
     if "name" in field_name.lower():
@@ -99,13 +121,20 @@ def generate_data_with_faker(field_name, field_type, description, settings, is_c
     # Fallback
     return fake.word()
 
-def generate_data(client, field_name, field_type, description, settings, is_custom, max_length=None):
+def generate_data(field_name, field_type, description, settings, is_custom, max_length=None, table_name=None, pools=None):
     # Tving int-felter til å alltid få int, uansett navn
     if field_type.lower() in ["int", "bigint", "smallint", "tinyint"]:
         return random.randint(1, 1000)
     rule = rule_engine(field_name, field_type, description, settings, is_custom)
+    if rule == "use_ai" and pools is not None:
+        # Trekk fra kolonnens verdipool; Faker hvis poolen ikke kunne bygges
+        value = pools.sample(table_name, field_name, field_type, max_length,
+                             lambda size: generate_value_pool(table_name, field_name, field_type, max_length, size))
+        if value is not None:
+            return value
+        return generate_data_with_faker(field_name, field_type, description, settings, is_custom)
     if rule == "use_ai":
-        return generate_data_with_ai(client, field_name, field_type, description, settings, is_custom, max_length)
+        return generate_data_with_ai(field_name, field_type, description, settings, is_custom, max_length)
     elif rule == "use_faker":
         return generate_data_with_faker(field_name, field_type, description, settings, is_custom)
     else:
@@ -123,27 +152,13 @@ def write_to_database(table_name, data, db_connection):
         cursor.execute(f"INSERT INTO {table_name} ({col_list}) VALUES ({placeholders})", values)
     db_connection.commit()
 
-def get_all_table_names(db_connection):
-    cursor = db_connection.cursor()
-    cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE='BASE TABLE'")
-    return [row[0] for row in cursor.fetchall()]
+def get_all_table_names(backend, db_connection):
+    return backend.table_names(db_connection)
 
-def get_foreign_key_dependencies(db_connection):
-    cursor = db_connection.cursor()
-    cursor.execute('''
-        SELECT
-            fk_tab.TABLE_NAME AS FK_TABLE,
-            pk_tab.TABLE_NAME AS PK_TABLE
-        FROM
-            INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS ref
-            JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS fk_tab ON ref.CONSTRAINT_NAME = fk_tab.CONSTRAINT_NAME
-            JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS pk_tab ON ref.UNIQUE_CONSTRAINT_NAME = pk_tab.CONSTRAINT_NAME
-        WHERE
-            fk_tab.CONSTRAINT_TYPE = 'FOREIGN KEY'
-    ''')
+def get_foreign_key_dependencies(backend, db_connection):
     deps = {}
-    for fk_table, pk_table in cursor.fetchall():
-        deps.setdefault(fk_table, set()).add(pk_table)
+    for fk in backend.foreign_keys(db_connection):
+        deps.setdefault(fk["table"], set()).add(fk["parent_table"])
     return deps
 
 def debug_print_dependencies(dependencies):
@@ -174,50 +189,29 @@ def topological_sort_tables(table_names, dependencies):
         raise Exception("Cyclic dependency detected in table hierarchy!")
     return sorted_tables
 
-def get_foreign_key_columns(db_connection, table_name):
-    cursor = db_connection.cursor()
-    cursor.execute('''
-        SELECT kcu.COLUMN_NAME
-        FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
-        JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
-          ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME
-        WHERE tc.TABLE_NAME = ? AND tc.CONSTRAINT_TYPE = 'FOREIGN KEY'
-    ''', (table_name,))
-    return [row[0] for row in cursor.fetchall()]
+def get_foreign_key_columns(backend, db_connection, table_name):
+    return [fk["column"] for fk in backend.foreign_keys(db_connection) if fk["table"] == table_name]
 
-def get_identity_columns(db_connection, table_name):
-    cursor = db_connection.cursor()
-    cursor.execute('''
-        SELECT COLUMN_NAME
-        FROM INFORMATION_SCHEMA.COLUMNS
-        WHERE TABLE_NAME = ? AND COLUMNPROPERTY(object_id(TABLE_SCHEMA + '.' + TABLE_NAME), COLUMN_NAME, 'IsIdentity') = 1
-    ''', (table_name,))
-    return [row[0] for row in cursor.fetchall()]
+def get_identity_columns(backend, db_connection, table_name):
+    return [col["name"] for col in backend.columns(db_connection, table_name) if col["identity"]]
 
-def get_parent_table_and_pk(db_connection, table_name, fk_col):
-    cursor = db_connection.cursor()
-    cursor.execute('''
-        SELECT pk.TABLE_NAME, pkc.COLUMN_NAME
-        FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc
-        JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE fk ON rc.CONSTRAINT_NAME = fk.CONSTRAINT_NAME
-        JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE pkc ON rc.UNIQUE_CONSTRAINT_NAME = pkc.CONSTRAINT_NAME
-        JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS pk ON pkc.CONSTRAINT_NAME = pk.CONSTRAINT_NAME
-        WHERE fk.TABLE_NAME = ? AND fk.COLUMN_NAME = ?
-    ''', (table_name, fk_col))
-    row = cursor.fetchone()
-    if row:
-        return row[0], row[1]
+def get_parent_table_and_pk(backend, db_connection, table_name, fk_col):
+    for fk in backend.foreign_keys(db_connection):
+        if fk["table"] == table_name and fk["column"] == fk_col:
+            return fk["parent_table"], fk["parent_column"]
     return None, None
 
 def get_first_pk_value(db_connection, table_name, pk_col):
     cursor = db_connection.cursor()
-    cursor.execute(f"SELECT TOP 1 {pk_col} FROM {table_name}")
+    cursor.execute(f"SELECT {pk_col} FROM {table_name}")
     result = cursor.fetchone()
     return result[0] if result else None
 
-def write_to_database_with_fk_handling(table_name, data, db_connection):
-    fk_cols = get_foreign_key_columns(db_connection, table_name)
-    id_cols = get_identity_columns(db_connection, table_name)
+def write_to_database_with_fk_handling(backend, table_name, data, db_connection):
+    fk_cols = get_foreign_key_columns(backend, db_connection, table_name)
+    id_cols = get_identity_columns(backend, db_connection, table_name)
+    # Kolonneinfo fra katalogen: {navn: {type, nullable, ...}} i kolonnerekkefølge
+    col_info = {col["name"]: col for col in backend.columns(db_connection, table_name)}
     cursor = db_connection.cursor()
     if not data:
         return
@@ -230,10 +224,8 @@ def write_to_database_with_fk_handling(table_name, data, db_connection):
     fk_nullable = {}
     for fk in fk_cols:
         # Sjekk om kolonnen er nullable
-        cursor.execute('''SELECT IS_NULLABLE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ? AND COLUMN_NAME = ?''', (table_name, fk))
-        is_nullable = cursor.fetchone()
-        fk_nullable[fk] = (is_nullable and is_nullable[0] == 'YES')
-        parent_table, parent_pk = get_parent_table_and_pk(db_connection, table_name, fk)
+        fk_nullable[fk] = fk in col_info and col_info[fk]["nullable"]
+        parent_table, parent_pk = get_parent_table_and_pk(backend, db_connection, table_name, fk)
         if parent_table and parent_pk:
             cursor.execute(f"SELECT {parent_pk} FROM {parent_table}")
             fk_parent_ids[fk] = [row[0] for row in cursor.fetchall()]
@@ -251,9 +243,7 @@ def write_to_database_with_fk_handling(table_name, data, db_connection):
                     row_insert[fk] = parent_ids[idx % len(parent_ids)]
                 else:
                     # Hent datatype for FK
-                    cursor.execute('''SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ? AND COLUMN_NAME = ?''', (table_name, fk))
-                    fk_type_row = cursor.fetchone()
-                    fk_type = fk_type_row[0] if fk_type_row else None
+                    fk_type = col_info[fk]["type"] if fk in col_info else None
                     if fk_type and fk_type.lower() in ["int", "bigint", "smallint", "tinyint"]:
                         row_insert[fk] = random.randint(1, 1000000)
                     elif fk_type and fk_type.lower() in ["uniqueidentifier"]:
@@ -268,24 +258,19 @@ def write_to_database_with_fk_handling(table_name, data, db_connection):
     for fk in fk_cols:
         if not fk_nullable.get(fk, True):
             continue  # Hopp over NOT NULL-FK, de er allerede satt
-        parent_table, parent_pk = get_parent_table_and_pk(db_connection, table_name, fk)
+        parent_table, parent_pk = get_parent_table_and_pk(backend, db_connection, table_name, fk)
         if parent_table and parent_pk:
             cursor.execute(f"SELECT {parent_pk} FROM {parent_table}")
             parent_ids = [row[0] for row in cursor.fetchall()]
             if parent_ids:
-                cursor.execute(f"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ?", (table_name,))
-                all_cols = [r[0] for r in cursor.fetchall()]
-                cursor.execute(f"SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ?", (table_name,))
-                all_col_types = {r[0]: r[1] for r in cursor.fetchall()}
-                cursor.execute(f"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE WHERE TABLE_NAME = ? AND OBJECTPROPERTY(OBJECT_ID(CONSTRAINT_SCHEMA + '.' + CONSTRAINT_NAME), 'IsPrimaryKey') = 1", (table_name,))
-                pk_cols = [r[0] for r in cursor.fetchall()]
+                all_cols = list(col_info)
+                all_col_types = {name: col["type"] for name, col in col_info.items()}
+                pk_cols = backend.primary_key(db_connection, table_name)
                 pk_col_types = {col: all_col_types.get(col, None) for col in pk_cols}
-                pk_col_indices = [all_cols.index(pk_col) + 2 for pk_col in pk_cols]  # +2 pga rn og 0-indeksering
+                pk_col_indices = [all_cols.index(pk_col) + 1 for pk_col in pk_cols]  # +1 pga rn først i raden
                 cursor.execute(f"SELECT ROW_NUMBER() OVER (ORDER BY (SELECT 1)) AS rn, * FROM {table_name}")
                 rows = cursor.fetchall()
-                cursor.execute('''SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ? AND COLUMN_NAME = ?''', (table_name, fk))
-                fk_type_row = cursor.fetchone()
-                fk_type = fk_type_row[0] if fk_type_row else None
+                fk_type = all_col_types.get(fk)
                 def convert_pk_val(val):
                     if fk_type is None:
                         return val
@@ -337,95 +322,19 @@ def write_to_database_with_fk_handling(table_name, data, db_connection):
     db_connection.commit()
     print(f"[INFO] To-pass FK-oppdatering kjørt for {table_name}.")
 
-def get_table_columns_and_types(db_connection, table_name):
-    cursor = db_connection.cursor()
-    cursor.execute('''
-        SELECT COLUMN_NAME, DATA_TYPE
-        FROM INFORMATION_SCHEMA.COLUMNS
-        WHERE TABLE_NAME = ?
-    ''', (table_name,))
-    return [(row[0], row[1]) for row in cursor.fetchall()]
+def get_table_columns_and_types(backend, db_connection, table_name):
+    return [(col["name"], col["type"]) for col in backend.columns(db_connection, table_name)]
 
-def set_all_foreign_keys_nullable(db_connection):
-    cursor = db_connection.cursor()
-    # Finn alle FK-felter med datatype
-    cursor.execute('''
-        SELECT 
-            OBJECT_NAME(fk_col.object_id) AS TableName,
-            fk_col.name AS ColumnName,
-            typ.name AS DataType,
-            fk_col.max_length
-        FROM sys.foreign_key_columns fkc
-        JOIN sys.columns fk_col ON fkc.parent_object_id = fk_col.object_id AND fkc.parent_column_id = fk_col.column_id
-        JOIN sys.types typ ON fk_col.user_type_id = typ.user_type_id
-    ''')
-    for table, col, dtype, maxlen in cursor.fetchall():
-        # Bygg riktig ALTER TABLE-setning for datatype
-        if dtype.lower() in ["varchar", "nvarchar", "char"]:
-            type_str = f"{dtype}({int(maxlen) // 2 if dtype.lower() == 'nvarchar' else int(maxlen)})"
-        elif dtype.lower() in ["decimal", "numeric"]:
-            cursor2 = db_connection.cursor()
-            cursor2.execute('''SELECT precision, scale FROM sys.columns WHERE object_id = OBJECT_ID(?) AND name = ?''', (table, col))
-            pres, scale = cursor2.fetchone()
-            type_str = f"{dtype}({pres},{scale})"
-        else:
-            type_str = dtype
-        sql = f"ALTER TABLE {table} ALTER COLUMN {col} {type_str} NULL"
-        try:
-            cursor.execute(sql)
-            print(f"[INFO] FK-kolonne satt til NULL: {table}.{col} ({type_str})")
-        except Exception as e:
-            print(f"[WARNING] Klarte ikke sette {table}.{col} til NULL: {e}")
-    db_connection.commit()
+def set_all_foreign_keys_nullable(backend, db_connection):
+    backend.set_foreign_keys_nullable(db_connection, True)
 
-def set_all_foreign_keys_not_null(db_connection):
-    cursor = db_connection.cursor()
-    # Finn alle FK-felter med datatype
-    cursor.execute('''
-        SELECT 
-            OBJECT_NAME(fk_col.object_id) AS TableName,
-            fk_col.name AS ColumnName,
-            typ.name AS DataType,
-            fk_col.max_length
-        FROM sys.foreign_key_columns fkc
-        JOIN sys.columns fk_col ON fkc.parent_object_id = fk_col.object_id AND fkc.parent_column_id = fk_col.column_id
-        JOIN sys.types typ ON fk_col.user_type_id = typ.user_type_id
-    ''')
-    for table, col, dtype, maxlen in cursor.fetchall():
-        # Bygg riktig ALTER TABLE-setning for datatype
-        if dtype.lower() in ["varchar", "nvarchar", "char"]:
-            type_str = f"{dtype}({int(maxlen) // 2 if dtype.lower() == 'nvarchar' else int(maxlen)})"
-        elif dtype.lower() in ["decimal", "numeric"]:
-            cursor2 = db_connection.cursor()
-            cursor2.execute('''SELECT precision, scale FROM sys.columns WHERE object_id = OBJECT_ID(?) AND name = ?''', (table, col))
-            pres, scale = cursor2.fetchone()
-            type_str = f"{dtype}({pres},{scale})"
-        else:
-            type_str = dtype
-        sql = f"ALTER TABLE {table} ALTER COLUMN {col} {type_str} NOT NULL"
-        try:
-            cursor.execute(sql)
-            print(f"[INFO] FK-kolonne satt til NOT NULL: {table}.{col} ({type_str})")
-        except Exception as e:
-            print(f"[WARNING] Klarte ikke sette {table}.{col} til NOT NULL: {e}")
-    db_connection.commit()
+def set_all_foreign_keys_not_null(backend, db_connection):
+    backend.set_foreign_keys_nullable(db_connection, False)
 
-def get_unique_columns(db_connection, table_name):
-    cursor = db_connection.cursor()
-    # Hent PK-kolonner
-    cursor.execute('''
-        SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE 
-        WHERE TABLE_NAME = ? AND OBJECTPROPERTY(OBJECT_ID(CONSTRAINT_SCHEMA + '.' + CONSTRAINT_NAME), 'IsPrimaryKey') = 1
-    ''', (table_name,))
-    pk_cols = [r[0] for r in cursor.fetchall()]
-    # Hent UNIQUE-kolonner
-    cursor.execute('''
-        SELECT kcu.COLUMN_NAME
-        FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
-        JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME
-        WHERE tc.TABLE_NAME = ? AND tc.CONSTRAINT_TYPE = 'UNIQUE'
-    ''', (table_name,))
-    unique_cols = [r[0] for r in cursor.fetchall()]
+def get_unique_columns(backend, db_connection, table_name):
+    # PK- og UNIQUE-kolonner
+    pk_cols = backend.primary_key(db_connection, table_name)
+    unique_cols = backend.unique_columns(db_connection, table_name)
     return list(set(pk_cols + unique_cols))
 
 def generate_unique_value(table_name, col, typ, i, unique_counters):
@@ -464,20 +373,40 @@ def get_next_pk_start(db_connection, table_name, pk_col):
     except Exception:
         return 1
 
-def get_column_max_lengths(db_connection, table_name):
-    cursor = db_connection.cursor()
-    cursor.execute('''
-        SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH
-        FROM INFORMATION_SCHEMA.COLUMNS
-        WHERE TABLE_NAME = ?
-    ''', (table_name,))
-    return {row[0]: row[2] for row in cursor.fetchall() if row[1].lower() in ["varchar", "nvarchar", "char"]}
+def get_column_max_lengths(backend, db_connection, table_name):
+    return {col["name"]: col["max_length"] for col in backend.columns(db_connection, table_name)
+            if col["type"].lower() in ["varchar", "nvarchar", "char"]}
+
+def get_arg_value(flag, default=None):
+    if flag in sys.argv:
+        idx = sys.argv.index(flag)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
 
 def main():
-    conn = get_sql_server_engine()
-    set_all_foreign_keys_nullable(conn)
-    table_names = get_all_table_names(conn)
-    dependencies = get_foreign_key_dependencies(conn)
+    # --rows N rader per tabell (standard fra --scale/--scale-factor, se utils/scale.py),
+    # --pool-size/--diversity for AI-verdipooler, --refresh-pools bygger poolene på nytt,
+    # --no-pools gir én AI-forespørsel per celle
+    scale = resolve_scale(get_arg_value("--scale", os.environ.get(SCALE_ENV)),
+                          get_arg_value("--scale-factor", os.environ.get(SCALE_FACTOR_ENV)))
+    num_rows = int(get_arg_value("--rows", scale["auto_rows"]))
+    pools = None
+    if "--no-pools" not in sys.argv:
+        pools = ValuePools(pool_size=int(get_arg_value("--pool-size", DEFAULT_POOL_SIZE)),
+                           diversity=float(get_arg_value("--diversity", DEFAULT_DIVERSITY)),
+                           refresh="--refresh-pools" in sys.argv)
+    if get_arg_value("--db-backend"):
+        os.environ[DB_BACKEND_ENV] = get_arg_value("--db-backend")
+    if get_arg_value("--db-path"):
+        os.environ[DB_PATH_ENV] = get_arg_value("--db-path")
+    backend = get_backend()
+    conn = backend.connect()
+    if "--create-schema" in sys.argv:
+        backend.create_schema(conn)
+    set_all_foreign_keys_nullable(backend, conn)
+    table_names = get_all_table_names(backend, conn)
+    dependencies = get_foreign_key_dependencies(backend, conn)
     debug_print_dependencies(dependencies)
     try:
         sorted_tables = topological_sort_tables(table_names, dependencies)
@@ -488,16 +417,13 @@ def main():
     description = ""
     settings = {}
     is_custom = False
-    client = get_azure_openai_client("C:/Users/FredrikVillo/repos/TestDataGeneration/api_key.txt")
     for table_name in sorted_tables:
         print(f"Genererer data for tabell: {table_name}")
-        col_types = get_table_columns_and_types(conn, table_name)
+        col_types = get_table_columns_and_types(backend, conn, table_name)
         columns = [col for col, _ in col_types]
-        unique_cols = get_unique_columns(conn, table_name)
+        unique_cols = get_unique_columns(backend, conn, table_name)
         # Finn PK-kolonner og deres typer
-        cursor = conn.cursor()
-        cursor.execute('''SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE WHERE TABLE_NAME = ? AND OBJECTPROPERTY(OBJECT_ID(CONSTRAINT_SCHEMA + '.' + CONSTRAINT_NAME), 'IsPrimaryKey') = 1''', (table_name,))
-        pk_cols = [r[0] for r in cursor.fetchall()]
+        pk_cols = backend.primary_key(conn, table_name)
         pk_types = [typ for col, typ in col_types if col in pk_cols]
         data = []
         unique_counters = {}
@@ -507,8 +433,8 @@ def main():
             if typ.lower() in ["int", "bigint", "smallint", "tinyint"]:
                 pk_start[col] = get_next_pk_start(conn, table_name, col)
         # Hent max_length for alle kolonner i tabellen
-        col_max_lengths = get_column_max_lengths(conn, table_name)
-        for i in range(2):
+        col_max_lengths = get_column_max_lengths(backend, conn, table_name)
+        for i in range(num_rows):
             row = {}
             # Hvis composite PK, generer unik kombinasjon
             if len(pk_cols) > 1:
@@ -532,17 +458,20 @@ def main():
                         row[col] = random.randint(1, 1000)
                     elif typ.lower() in ["varchar", "nvarchar", "char"]:
                         maxlen = col_max_lengths.get(col)
-                        val = generate_data(client, col, typ, description, settings, is_custom, max_length=maxlen)
+                        val = generate_data(col, typ, description, settings, is_custom, max_length=maxlen,
+                                            table_name=table_name, pools=pools)
                         if maxlen and isinstance(val, str):
                             val = val[:maxlen]
                         row[col] = val
                     else:
-                        row[col] = generate_data(client, col, typ, description, settings, is_custom)
+                        row[col] = generate_data(col, typ, description, settings, is_custom,
+                                                 table_name=table_name, pools=pools)
             data.append(row)
-        write_to_database_with_fk_handling(table_name, data, conn)
+        write_to_database_with_fk_handling(backend, table_name, data, conn)
         print(f"✅ Genererte og skrev {len(data)} rader til {table_name}")
-    set_all_foreign_keys_not_null(conn)
+    set_all_foreign_keys_not_null(backend, conn)
     conn.close()
+    print(f"AI usage: {json.dumps(get_usage())}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
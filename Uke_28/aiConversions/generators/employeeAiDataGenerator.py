@@ -1,31 +1,30 @@
-import random
-import json
-from faker import Faker
-from datetime import datetime, timedelta
-from openai import AzureOpenAI
+import re
+import string
+from datetime import timedelta
 import sys
 import os
+from itertools import repeat
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import artifact_path, artifact_filename, read_rows, write_rows
+from faker import Faker
+from utils.runtime import get_faker, run_seed, run_time
+from utils.counter_rng import CounterRNG, derive_key
+from utils.columnar import (TEXT_POOL_SIZE, TextPools, years_before, random_dates, date_strings, days,
+                            random_strings, uuid4_strings, rows_from_columns)
+from utils.llm_client import chat, chat_batch, estimate_chat_batch, backend_for, use_backend
+from utils.scale import scale_rows
+from utils.sharding import sharded_rows, in_batches
 
 try:
     sys.stdout.reconfigure(encoding='utf-8')
 except Exception:
     pass  # Ignore if not supported
 
-fake = Faker()
-
-# Optional: AI client for richer fields
-api_key_path = "C:/Users/FredrikVillo/repos/TestDataGeneration/api_key.txt"
-with open(api_key_path, "r") as f:
-    api_key = f.read().strip()
-
-client = AzureOpenAI(
-    api_key=api_key,
-    api_version="2025-01-01-preview",
-    azure_endpoint="https://azureopenai-sin-dev.openai.azure.com"
-)
+fake = get_faker()
 
-# Define SCALE references (matching real SCALE IDs)
-scale_title_ids = [1001, 1002, 1003, 1004, 1005]
+# Define SCALE references (matching real SCALE IDs). Titles follow the
+# scale profile's title count, see scale_title_ids()
 scale_gender_ids = [2001, 2002]
 scale_position_level_ids = [3001, 3002, 3003, 3004]
 scale_employeetype_ids = [4001, 4002, 4003]
@@ -33,19 +32,34 @@ marital_status_ids = [5001, 5002]  # Correct SCALE IDs
 nationality_ids = [6001, 6002, 6003]  # Correct SCALE IDs
 country_ids = [7001, 7002, 7003]  # Correct SCALE IDs
 
+# Title SCALE IDs written by scaleAiDataGenerator.py (1001, 1002, ...)
+def scale_title_ids():
+    return [1000 + i for i in range(1, scale_rows("scale_titles") + 1)]
+
 # Function to optionally enrich fields using AI
+CAREER_TOPIC_PROMPT = "Suggest a realistic career planning discussion topic for an employee."
+
 def generate_career_topic():
-    if is_dry_run():
-        return fake.job()
-    
-    prompt = "Suggest a realistic career planning discussion topic for an employee."
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=50,
-        temperature=0.7
-    )
-    return response.choices[0].message.content.strip()
+    return chat(CAREER_TOPIC_PROMPT, max_tokens=50, temperature=0.7)
+
+# Batch mode: one JSON request per LLM_BATCH_SIZE employees, keyed by job title
+CAREER_TOPIC_TASK = (
+    "Each input is an employee's job title. For each, suggest a realistic career planning "
+    "discussion topic for that employee in a few words."
+)
+
+# Without AI (token budget spent): a Faker phrase for the job title
+def offline_career_topic(job_title):
+    return f"{fake.catch_phrase()} as {job_title}"
+
+def generate_career_topics(job_titles):
+    return chat_batch(CAREER_TOPIC_TASK, job_titles, fallback=lambda _: generate_career_topic(), tokens_per_item=20,
+                      offline=offline_career_topic)
+
+# Pre-flight AI usage for main.py --token-budget
+def estimate_ai_usage(rows=None):
+    return estimate_chat_batch(CAREER_TOPIC_TASK, rows or scale_rows("employees"), "Senior Software Engineer", tokens_per_item=20,
+                               fallback_prompt=CAREER_TOPIC_PROMPT, fallback_max_tokens=50)
 
 def is_dry_run():
     return "--dry-run" in sys.argv
@@ -56,140 +70,212 @@ def get_output_dir():
             return arg
     return "."
 
-# Generate employee records
+# Generate employee records a batch of columns at a time (see utils/columnar.py):
+# numbers, SCALE IDs, flags and dates come from NumPy, free text from Faker pools.
+# Pools repeat values, so identifiers (e-mail, SSN) are built from the row number
+EMPLOYEE_BATCH_SIZE = 10000
+PASSWORD_ALPHABET = string.ascii_letters + string.digits + "!@#$%^&*()_+"
+
+def email_strings(given, surname, ids, domains):
+    # given.surname<EMPLOYEE>@domain, unique per row whatever the names
+    return [f"{re.sub(r'[^a-z0-9]', '', g.lower())}.{re.sub(r'[^a-z0-9]', '', s.lower())}{i}@{d}"
+            for g, s, i, d in zip(given.tolist(), surname.tolist(), ids.tolist(), domains)]
+
+def ssn_strings(ids):
+    # AAA-GG-SSSS counted up from 001-01-0001, skipping area 666 and the zero groups
+    # and serials like fake.ssn() does: one number per row for the first 889 million rows
+    n = ids - 1
+    serial = n % 9999 + 1
+    group = n // 9999 % 99 + 1
+    area = n // (9999 * 99) + 1
+    area += area >= 666
+    return [f"{a:03d}-{g:02d}-{s:04d}" for a, g, s in zip(area.tolist(), group.tolist(), serial.tolist())]
+
+def employee_columns(ids, num_employees, organization_ids, rng, pools, now, title_ids=None):
+    n = len(ids)
+    today = now.date()
+    # Same ranges as fake.date_of_birth(22, 65) and the old per-row loop:
+    # employed from 18 years after birth until today
+    birth = random_dates(rng, years_before(today, 66) + timedelta(days=1), years_before(today, 22), n)
+    employment = random_dates(rng, birth + days(365 * 18), today, n)
+    birth_str, employment_str = date_strings(birth), date_strings(employment)
+    # Any other employee as manager, never the employee itself
+    if num_employees > 1:
+        managers = rng.integers(1, num_employees, n)
+        managers += managers >= ids
+    else:
+        managers = None
+    now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+    id_list = ids.tolist()
+    surname, given = pools.column("last_name", n), pools.column("first_name", n)
+
+    return {
+        "EMPLOYEE": ids,
+        "ORGANIZATION": rng.choice(organization_ids, n),
+        "EMPLOYEENO": [f"EMP{emp_id:05d}" for emp_id in id_list],
+        "SURNAME": surname,
+        "GIVENNAME": given,
+        "MIDDLENAME": pools.column("first_name", n),
+        "COMMONNAME": pools.column("first_name", n),
+        "MAIL": email_strings(given, surname, ids, repeat("example.com", n)),
+        "PRIVATEMAIL": email_strings(given, surname, ids, pools.column("free_email_domain", n).tolist()),
+        "BIRTHDATE": birth_str,
+        "EMPLOYMENTDATE": employment_str,
+        "EMPLOYMENTEND": None,
+        "ADDRESS1": pools.column("street_address", n),
+        "ADDRESS2": pools.column("secondary_address", n),
+        "ADDRESS3": None,
+        "ADDRESS4": None,
+        "ZIPCODE": pools.column("postcode", n),
+        "NICKNAME": pools.column("first_name", n),
+        "USERID": [f"user{emp_id}" for emp_id in id_list],
+        "PASSWORD": random_strings(rng, n, 10, PASSWORD_ALPHABET),
+        "BUILDINGNAME": pools.column("word", n),
+        "EMPLOYEETYPE": rng.choice(scale_employeetype_ids, n),
+        "PHOTOURL": pools.column("image_url", n),
+        "TITLE": rng.choice(title_ids or scale_title_ids(), n),
+        "PROFILE_TITLE": pools.column("job", n),
+        "MANAGER": managers,
+        "TEMPMANAGER": None,
+        "ONVACATION": rng.integers(0, 2, n),
+        "LASTLOGON": now_str,
+        "LASTUSEDOBJECT": None,
+        "LASTUSEDACTIVITY": None,
+        "MODIFIED": now_str,
+        "MODIFIEDBY": pools.column("user_name", n),
+        "MODIFICATIONNO": rng.integers(1, 11, n),
+        "SECRETARY": None,
+        "SUPERVISOR": None,
+        "SECONDARYORG": None,
+        "PRIMARYMANAGER": None,
+        "SECONDARYMANAGER": None,
+        "HRMANAGER": None,
+        "DIRECTORYDN": [f"CN={name},OU=People,DC=example,DC=com" for name in pools.column("name", n).tolist()],
+        "DIRECTORYMODIFIED": now_str,
+        "PHOTO_ID": None,
+        "JOB_DESCRIPTION": pools.column("job", n),
+        "POSITION_LEVEL": rng.choice(scale_position_level_ids, n),
+        "GENDER": rng.choice(scale_gender_ids, n),
+        "HOMEADDRESS": pools.column("address", n),
+        "DATEOFBIRTH": birth_str,
+        "SOCIALSECURITYNUMBER": ssn_strings(ids),
+        "NATIONALITY": rng.choice(nationality_ids, n),
+        "COUNTRY": rng.choice(country_ids, n),
+        "MARITALSTATUS": rng.choice(marital_status_ids, n),
+        "POSITION": rng.integers(1, 6, n),
+        "MOBILITY": rng.integers(0, 2, n),
+        "FLIGHT_RISK": rng.integers(0, 2, n),
+        "CAREER_AMBITIONS": rng.integers(1, 4, n),
+        "CAREER_PLANNING_TOPICS": None,  # filled in by generate_employee_table
+        "DEPARTMENTMANAGER": None,
+        "BASIC_SALARY": rng.integers(0, 100000, n).astype(str),
+        "POSITION_CODE": ["POS" + code for code in random_strings(rng, n, 4, string.ascii_letters).tolist()],
+        "MARKET_VALUE": rng.integers(0, 100000, n).astype(str),
+        "HIRING_DATE": employment_str,
+        "TERMINATION_DATE": None,
+        "WORKING_HOURS": rng.integers(20, 41, n).astype(str),
+        "STATUS": 1,
+        "TYPE_OF_PAY": 1,
+        "WEEKLY_WORK_HOURS": rng.integers(20, 41, n),
+        "GUID": uuid4_strings(rng, n)
+    }
+
+# Employee values are counter-based (utils/counter_rng.py): row i depends only
+# on the run seed, i and the table context below, so any row or slice can be
+# rebuilt without generating the rows before it
+def employee_key(seed):
+    return derive_key(seed, "employee")
+
+# Text pools per (key, size), built once per process
+_pools = {}
+
+def employee_pools(key, size):
+    pools = _pools.get((key, size))
+    if pools is None:
+        # A Faker of its own: reseeding the shared one would disturb other steps
+        pools = _pools[(key, size)] = TextPools(Faker(), None, size=size, seed=key)
+    return pools
+
+def iter_employee_batches(num_employees, organization_ids, batch_size=EMPLOYEE_BATCH_SIZE, first=1, last=None,
+                          key=None, now=None, title_ids=None):
+    """Yield employees first..last (default: all) in batches of batch_size, without AI fields.
+
+    The rows are the same however the range is cut into batches or shards.
+    `key` defaults to the run seed's employee key, `now` to the run time.
+    """
+    key = key if key is not None else employee_key(run_seed())
+    pools = employee_pools(key, min(TEXT_POOL_SIZE, num_employees))
+    now = now or run_time()
+    last = last or num_employees
+    title_ids = title_ids or scale_title_ids()
+    for start in range(first, last + 1, batch_size):
+        ids = np.arange(start, min(start + batch_size, last + 1))
+        rng = CounterRNG(key, ids)
+        columns = employee_columns(ids, num_employees, organization_ids, rng, pools.with_rng(rng), now, title_ids)
+        yield rows_from_columns(columns, len(ids))
+
+# The organizations generate_organizations writes for the scale profile (IDs 1..n)
+def scale_organization_ids():
+    return list(range(1, scale_rows("organizations") + 1))
+
+def iter_rows(seed, start, stop, num_employees=None, organization_ids=None, as_of=None):
+    """Rows [start, stop) of the employee table for `seed` (row i is EMPLOYEE i + 1), without AI fields.
+
+    Context defaults to what a pipeline run at the current scale uses: the
+    profile's employee count and organizations, and the run time (--as-of).
+    Cost is proportional to stop - start, whatever start is.
+    """
+    num_employees = num_employees or scale_rows("employees")
+    start, stop = max(0, start), min(stop, num_employees)
+    if start >= stop:
+        return
+    for batch in iter_employee_batches(num_employees, organization_ids or scale_organization_ids(),
+                                       first=start + 1, last=stop, key=employee_key(seed), now=as_of):
+        yield from batch
+
+def employee_row(seed, i, num_employees=None, organization_ids=None, as_of=None):
+    """Row i of the employee table for `seed`, in O(1) (see iter_rows)."""
+    for row in iter_rows(seed, i, i + 1, num_employees, organization_ids, as_of):
+        return row
+    raise IndexError(f"employee row {i} out of range")
+
+# Worker for utils/sharding.py: employees shard.start + 1 .. shard.stop
+def employee_shard(shard):
+    for batch in iter_employee_batches(shard.args["num_employees"], shard.args["organization_ids"],
+                                       first=shard.start + 1, last=shard.stop,
+                                       key=shard.key, now=shard.as_of):
+        yield from batch
+
+def iter_employee_table(num_employees, organization_ids, output_dir=None):
+    """Yield complete employee rows in ID order, one batch in memory at a time."""
+    rows = sharded_rows("employee", num_employees, employee_shard,
+                        {"num_employees": num_employees, "organization_ids": organization_ids}, output_dir)
+    for batch in in_batches(rows, EMPLOYEE_BATCH_SIZE):
+        # AI-generated career topics, requested in batches once the rows exist
+        topics = generate_career_topics([employee["PROFILE_TITLE"] for employee in batch])
+        for employee, topic in zip(batch, topics):
+            employee["CAREER_PLANNING_TOPICS"] = topic
+        yield from batch
+
 def generate_employee_table(num_employees=100, organizations=None):
-    employees = []
     organization_ids = [org["ORGANIZATION"] for org in organizations] if organizations else [1]
+    return list(iter_employee_table(num_employees, organization_ids))
+
+# Generate and save. Returns (rows, stats); rows is None because the table is
+# streamed to disk batch by batch instead of being kept in memory.
+def generate(output_dir, dry_run=False, rows=None):
+    with use_backend(backend_for(dry_run)):
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Organization IDs produced upstream in this run
+        organization_ids = [org["ORGANIZATION"]
+                            for org in read_rows(artifact_path(output_dir, 'organization_data_with_gpt.json'))]
+
+        output_path = os.path.join(output_dir, artifact_filename("employee_data_full.json"))
+        count = write_rows(output_path, iter_employee_table(rows or scale_rows("employees"), organization_ids or [1], output_dir))
+
+        print(f"✅ Generated {count} EMPLOYEE records and saved to '{output_path}'")
+        return None, {"rows": count, "output": output_path}
 
-    for emp_id in range(1, num_employees + 1):
-        birth_date = fake.date_of_birth(minimum_age=22, maximum_age=65)
-        birth_date_str = birth_date.strftime("%Y-%m-%d")
-        min_employment_date = birth_date + timedelta(days=365 * 18)
-        employment_date = fake.date_between_dates(date_start=min_employment_date, date_end=datetime.today().date())
-        employment_date_str = employment_date.strftime("%Y-%m-%d")
-
-        # Ensure manager is not self
-        manager_id = random.randint(1, num_employees)
-        while manager_id == emp_id:
-            manager_id = random.randint(1, num_employees)
-
-        # AI-generated career topic
-        career_topic = generate_career_topic()
-
-        employee = {
-            "EMPLOYEE": emp_id,
-            "ORGANIZATION": random.choice(organization_ids),
-            "EMPLOYEENO": f"EMP{emp_id:05d}",
-            "SURNAME": fake.last_name(),
-            "GIVENNAME": fake.first_name(),
-            "MIDDLENAME": fake.first_name(),
-            "COMMONNAME": fake.first_name(),
-            "MAIL": fake.email(),
-            "PRIVATEMAIL": fake.email(),
-            "BIRTHDATE": birth_date_str,
-            "EMPLOYMENTDATE": employment_date_str,
-            "EMPLOYMENTEND": None,
-            "ADDRESS1": fake.street_address(),
-            "ADDRESS2": fake.secondary_address(),
-            "ADDRESS3": None,
-            "ADDRESS4": None,
-            "ZIPCODE": fake.postcode(),
-            "NICKNAME": fake.first_name(),
-            "USERID": f"user{emp_id}",
-            "PASSWORD": fake.password(),
-            "BUILDINGNAME": fake.word(),
-            "EMPLOYEETYPE": random.choice(scale_employeetype_ids),
-            "PHOTOURL": fake.image_url(),
-            "TITLE": random.choice(scale_title_ids),
-            "PROFILE_TITLE": fake.job(),
-            "MANAGER": manager_id,
-            "TEMPMANAGER": None,
-            "ONVACATION": random.randint(0,1),
-            "LASTLOGON": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "LASTUSEDOBJECT": None,
-            "LASTUSEDACTIVITY": None,
-            "MODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "MODIFIEDBY": fake.user_name(),
-            "MODIFICATIONNO": random.randint(1, 10),
-            "SECRETARY": None,
-            "SUPERVISOR": None,
-            "SECONDARYORG": None,
-            "PRIMARYMANAGER": None,
-            "SECONDARYMANAGER": None,
-            "HRMANAGER": None,
-            "DIRECTORYDN": f"CN={fake.name()},OU=People,DC=example,DC=com",
-            "DIRECTORYMODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "PHOTO_ID": None,
-            "JOB_DESCRIPTION": fake.job(),
-            "POSITION_LEVEL": random.choice(scale_position_level_ids),
-            "GENDER": random.choice(scale_gender_ids),
-            "HOMEADDRESS": fake.address(),
-            "DATEOFBIRTH": birth_date_str,
-            "SOCIALSECURITYNUMBER": fake.ssn(),
-            "NATIONALITY": random.choice(nationality_ids),
-            "COUNTRY": random.choice(country_ids),
-            "MARITALSTATUS": random.choice(marital_status_ids),
-            "POSITION": random.randint(1, 5),
-            "MOBILITY": random.randint(0, 1),
-            "FLIGHT_RISK": random.randint(0, 1),
-            "CAREER_AMBITIONS": random.randint(1, 3),
-            "CAREER_PLANNING_TOPICS": career_topic,
-            "DEPARTMENTMANAGER": None,
-            "BASIC_SALARY": str(fake.random_number(digits=5)),
-            "POSITION_CODE": fake.lexify(text='POS????'),
-            "MARKET_VALUE": str(fake.random_number(digits=5)),
-            "HIRING_DATE": employment_date_str,
-            "TERMINATION_DATE": None,
-            "WORKING_HOURS": str(random.randint(20, 40)),
-            "STATUS": 1,
-            "TYPE_OF_PAY": 1,
-            "WEEKLY_WORK_HOURS": random.randint(20, 40),
-            "GUID": str(fake.uuid4())
-        }
-
-        # Use faker for fields if dry run
-        if is_dry_run():
-            employee["EMPLOYEENO"] = fake.lexify(text='EMP????')
-            employee["SURNAME"] = fake.last_name()
-            employee["GIVENNAME"] = fake.first_name()
-            employee["MIDDLENAME"] = fake.first_name()
-            employee["COMMONNAME"] = fake.first_name()
-            employee["MAIL"] = fake.email()
-            employee["PRIVATEMAIL"] = fake.email()
-            employee["ADDRESS1"] = fake.street_address()
-            employee["ADDRESS2"] = fake.secondary_address()
-            employee["ZIPCODE"] = fake.postcode()
-            employee["NICKNAME"] = fake.first_name()
-            employee["USERID"] = f"user{emp_id}"
-            employee["PASSWORD"] = fake.password()
-            employee["BUILDINGNAME"] = fake.word()
-            employee["PHOTOURL"] = fake.image_url()
-            employee["PROFILE_TITLE"] = fake.job()
-            employee["LASTLOGON"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            employee["MODIFIED"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            employee["MODIFIEDBY"] = fake.user_name()
-            employee["DIRECTORYDN"] = f"CN={fake.name()},OU=People,DC=example,DC=com"
-            employee["DIRECTORYMODIFIED"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            employee["JOB_DESCRIPTION"] = fake.job()
-            employee["HOMEADDRESS"] = fake.address()
-            employee["DATEOFBIRTH"] = birth_date_str
-            employee["SOCIALSECURITYNUMBER"] = fake.ssn()
-            employee["GUID"] = str(fake.uuid4())
-
-        employees.append(employee)
-
-    return employees
-
-# Load organizations
-with open(os.path.join('data', 'output', 'latest', 'organization_data_with_gpt.json'), "r") as f:
-    organization_data = json.load(f)
-
-# Generate and save
-employee_data = generate_employee_table(num_employees=100, organizations=organization_data)
-
-output_dir = get_output_dir()
-os.makedirs(output_dir, exist_ok=True)
-with open(os.path.join(output_dir, "employee_data_full.json"), "w") as f:
-    json.dump(employee_data, f, indent=2)
-
-print(f"✅ Generated {len(employee_data)} EMPLOYEE records and saved to '{os.path.join(output_dir, 'employee_data_full.json')}'")
+if __name__ == "__main__":
+    generate(get_output_dir(), dry_run=is_dry_run())
@@ -5,26 +5,19 @@ except Exception:
     pass  # Ignore if not supported
 
 import os
+import math
 import random
-import json
-import uuid
+import re
+from contextlib import closing
+from datetime import timedelta
 from faker import Faker
-from datetime import datetime, timedelta
-from openai import AzureOpenAI
-
-# Load API key from external file
-api_key_path = "C:/Users/FredrikVillo/repos/TestDataGeneration/api_key.txt"
-with open(api_key_path, "r") as f:
-    api_key = f.read().strip()
-
-# Azure OpenAI client setup
-client = AzureOpenAI(
-    api_key=api_key,
-    api_version="2025-01-01-preview",
-    azure_endpoint="https://azureopenai-sin-dev.openai.azure.com"
-)
-
-fake = Faker()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.counter_rng import derive_key
+from utils.runtime import random_uuid, run_seed, run_time
+from utils.llm_client import chat, estimate_chat, imap_concurrent, backend_for, use_backend
+from utils.token_budget import add_estimates
+from utils.scale import scale_rows
+from utils.artifacts import artifact_filename, write_rows
 
 # Static list for import modified values
 IMPORT_MODIFIED_CHOICES = [
@@ -38,17 +31,8 @@ IMPORT_MODIFIED_CHOICES = [
 
 # Function to call Azure OpenAI API
 def call_openai(prompt, model="gpt-4o", max_tokens=100, temperature=0.7):
-    if is_dry_run():
-        # Use faker for dry run
-        return fake.sentence(nb_words=8)
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=max_tokens,
-            temperature=temperature
-        )
-        return response.choices[0].message.content.strip()
+        return chat(prompt, model=model, max_tokens=max_tokens, temperature=temperature)
     except Exception as e:
         print(f"Error calling OpenAI API: {e}")
         return None
@@ -68,43 +52,103 @@ def get_output_dir():
             return arg
     return "."
 
-# Batch generate department names with country suffix
-def generate_department_names_batch(n=10):
-    if is_dry_run():
-        return [fake.company() for _ in range(n)]
-    countries = ["Norway", "Sweden", "UK", "India"]
-    prompt = (
-        f"Generate exactly {n} unique, creative, and professional names for corporate departments in a mid-sized company. "
+# Department names are requested in parallel chunks instead of one list of n:
+# responses stay short, latency stays flat for large organization counts, and
+# the chunks together ask for DEPARTMENT_OVERPROVISION times what is missing
+# so duplicates and short answers are absorbed without another round trip.
+DEPARTMENT_CHUNK_SIZE = 50
+DEPARTMENT_OVERPROVISION = 1.25
+DEPARTMENT_ROUNDS = 3
+# Each further chunk leans on a different area so chunks do not repeat each other
+DEPARTMENT_FOCUS = ["finance", "technology", "operations", "people and culture", "sales", "research",
+                    "customer service", "legal and compliance", "marketing", "logistics"]
+
+def department_names_prompt(n, focus=None, chunk=0):
+    # The list number keeps chunk prompts distinct, so neither the prompt cache
+    # nor the offline mock hands the same list to two chunks
+    area = f", in the area of {focus}" if focus else ""
+    part = f"This is list number {chunk + 1}; avoid the most common department names. " if chunk else ""
+    return (
+        f"Generate exactly {n} unique, creative, and professional names for corporate departments in a mid-sized company{area}. "
         "List them without explanations, separated by commas. "
         "Do not include any special characters or numbers like '1', '2', etc. "
-        "Ensure the list contains exactly {n} names."
+        f"{part}Ensure the list contains exactly {n} names."
     )
-    print(f"🔍 Sending prompt to OpenAI: {prompt}")
-    response = call_openai(prompt, max_tokens=200 + n * 10, temperature=0.7)
-    if response:
-        print(f"🔍 Received response from OpenAI: {response}")
-        names = [clean_response(name.strip()) for name in response.split(',') if name.strip()]
+
+# (size, focus, chunk number) of the requests for one round; chunk 0 of a run has no focus
+def department_chunks(missing, first_chunk=0):
+    total = math.ceil(missing * DEPARTMENT_OVERPROVISION)
+    sizes = [DEPARTMENT_CHUNK_SIZE] * (total // DEPARTMENT_CHUNK_SIZE)
+    if total % DEPARTMENT_CHUNK_SIZE:
+        sizes.append(total % DEPARTMENT_CHUNK_SIZE)
+    return [(size, DEPARTMENT_FOCUS[(k - 1) % len(DEPARTMENT_FOCUS)] if k else None, k)
+            for k, size in enumerate(sizes, start=first_chunk)]
+
+# "Finance & Ops", "finance and ops" and "FINANCE-AND-OPS" are the same department
+def normalize_department_name(name):
+    return re.sub(r"[^a-z0-9]+", "", name.casefold().replace("&", "and"))
+
+def request_department_chunk(chunk):
+    size, focus, number = chunk
+    response = call_openai(department_names_prompt(size, focus, number), max_tokens=200 + size * 10, temperature=0.7)
+    return [clean_response(name.strip()) for name in (response or "").split(',') if name.strip()]
+
+# Pre-flight AI usage for main.py --token-budget (first round only)
+def estimate_ai_usage(rows=None):
+    return add_estimates(*(estimate_chat(department_names_prompt(size, focus, number), max_tokens=200 + size * 10)
+                           for size, focus, number in department_chunks(rows or scale_rows("organizations"))))
+
+# The step's own random.Random and Faker, seeded from the run seed (--seed). Steps
+# running side by side under --jobs never draw from the shared global generators.
+def organization_random(seed=None):
+    seed = run_seed() if seed is None else seed
+    fake = Faker()
+    fake.seed_instance(derive_key(seed, "organization", "faker"))
+    return random.Random(derive_key(seed, "organization")), fake
+
+# Batch generate department names with country suffix
+def generate_department_names_batch(n=10, rng=None, fake=None):
+    if rng is None or fake is None:
+        rng, fake = organization_random()
+    countries = ["Norway", "Sweden", "UK", "India"]
+    names, seen = [], set()
+
+    def add(name):
+        key = normalize_department_name(name)
+        if key and key not in seen and len(names) < n:
+            seen.add(key)
+            names.append(name)
+
+    requested = 0
+    for round_no in range(1, DEPARTMENT_ROUNDS + 1):
         if len(names) >= n:
-            print("✅ GPT generated department names.")
-            return [f"{name} {random.choice(countries)}" for name in names[:n]]
-        else:
-            print(f"⚠️ Insufficient names generated by GPT. Expected {n}, got {len(names)}. Retrying...")
-            missing_count = n - len(names)
-            additional_prompt = (
-                f"Generate {missing_count} more unique, creative, and professional names for corporate departments. "
-                "List them without explanations, separated by commas."
-            )
-            additional_response = call_openai(additional_prompt, max_tokens=200, temperature=0.7)
-            if additional_response:
-                additional_names = [clean_response(name.strip()) for name in additional_response.split(',') if name.strip()]
-                names.extend(additional_names[:missing_count])
-            if len(names) < n:
-                print(f"⚠️ Still insufficient names after retry. Filling the gap with Faker.")
-                names.extend([f"{fake.bs().title()} {random.choice(countries)}" for _ in range(n - len(names))])
-            return [f"{name} {random.choice(countries)}" for name in names[:n]]
+            break
+        chunks = department_chunks(n - len(names), first_chunk=requested)
+        requested += len(chunks)
+        before, used = len(names), 0
+        # Merged in chunk order, whatever order the answers arrive in. Stops at n names:
+        # the overprovisioned chunks not yet sent by then are never requested
+        with closing(imap_concurrent(request_department_chunk, chunks)) as answers:
+            for answer in answers:
+                used += 1
+                for name in answer:
+                    add(name)
+                if len(names) >= n:
+                    break
+        print(f"🔍 Round {round_no}: {used} of {len(chunks)} request(s) used, {len(names)} of {n} unique department names.")
+        if len(names) == before:
+            break  # no answers at all (API down or budget spent); another round will not help
+
+    if len(names) < n:
+        print(f"⚠️ Still {n - len(names)} department names short. Filling the gap with Faker.")
+        while len(names) < n:
+            before = len(names)
+            add(fake.bs().title())
+            if len(names) == before:
+                add(f"{fake.bs().title()} {fake.word().title()}")
     else:
-        print("⚠️ No response from OpenAI. Falling back to Faker.")
-        return [f"{fake.bs().title()} {random.choice(countries)}" for _ in range(n)]
+        print("✅ GPT generated department names.")
+    return [f"{name} {rng.choice(countries)}" for name in names]
 
 # Generate LDAP DN string consistently
 def generate_directory_dn_fast(department_name):
@@ -112,55 +156,58 @@ def generate_directory_dn_fast(department_name):
     return f"CN={safe_name},OU=Departments,DC=example,DC=com"
 
 # Generate organization data
-def generate_organization_table(num_orgs=10):
+def generate_organization_table(num_orgs=10, seed=None, now=None):
     organizations = []
     org_ids = list(range(1, num_orgs + 1))
+    rng, fake = organization_random(seed)
+    now = now or run_time()
 
-    dept_names = generate_department_names_batch(num_orgs)
+    dept_names = generate_department_names_batch(num_orgs, rng, fake)
 
     for i in range(num_orgs):
         org_id = org_ids[i]
         name = dept_names[i]
 
-        motherorg = random.choice(org_ids[:i]) if i > 0 and random.random() < 0.3 else None
+        motherorg = rng.choice(org_ids[:i]) if i > 0 and rng.random() < 0.3 else None
 
-        created_date = fake.date_time_between(start_date='-5y', end_date='-1y')
-        modified_date = fake.date_time_between(start_date=created_date, end_date='now')
+        created_date = fake.date_time_between(start_date=now - timedelta(days=5 * 365), end_date=now - timedelta(days=365))
+        modified_date = fake.date_time_between(start_date=created_date, end_date=now)
         directory_modified = fake.date_time_between(start_date=modified_date - timedelta(days=90), end_date=modified_date)
 
         directory_dn = generate_directory_dn_fast(name)
-        import_modified = random.choice(IMPORT_MODIFIED_CHOICES)
+        import_modified = rng.choice(IMPORT_MODIFIED_CHOICES)
 
         organization = {
             "ORGANIZATION": org_id,
             "NAME": name,
             "MOTHERORG": motherorg,
-            "DISABLED": 1 if random.random() < 0.1 else 0,
+            "DISABLED": 1 if rng.random() < 0.1 else 0,
             "CREATED": created_date.strftime("%Y-%m-%d %H:%M:%S"),
             "MODIFIED": modified_date.strftime("%Y-%m-%d %H:%M:%S"),
             "DIRECTORYDN": directory_dn,
             "DIRECTORYMODIFIED": directory_modified.strftime("%Y-%m-%d %H:%M:%S"),
             "SORTORDER": (i + 1) * 10,
-            "UNIQUE_IMPORT_ID": uuid.uuid4().hex[:8],
+            "UNIQUE_IMPORT_ID": random_uuid(rng).hex[:8],
             "IMPORT_MODIFIED": import_modified,
-            "ORGANIZATION_LEVEL": random.randint(1, 5),
-            "GUID": str(uuid.uuid4())
+            "ORGANIZATION_LEVEL": rng.randint(1, 5),
+            "GUID": str(random_uuid(rng))
         }
 
         organizations.append(organization)
 
     return organizations
 
-# Generate and save to JSON
-output_dir = get_output_dir()
-os.makedirs(output_dir, exist_ok=True)
-output_path = os.path.join(output_dir, "organization_data_with_gpt.json")
-org_data = generate_organization_table(100)
+# Generate and save to JSON. Returns (rows, stats).
+def generate(output_dir, dry_run=False, rows=None):
+    with use_backend(backend_for(dry_run)):
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, artifact_filename("organization_data_with_gpt.json"))
+        org_data = generate_organization_table(rows or scale_rows("organizations"))
 
-with open(os.path.join(output_dir, "organization_data_with_gpt.json"), "w", encoding="utf-8") as f:
-    json.dump(org_data, f, indent=2)
+        write_rows(output_path, org_data)
 
-print(f"✅ Organization data generated and saved to '{output_path}'")
+        print(f"✅ Organization data generated and saved to '{output_path}'")
+        return org_data, {"rows": len(org_data), "output": output_path}
 
 if __name__ == "__main__":
-    pass
+    generate(get_output_dir(), dry_run=is_dry_run())
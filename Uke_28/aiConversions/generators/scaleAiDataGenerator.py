@@ -1,45 +1,48 @@
-import json
-import uuid
-from datetime import datetime, timedelta
+from datetime import timedelta
 import random
-from openai import AzureOpenAI
-from faker import Faker
 import os
 import sys
+from faker import Faker
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.counter_rng import derive_key
+from utils.llm_client import chat, estimate_chat, backend_for, use_backend
+from utils.runtime import random_uuid, run_seed, run_time
+from utils.token_budget import BudgetExhausted
+from utils.scale import scale_rows
+from utils.artifacts import artifact_filename, write_rows
 
 try:
     sys.stdout.reconfigure(encoding='utf-8')
 except Exception:
     pass  # Ignore if not supported
 
-# Azure OpenAI client setup
-api_key_path = "C:/Users/FredrikVillo/repos/TestDataGeneration/api_key.txt"
-with open(api_key_path, "r") as f:
-    api_key = f.read().strip()
+def titles_prompt(n):
+    return (
+        f"Generate {n} unique, realistic job titles for a modern company. List them separated by commas without numbering or explanations."
+    )
 
-client = AzureOpenAI(
-    api_key=api_key,
-    api_version="2025-01-01-preview",
-    azure_endpoint="https://azureopenai-sin-dev.openai.azure.com"
-)
+# Pre-flight AI usage for main.py --token-budget
+def estimate_ai_usage(rows=None):
+    return estimate_chat(titles_prompt(rows or scale_rows("scale_titles")), max_tokens=500)
 
-fake = Faker()
+# The step's own random.Random and Faker, seeded from the run seed (--seed)
+def scale_random(seed=None):
+    seed = run_seed() if seed is None else seed
+    fake = Faker()
+    fake.seed_instance(derive_key(seed, "scale", "faker"))
+    return random.Random(derive_key(seed, "scale")), fake
 
 # Function to call GPT to generate diverse job titles
-def generate_titles(n=10):
-    if is_dry_run():
+def generate_titles(n=10, fake=None):
+    fake = fake or scale_random()[1]
+    try:
+        content = chat(titles_prompt(n), max_tokens=500, temperature=0.7)
+    except BudgetExhausted:
+        print("⚠️ Token budget spent. Falling back to Faker job titles.")
         return [fake.job() for _ in range(n)]
-    
-    prompt = (
-        f"Generate {n} unique, realistic job titles for a modern company. List them separated by commas without numbering or explanations."
-    )
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=500,
-        temperature=0.7
-    )
-    titles = [title.strip() for title in response.choices[0].message.content.split(',') if title.strip()]
+    titles = [title.strip() for title in content.split(',') if title.strip()]
+    # EMPLOYEE.TITLE draws from all n title IDs, so a short answer is topped up
+    titles += [fake.job() for _ in range(n - len(titles))]
     return titles[:n]
 
 def is_dry_run():
@@ -51,9 +54,6 @@ def get_output_dir():
             return arg
     return "."
 
-# Generate title entries using GPT
-title_names = generate_titles(5)
-
 # Manually defined additional categories
 position_levels = ["Junior", "Mid-level", "Senior", "Lead"]
 employee_types = ["Permanent", "Contractor", "Intern"]
@@ -61,140 +61,155 @@ marital_statuses = ["Single", "Married"]
 nationalities = ["Norwegian", "Swedish", "Danish"]
 countries = ["Norway", "Sweden", "Denmark"]
 
-scale_entries = []
-
-# Titles (SCALETYPE 1)
-for idx, title in enumerate(title_names, start=1):
-    entry = {
-        "ID": 1000 + idx,
-        "SCALETYPE": 1,
-        "NAME0": title,
-        "NAME1": title,
-        "NAME2": title,
-        "DESCRIPTION0": f"Job Title: {title}",
-        "DESCRIPTION1": None,
-        "DESCRIPTION2": None,
-        "SORTORDER": idx * 10,
-        "DELETED": 0,
-        "CREATED": (datetime.now() - timedelta(days=random.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
-        "MODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "GUID": str(uuid.uuid4())
-    }
-    scale_entries.append(entry)
-
-# Gender (SCALETYPE 2)
-gender_entries = ["Male", "Female"]
-for idx, gender in enumerate(gender_entries, start=1):
-    scale_entries.append({
-        "ID": 2000 + idx,
-        "SCALETYPE": 2,
-        "NAME0": gender,
-        "NAME1": gender,
-        "NAME2": gender,
-        "DESCRIPTION0": f"Gender: {gender}",
-        "DESCRIPTION1": None,
-        "DESCRIPTION2": None,
-        "SORTORDER": (len(scale_entries) + 1) * 10,
-        "DELETED": 0,
-        "CREATED": (datetime.now() - timedelta(days=random.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
-        "MODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "GUID": str(uuid.uuid4())
-    })
-
-# Position Level (SCALETYPE 3)
-for idx, level in enumerate(position_levels, start=1):
-    scale_entries.append({
-        "ID": 3000 + idx,
-        "SCALETYPE": 3,
-        "NAME0": level,
-        "NAME1": None,
-        "NAME2": None,
-        "DESCRIPTION0": f"{level} level position",
-        "DESCRIPTION1": None,
-        "DESCRIPTION2": None,
-        "SORTORDER": (len(scale_entries) + 1) * 10,
-        "DELETED": 0,
-        "CREATED": (datetime.now() - timedelta(days=random.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
-        "MODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "GUID": str(uuid.uuid4())
-    })
-
-# Employee Type (SCALETYPE 4)
-for idx, emp_type in enumerate(employee_types, start=1):
-    scale_entries.append({
-        "ID": 4000 + idx,
-        "SCALETYPE": 4,
-        "NAME0": emp_type,
-        "NAME1": None,
-        "NAME2": None,
-        "DESCRIPTION0": f"{emp_type} employee",
-        "DESCRIPTION1": None,
-        "DESCRIPTION2": None,
-        "SORTORDER": (len(scale_entries) + 1) * 10,
-        "DELETED": 0,
-        "CREATED": (datetime.now() - timedelta(days=random.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
-        "MODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "GUID": str(uuid.uuid4())
-    })
-
-# Marital Status (SCALETYPE 5)
-for idx, status in enumerate(marital_statuses, start=1):
-    scale_entries.append({
-        "ID": 5000 + idx,
-        "SCALETYPE": 5,
-        "NAME0": status,
-        "NAME1": None,
-        "NAME2": None,
-        "DESCRIPTION0": status,
-        "DESCRIPTION1": None,
-        "DESCRIPTION2": None,
-        "SORTORDER": (len(scale_entries) + 1) * 10,
-        "DELETED": 0,
-        "CREATED": (datetime.now() - timedelta(days=random.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
-        "MODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "GUID": str(uuid.uuid4())
-    })
-
-# Nationality (SCALETYPE 6)
-for idx, nation in enumerate(nationalities, start=1):
-    scale_entries.append({
-        "ID": 6000 + idx,
-        "SCALETYPE": 6,
-        "NAME0": nation,
-        "NAME1": None,
-        "NAME2": None,
-        "DESCRIPTION0": nation,
-        "DESCRIPTION1": None,
-        "DESCRIPTION2": None,
-        "SORTORDER": (len(scale_entries) + 1) * 10,
-        "DELETED": 0,
-        "CREATED": (datetime.now() - timedelta(days=random.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
-        "MODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "GUID": str(uuid.uuid4())
-    })
-
-# Country (SCALETYPE 7)
-for idx, country in enumerate(countries, start=1):
-    scale_entries.append({
-        "ID": 7000 + idx,
-        "SCALETYPE": 7,
-        "NAME0": country,
-        "NAME1": None,
-        "NAME2": None,
-        "DESCRIPTION0": country,
-        "DESCRIPTION1": None,
-        "DESCRIPTION2": None,
-        "SORTORDER": (len(scale_entries) + 1) * 10,
-        "DELETED": 0,
-        "CREATED": (datetime.now() - timedelta(days=random.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
-        "MODIFIED": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "GUID": str(uuid.uuid4())
-    })
-
-# Save to JSON
-output_dir = get_output_dir()
-os.makedirs(output_dir, exist_ok=True)
-with open(os.path.join(output_dir, "scale_data_full.json"), "w") as f:
-    json.dump(scale_entries, f, indent=2)
-
-print(f"✅ Generated {len(scale_entries)} SCALE entries and saved to '{os.path.join(output_dir, 'scale_data_full.json')}'")
+def build_scale_entries(title_names, rng=None, now=None):
+    rng = rng or scale_random()[0]
+    now = now or run_time()
+    scale_entries = []
+
+    # Titles (SCALETYPE 1)
+    for idx, title in enumerate(title_names, start=1):
+        entry = {
+            "ID": 1000 + idx,
+            "SCALETYPE": 1,
+            "NAME0": title,
+            "NAME1": title,
+            "NAME2": title,
+            "DESCRIPTION0": f"Job Title: {title}",
+            "DESCRIPTION1": None,
+            "DESCRIPTION2": None,
+            "SORTORDER": idx * 10,
+            "DELETED": 0,
+            "CREATED": (now - timedelta(days=rng.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
+            "MODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "GUID": str(random_uuid(rng))
+        }
+        scale_entries.append(entry)
+
+    # Gender (SCALETYPE 2)
+    gender_entries = ["Male", "Female"]
+    for idx, gender in enumerate(gender_entries, start=1):
+        scale_entries.append({
+            "ID": 2000 + idx,
+            "SCALETYPE": 2,
+            "NAME0": gender,
+            "NAME1": gender,
+            "NAME2": gender,
+            "DESCRIPTION0": f"Gender: {gender}",
+            "DESCRIPTION1": None,
+            "DESCRIPTION2": None,
+            "SORTORDER": (len(scale_entries) + 1) * 10,
+            "DELETED": 0,
+            "CREATED": (now - timedelta(days=rng.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
+            "MODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "GUID": str(random_uuid(rng))
+        })
+
+    # Position Level (SCALETYPE 3)
+    for idx, level in enumerate(position_levels, start=1):
+        scale_entries.append({
+            "ID": 3000 + idx,
+            "SCALETYPE": 3,
+            "NAME0": level,
+            "NAME1": None,
+            "NAME2": None,
+            "DESCRIPTION0": f"{level} level position",
+            "DESCRIPTION1": None,
+            "DESCRIPTION2": None,
+            "SORTORDER": (len(scale_entries) + 1) * 10,
+            "DELETED": 0,
+            "CREATED": (now - timedelta(days=rng.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
+            "MODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "GUID": str(random_uuid(rng))
+        })
+
+    # Employee Type (SCALETYPE 4)
+    for idx, emp_type in enumerate(employee_types, start=1):
+        scale_entries.append({
+            "ID": 4000 + idx,
+            "SCALETYPE": 4,
+            "NAME0": emp_type,
+            "NAME1": None,
+            "NAME2": None,
+            "DESCRIPTION0": f"{emp_type} employee",
+            "DESCRIPTION1": None,
+            "DESCRIPTION2": None,
+            "SORTORDER": (len(scale_entries) + 1) * 10,
+            "DELETED": 0,
+            "CREATED": (now - timedelta(days=rng.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
+            "MODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "GUID": str(random_uuid(rng))
+        })
+
+    # Marital Status (SCALETYPE 5)
+    for idx, status in enumerate(marital_statuses, start=1):
+        scale_entries.append({
+            "ID": 5000 + idx,
+            "SCALETYPE": 5,
+            "NAME0": status,
+            "NAME1": None,
+            "NAME2": None,
+            "DESCRIPTION0": status,
+            "DESCRIPTION1": None,
+            "DESCRIPTION2": None,
+            "SORTORDER": (len(scale_entries) + 1) * 10,
+            "DELETED": 0,
+            "CREATED": (now - timedelta(days=rng.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
+            "MODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "GUID": str(random_uuid(rng))
+        })
+
+    # Nationality (SCALETYPE 6)
+    for idx, nation in enumerate(nationalities, start=1):
+        scale_entries.append({
+            "ID": 6000 + idx,
+            "SCALETYPE": 6,
+            "NAME0": nation,
+            "NAME1": None,
+            "NAME2": None,
+            "DESCRIPTION0": nation,
+            "DESCRIPTION1": None,
+            "DESCRIPTION2": None,
+            "SORTORDER": (len(scale_entries) + 1) * 10,
+            "DELETED": 0,
+            "CREATED": (now - timedelta(days=rng.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
+            "MODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "GUID": str(random_uuid(rng))
+        })
+
+    # Country (SCALETYPE 7)
+    for idx, country in enumerate(countries, start=1):
+        scale_entries.append({
+            "ID": 7000 + idx,
+            "SCALETYPE": 7,
+            "NAME0": country,
+            "NAME1": None,
+            "NAME2": None,
+            "DESCRIPTION0": country,
+            "DESCRIPTION1": None,
+            "DESCRIPTION2": None,
+            "SORTORDER": (len(scale_entries) + 1) * 10,
+            "DELETED": 0,
+            "CREATED": (now - timedelta(days=rng.randint(200, 1000))).strftime("%Y-%m-%d %H:%M:%S"),
+            "MODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "GUID": str(random_uuid(rng))
+        })
+
+    return scale_entries
+
+# Generate and save to JSON. Returns (rows, stats).
+def generate(output_dir, dry_run=False, rows=None):
+    with use_backend(backend_for(dry_run)):
+        # Generate title entries using GPT
+        rng, fake = scale_random()
+        title_names = generate_titles(rows or scale_rows("scale_titles"), fake)
+        scale_entries = build_scale_entries(title_names, rng)
+
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, artifact_filename("scale_data_full.json"))
+        write_rows(output_path, scale_entries)
+
+        print(f"✅ Generated {len(scale_entries)} SCALE entries and saved to '{output_path}'")
+        return scale_entries, {"rows": len(scale_entries), "output": output_path}
+
+if __name__ == "__main__":
+    generate(get_output_dir(), dry_run=is_dry_run())
@@ -1,22 +1,19 @@
 import csv
-import json
 import sys
 import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import artifact_filename, write_rows
 try:
     sys.stdout.reconfigure(encoding='utf-8')
 except Exception:
     pass  # Ignore if not supported
 
-# Usage: python scaletypeGenerator.py <output_dir>
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python scaletypeGenerator.py <output_dir>")
-        sys.exit(1)
-    output_dir = sys.argv[1]
+# Convert scaletype_info.csv to scaletype_data.json. Returns (rows, stats).
+def generate(output_dir, dry_run=False, rows=None):
     os.makedirs(output_dir, exist_ok=True)
     # Oppdatert sti til csv-mappen
     csv_path = os.path.join(os.path.dirname(__file__), '../data/input/csv/scaletype_info.csv')
-    json_out = os.path.join(output_dir, 'scaletype_data.json')
+    json_out = os.path.join(output_dir, artifact_filename('scaletype_data.json'))
 
     scaletypes = []
     with open(csv_path, newline='', encoding='utf-8-sig') as csvfile:
@@ -30,10 +27,17 @@ def main():
                 "GUID": row[19]
             })
 
-    with open(json_out, 'w', encoding='utf-8') as f:
-        json.dump(scaletypes, f, indent=2)
+    write_rows(json_out, scaletypes)
     # Replace Unicode checkmark with ASCII
-    print(f"\u2705 Wrote {len(scaletypes)} SCALETYPE rows to {json_out}")
+    print(f"✅ Wrote {len(scaletypes)} SCALETYPE rows to {json_out}")
+    return scaletypes, {"rows": len(scaletypes), "output": json_out}
+
+# Usage: python scaletypeGenerator.py <output_dir>
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python scaletypeGenerator.py <output_dir>")
+        sys.exit(1)
+    generate(sys.argv[1], dry_run="--dry-run" in sys.argv)
 
 if __name__ == "__main__":
     main()
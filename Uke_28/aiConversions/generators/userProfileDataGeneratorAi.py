@@ -5,12 +5,13 @@ except Exception:
     pass  # Ignore if not supported
 
 import random
-import csv
-import json
 import os
-from faker import Faker
-
-fake = Faker()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import artifact_path, artifact_filename, count_artifact_rows, read_rows, write_rows
+from utils.counter_rng import derive_key, row_seed
+from utils.runtime import run_seed
+from utils.scale import MAX_PROFILES_PER_EMPLOYEE
+from utils.sharding import sharded_rows
 
 # Define USERFIELDs and their possible values
 userprofile_fields = {
@@ -27,27 +28,20 @@ PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
 def rel_path(*parts):
     return os.path.join(PROJECT_ROOT, *parts)
 
-def load_valid_accesscatalyst_ids():
-    accesscatalyst_path = rel_path('data', 'output', 'latest', 'accesscatalyst_data.json')
-    if not os.path.exists(accesscatalyst_path):
-        print(f"❌ accesscatalyst_data.json not found at {accesscatalyst_path}")
-        return set()
-    with open(accesscatalyst_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        return set(entry["ACCESSCATALYST"] for entry in data if "ACCESSCATALYST" in entry)
-
-def generate_userprofiles(employees, valid_accesscatalyst_ids, max_profiles_per_employee=3):
-    userprofiles = []
-
+def iter_userprofiles(employees, max_profiles_per_employee=MAX_PROFILES_PER_EMPLOYEE, key=None):
+    # Profiles of an ACCESSCATALYST are seeded from (key, ACCESSCATALYST), the same in any shard
+    key = key if key is not None else derive_key(run_seed(), "userprofile")
+    rng = random.Random()
     for emp in employees:
         accesscatalyst_id = emp.get("ACCESSCATALYST")
-        if accesscatalyst_id not in valid_accesscatalyst_ids:
-            continue  # skip if not a valid FK
-        num_profiles = random.randint(1, max_profiles_per_employee)
-        chosen_fields = random.sample(list(userprofile_fields.keys()), num_profiles)
+        if accesscatalyst_id is None:
+            continue  # no ACCESSCATALYST to reference
+        rng.seed(row_seed(key, accesscatalyst_id))
+        num_profiles = rng.randint(1, max_profiles_per_employee)
+        chosen_fields = rng.sample(list(userprofile_fields.keys()), num_profiles)
 
         for userfield in chosen_fields:
-            field_value = random.choice(userprofile_fields[userfield])
+            field_value = rng.choice(userprofile_fields[userfield])
 
             profile = {
                 "USERFIELD": userfield,
@@ -55,9 +49,10 @@ def generate_userprofiles(employees, valid_accesscatalyst_ids, max_profiles_per_
                 "FIELD_VALUE": field_value
             }
 
-            userprofiles.append(profile)
+            yield profile
 
-    return userprofiles
+def generate_userprofiles(employees, max_profiles_per_employee=MAX_PROFILES_PER_EMPLOYEE):
+    return list(iter_userprofiles(employees, max_profiles_per_employee))
 
 def is_dry_run():
     return "--dry-run" in sys.argv
@@ -69,34 +64,39 @@ def get_output_dir():
             return arg if os.path.isabs(arg) else rel_path(arg)
     return rel_path('data', 'output', 'latest')
 
-# Load combined EMPLOYEE + ACCESSCATALYST data from CSV
-employee_data = []
-employee_csv_path = rel_path('data', 'input', 'csv', 'employee_data_with_accesscatalyst.csv')
-with open(employee_csv_path, mode="r", encoding="utf-8-sig") as csv_file:  # Handle BOM
-    csv_reader = csv.reader(csv_file)
-    for row in csv_reader:
-        employee_data.append({"EMPLOYEE": int(row[0]), "ACCESSCATALYST": int(row[1])})
-
-# Load valid ACCESSCATALYST IDs from latest output
-valid_accesscatalyst_ids = load_valid_accesscatalyst_ids()
-if not valid_accesscatalyst_ids:
-    print("❌ No valid ACCESSCATALYST IDs found in accesscatalyst_data.json. Aborting.")
-    sys.exit(1)
-
-# Generate USERPROFILE entries
-userprofile_data = generate_userprofiles(employee_data, valid_accesscatalyst_ids)
-
-# Use faker for any AI fields if is_dry_run()
-if is_dry_run():
-    # Only use valid ACCESSCATALYST IDs from accesscatalyst_data.json
-    userprofile_data = [{
-        "USERFIELD": fake.random_int(min=1, max=4),  # always int 1-4
-        "ACCESSCATALYST": random.choice(list(valid_accesscatalyst_ids)),
-        "FIELD_VALUE": fake.word()
-    } for _ in range(len(userprofile_data))]
-
-output_dir = get_output_dir()
-os.makedirs(output_dir, exist_ok=True)
-with open(os.path.join(output_dir, "userprofile_data.json"), "w") as f:
-    json.dump(userprofile_data, f, indent=2)
-print(f"✅ Generated {len(userprofile_data)} USERPROFILE entries and saved to '{os.path.join(output_dir, 'userprofile_data.json')}'")
+# EMPLOYEE + ACCESSCATALYST pairs from accesscatalyst_data.json, so every
+# generated ACCESSCATALYST gets profiles whatever the scale profile
+def iter_employee_accesscatalyst_pairs(accesscatalyst_path, start=0, stop=None):
+    for entry in read_rows(accesscatalyst_path, start, stop):
+        yield {"EMPLOYEE": entry.get("EMPLOYEE"), "ACCESSCATALYST": entry.get("ACCESSCATALYST")}
+
+# Worker for utils/sharding.py: profiles for ACCESSCATALYST rows [shard.start, shard.stop)
+def userprofile_shard(shard):
+    pairs = iter_employee_accesscatalyst_pairs(shard.args["accesscatalyst_path"], shard.start, shard.stop)
+    return iter_userprofiles(pairs, key=shard.key)
+
+# Generate and save. Returns (rows, stats); rows is None because profiles are
+# written as the ACCESSCATALYST entries are read.
+def generate(output_dir, dry_run=False, rows=None):
+    os.makedirs(output_dir, exist_ok=True)
+
+    accesscatalyst_path = artifact_path(output_dir, 'accesscatalyst_data.json')
+    if not os.path.exists(accesscatalyst_path):
+        raise ValueError(f"{os.path.basename(accesscatalyst_path)} not found at {accesscatalyst_path}. Aborting.")
+
+    # Generate USERPROFILE entries
+    profiles = sharded_rows("userprofile", count_artifact_rows(accesscatalyst_path), userprofile_shard,
+                            {"accesscatalyst_path": accesscatalyst_path}, output_dir)
+    output_path = os.path.join(output_dir, artifact_filename("userprofile_data.json"))
+    count = write_rows(output_path, profiles)
+    if not count:
+        raise ValueError("No valid ACCESSCATALYST IDs found in accesscatalyst_data.json. Aborting.")
+    print(f"✅ Generated {count} USERPROFILE entries and saved to '{output_path}'")
+    return None, {"rows": count, "output": output_path}
+
+if __name__ == "__main__":
+    try:
+        generate(get_output_dir(), dry_run=is_dry_run())
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
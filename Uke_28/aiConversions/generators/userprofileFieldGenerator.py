@@ -1,12 +1,14 @@
 import csv
-import json
 import os
+import random
 import sys
-import uuid
 import xml.etree.ElementTree as ET
-from faker import Faker
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.counter_rng import derive_key
+from utils.runtime import get_faker, random_uuid, run_seed
+from utils.artifacts import artifact_filename, write_rows
 
-fake = Faker()
+fake = get_faker()
 
 # Helper function to extract default language label from FIELD_NAME
 def extract_default_language(field_name_xml):
@@ -41,19 +43,16 @@ def generate_value(label):
     else:
         return fake.word()
 
-# Main function to generate enriched userprofile field data
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python userprofileFieldGenerator.py <output_dir>")
-        sys.exit(1)
-
-    output_dir = sys.argv[1]
+# Generate enriched userprofile field data. Returns (rows, stats).
+def generate(output_dir, dry_run=False, rows=None):
     os.makedirs(output_dir, exist_ok=True)
 
     csv_path = os.path.join(os.path.dirname(__file__), '../data/input/csv/userprofile_field_info2.csv')
-    json_out = os.path.join(output_dir, 'userprofile_field_data.json')
+    json_out = os.path.join(output_dir, artifact_filename('userprofile_field_data.json'))
 
     fields = []
+    # Own generator, seeded from the run seed (--seed), not the shared global one
+    rng = random.Random(derive_key(run_seed(), "userprofile_field"))
 
     with open(csv_path, newline='', encoding='utf-8-sig') as csvfile:
         reader = csv.reader(csvfile)
@@ -71,15 +70,21 @@ def main():
                 "PURPOSE": None,
                 "GUIDELINES": None,
                 "IGNORE_FROM_AUDIT": 0,
-                "REFERENCE_UUID": str(uuid.uuid4()),
+                "REFERENCE_UUID": str(random_uuid(rng)),
                 "STANDARD_REFERENCE_ID": None
             }
             fields.append(field_data)
 
-    with open(json_out, 'w', encoding='utf-8') as f:
-        json.dump(fields, f, indent=2, ensure_ascii=False)
+    write_rows(json_out, fields, ensure_ascii=False)
 
     print(f"✅ Wrote {len(fields)} USERPROFILE_FIELD rows to {json_out}")
+    return fields, {"rows": len(fields), "output": json_out}
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python userprofileFieldGenerator.py <output_dir>")
+        sys.exit(1)
+    generate(sys.argv[1], dry_run="--dry-run" in sys.argv)
 
 if __name__ == "__main__":
     main()
@@ -1,127 +1,149 @@
 import random
-import json
-from faker import Faker
-from datetime import datetime, timedelta
-import pandas as pd
-from openai import AzureOpenAI
+from datetime import timedelta
 import sys
 import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.artifacts import artifact_path, artifact_filename, count_artifact_rows, read_rows, write_rows
+from utils.counter_rng import derive_key, row_seed
+from utils.llm_client import chat, chat_batch, estimate_chat_batch, backend_for, use_backend
+from utils.runtime import run_seed, run_time
+from utils.scale import MAX_HISTORY_PER_PROFILE, expected_rows
+from utils.sharding import sharded_rows, in_batches
 
-fake = Faker()
+def is_dry_run():
+    return '--dry-run' in sys.argv
 
-# Load USERPROFILE_FIELD and ACCESSCATALYST from userprofile_data.json (bruker korrekt struktur)
-userprofile_path = "../aiConversions/data/output/latest/userprofile_data.json"
-with open(userprofile_path, 'r', encoding='utf-8') as f:
-    userprofiles = json.load(f)
-
-profile_pairs = [(row['USERFIELD'], row['ACCESSCATALYST']) for row in userprofiles]
+def get_output_dir():
+    for arg in sys.argv[1:]:
+        if not arg.startswith("-"):
+            return arg
+    if '--dry-run' in sys.argv:
+        return os.path.join(os.path.dirname(__file__), '../data/output/dryRun')
+    return os.path.join(os.path.dirname(__file__), '../data/output/latest')
 
-# Azure OpenAI setup
-api_key_path = "C:/Users/FredrikVillo/repos/TestDataGeneration/api_key.txt"
-with open(api_key_path, "r") as f:
-    api_key = f.read().strip()
+# Load USERPROFILE_FIELD and ACCESSCATALYST from userprofile_data.json (bruker korrekt struktur)
+def load_profile_pairs(output_dir):
+    return read_profile_pairs(artifact_path(output_dir, 'userprofile_data.json'))
 
-client = AzureOpenAI(
-    api_key=api_key,
-    api_version="2025-01-01-preview",
-    azure_endpoint="https://azureopenai-sin-dev.openai.azure.com"
-)
+def read_profile_pairs(userprofile_path, start=0, stop=None):
+    return ((row['USERFIELD'], row['ACCESSCATALYST']) for row in read_rows(userprofile_path, start, stop))
 
-def generate_reason(field_value):
-    if dry_run:
-        return fake.sentence(nb_words=8)
-    prompt = (
+def reason_prompt(field_value):
+    return (
         f"A user profile field value is now '{field_value}'. "
         "Provide a concise and realistic reason for this value in an HR system. "
         "Avoid verbose explanations and focus on the context of the value. "
         "For example, consider role transitions, skill updates, or personal interest changes."
     )
+
+# Used when the model fails, and for every row once the token budget is spent
+def offline_reason(field_value):
+    return f"Profile value set to '{field_value}' for HR context."
+
+def generate_reason(field_value):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=50,
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
+        return chat(reason_prompt(field_value), max_tokens=50, temperature=0.7)
     except:
-        return f"Profile value set to '{field_value}' for HR context."
+        return offline_reason(field_value)
+
+# Batch mode: one JSON request per LLM_BATCH_SIZE rows, per-row calls only for
+# rows the model left out
+REASON_TASK = (
+    "Each input is the new value of a user profile field in an HR system. "
+    "For each, provide a concise and realistic reason for this value, for example a role "
+    "transition, a skill update or a personal interest change. Keep each reason to one sentence."
+)
+
+def generate_reasons(field_values):
+    return chat_batch(REASON_TASK, field_values, fallback=generate_reason, tokens_per_item=40, offline=offline_reason)
+
+# Pre-flight AI usage for main.py --token-budget
+def estimate_ai_usage(rows=None):
+    # Before userprofile_data.json exists: the scale profile's average history rows
+    return estimate_chat_batch(REASON_TASK, rows or expected_rows("history"), "Azure Fundamentals", tokens_per_item=40,
+                               fallback_prompt=reason_prompt("Azure Fundamentals"), fallback_max_tokens=50)
 
 value_pool = ['Python', 'SQL', 'Excel', 'Java', 'Power BI', 'Running', 'Cycling', 'Photography', 'Hiking', 'AWS Certified', 'PMP', 'Scrum Master', 'Azure Fundamentals']
 
-history_data = []
-dry_run = '--dry-run' in sys.argv
+# Rows built (and sent for AI reasons) at a time, so memory stays flat at any scale
+HISTORY_BATCH_SIZE = 10000
 
-# In dry run: use only a few entries and no AI calls
-def generate_reason(field_value):
-    if dry_run:
-        return fake.sentence(nb_words=8)
-    prompt = (
-        f"A user profile field value is now '{field_value}'. "
-        "Provide a concise and realistic reason for this value in an HR system. "
-        "Avoid verbose explanations and focus on the context of the value. "
-        "For example, consider role transitions, skill updates, or personal interest changes."
-    )
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=50,
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
-    except:
-        return f"Profile value set to '{field_value}' for HR context."
-
-if dry_run:
-    # Only a few entries for dry run
-    sample_pairs = profile_pairs[:2]
-else:
-    sample_pairs = profile_pairs
-for userfield, accesscatalyst in sample_pairs:
-    num_entries = random.randint(1, 3) if not dry_run else 1
-    for _ in range(num_entries):
-        field_value = random.choice(value_pool)
-        valid_from = datetime.now() - timedelta(days=random.randint(500, 1000))
-        changed_date = valid_from + timedelta(days=random.randint(10, 100))
-        valid_to = changed_date + timedelta(days=random.randint(30, 180))
-        ai_reason = generate_reason(field_value)
-        entry = {
-            "USERPROFILE_FIELD": userfield,
-            "ACCESSCATALYST": accesscatalyst,
-            "FIELD_VALUE": field_value,
-            "CHANGED_BY": random.randint(1, 1000),
-            "CHANGED_DATE": changed_date.strftime("%Y-%m-%d %H:%M:%S"),
-            "CHANGED_BY_DEPUTY": random.randint(1, 1000),
-            "CHANGE_TYPE": random.randint(1, 5),
-            "VALID_FROM": valid_from.strftime("%Y-%m-%d"),
-            "APPROVED_BY": random.randint(1, 1000),
-            "VALID_TO": valid_to.strftime("%Y-%m-%d"),
-            "IS_TIMELINE": random.choice([0, 1]),
-            "APPROVED_ON": (changed_date + timedelta(days=random.randint(1, 30))).strftime("%Y-%m-%d %H:%M:%S"),
-            "REASON_FOR_CHANGE_IN_VALUE": ai_reason,
-            "CHANGED_BY_ROLE": random.randint(1, 10),
-            "PRIMARY_RECORD": random.randint(1, 1000),
-            "APPROVED_BY_DEPUTY": random.randint(1, 1000),
-            "CHANGE_FROM_COMMON_TYPE": random.randint(1, 10),
-            "CHANGE_FROM_PROCESS_ID": random.randint(1, 100),
-            "INTEGRATION_ID": 0,
-            "INTEGRATION_VERSION": 0,
-            "INTEGRATION_TYPE": 0,
-            "INTEGRATION_MODE": 0
-        }
-        history_data.append(entry)
-
-# Determine output directory (support --dry-run like loader)
-dry_run = '--dry-run' in sys.argv
-if dry_run:
-    output_dir = os.path.join(os.path.dirname(__file__), '../data/output/dryRun')
-else:
-    output_dir = os.path.join(os.path.dirname(__file__), '../data/output/latest')
-os.makedirs(output_dir, exist_ok=True)
-json_out = os.path.join(output_dir, 'userprofile_history_data.json')
-
-with open(json_out, "w", encoding="utf-8") as f:
-    json.dump(history_data, f, indent=2)
-
-print(f"✅ Generated {len(history_data)} USERPROFILE_HISTORY entries with AI reasons (CORRECTED STRUCTURE) to {json_out}")
+def iter_history_rows(profile_pairs, key=None, now=None):
+    # Entries without AI reasons. A profile's entries are seeded from
+    # (key, ACCESSCATALYST, USERFIELD), so they are the same in any shard
+    key = key if key is not None else derive_key(run_seed(), "history")
+    now = now or run_time()
+    rng = random.Random()
+    for userfield, accesscatalyst in profile_pairs:
+        rng.seed(row_seed(row_seed(key, accesscatalyst), userfield))
+        num_entries = rng.randint(1, MAX_HISTORY_PER_PROFILE)
+        for _ in range(num_entries):
+            field_value = rng.choice(value_pool)
+            valid_from = now - timedelta(days=rng.randint(500, 1000))
+            changed_date = valid_from + timedelta(days=rng.randint(10, 100))
+            valid_to = changed_date + timedelta(days=rng.randint(30, 180))
+            entry = {
+                "USERPROFILE_FIELD": userfield,
+                "ACCESSCATALYST": accesscatalyst,
+                "FIELD_VALUE": field_value,
+                "CHANGED_BY": rng.randint(1, 1000),
+                "CHANGED_DATE": changed_date.strftime("%Y-%m-%d %H:%M:%S"),
+                "CHANGED_BY_DEPUTY": rng.randint(1, 1000),
+                "CHANGE_TYPE": rng.randint(1, 5),
+                "VALID_FROM": valid_from.strftime("%Y-%m-%d"),
+                "APPROVED_BY": rng.randint(1, 1000),
+                "VALID_TO": valid_to.strftime("%Y-%m-%d"),
+                "IS_TIMELINE": rng.choice([0, 1]),
+                "APPROVED_ON": (changed_date + timedelta(days=rng.randint(1, 30))).strftime("%Y-%m-%d %H:%M:%S"),
+                "REASON_FOR_CHANGE_IN_VALUE": None,  # filled in by with_reasons
+                "CHANGED_BY_ROLE": rng.randint(1, 10),
+                "PRIMARY_RECORD": rng.randint(1, 1000),
+                "APPROVED_BY_DEPUTY": rng.randint(1, 1000),
+                "CHANGE_FROM_COMMON_TYPE": rng.randint(1, 10),
+                "CHANGE_FROM_PROCESS_ID": rng.randint(1, 100),
+                "INTEGRATION_ID": 0,
+                "INTEGRATION_VERSION": 0,
+                "INTEGRATION_TYPE": 0,
+                "INTEGRATION_MODE": 0
+            }
+            yield entry
+
+def iter_history(profile_pairs, batch_size=HISTORY_BATCH_SIZE):
+    for batch in in_batches(iter_history_rows(profile_pairs), batch_size):
+        yield from with_reasons(batch)
+
+# Worker for utils/sharding.py: entries for USERPROFILE rows [shard.start, shard.stop)
+def history_shard(shard):
+    pairs = read_profile_pairs(shard.args["userprofile_path"], shard.start, shard.stop)
+    return iter_history_rows(pairs, shard.key, shard.as_of)
+
+def with_reasons(history_data):
+    # AI reasons, requested in batches once the rows exist
+    reasons = generate_reasons([entry["FIELD_VALUE"] for entry in history_data])
+    for entry, reason in zip(history_data, reasons):
+        entry["REASON_FOR_CHANGE_IN_VALUE"] = reason
+    return history_data
+
+def generate_history(profile_pairs):
+    return list(iter_history(profile_pairs))
+
+# Generate and save. Returns (rows, stats); rows is None because entries are
+# written a batch at a time.
+def generate(output_dir, dry_run=False, rows=None):
+    with use_backend(backend_for(dry_run)):
+        os.makedirs(output_dir, exist_ok=True)
+
+        userprofile_path = artifact_path(output_dir, 'userprofile_data.json')
+        entries = sharded_rows("history", count_artifact_rows(userprofile_path), history_shard,
+                               {"userprofile_path": userprofile_path}, output_dir)
+        # AI reasons are filled in here, a batch at a time, as the shards are merged
+        entries = (entry for batch in in_batches(entries, HISTORY_BATCH_SIZE) for entry in with_reasons(batch))
+
+        json_out = os.path.join(output_dir, artifact_filename('userprofile_history_data.json'))
+        count = write_rows(json_out, entries)
+
+        print(f"✅ Generated {count} USERPROFILE_HISTORY entries with AI reasons (CORRECTED STRUCTURE) to {json_out}")
+        return None, {"rows": count, "output": json_out}
+
+if __name__ == "__main__":
+    generate(get_output_dir(), dry_run=is_dry_run())
@@ -6,44 +6,149 @@ import os
 import json
 import datetime
 import shutil
+import threading
+import time
+import importlib
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
-from utils.token_logger import update_pipeline_status, reset_pipeline_status, extract_token_usage
+from utils.token_logger import update_pipeline_status, reset_pipeline_status, load_pipeline_status, extract_token_usage, update_llm_usage, update_token_budget
+from utils.step_cache import compute_step_key, restore_from_cache, store_in_cache, CACHE_DIR
+from utils.artifacts import ARTIFACT_FORMAT_ENV, ARTIFACT_FORMATS, artifact_filename, count_artifact_rows
+from utils.artifact_store import file_digest, add_to_store, write_manifest, promote_latest, collect_garbage
+from utils.runtime import seed_all, run_time, SEED_ENV, AS_OF_ENV
+from utils.sharding import SHARDS_ENV
+from utils import telemetry
+from utils.llm_client import backend_for, get_backend, get_batch_size, get_usage, use_backend
+from utils.token_budget import add_estimates
+from utils.scale import SCALE_ENV, SCALE_FACTOR_ENV, resolve_scale
 
-# List of generator scripts in order
-GENERATOR_SCRIPTS = [
-    "generators/scaletypeGenerator.py",
-    "generators/organizationAiDataGenerator.py",
-    "generators/employeeAiDataGenerator.py",
-    "generators/scaleAiDataGenerator.py",
-    "generators/accessCatalystDataGenerator_ai.py",
-    "generators/userProfileDataGeneratorAi.py",
-    "generators/userprofileFieldGenerator.py",
-    "generators/userprofileHistoryAiGenerator.py"
+# Pipeline steps: the artifact each generator writes, the upstream artifacts it reads
+# and (optionally) the files under data/input/csv it reads. The list order is only
+# used as a tie-breaker; the scheduler runs steps as soon as everything they depend
+# on has been produced.
+PIPELINE_STEPS = [
+    {"script": "generators/scaletypeGenerator.py", "output": "scaletype_data.json", "depends_on": [], "inputs": ["scaletype_info.csv"]},
+    {"script": "generators/organizationAiDataGenerator.py", "output": "organization_data_with_gpt.json", "depends_on": []},
+    {"script": "generators/employeeAiDataGenerator.py", "output": "employee_data_full.json", "depends_on": ["organization_data_with_gpt.json"]},
+    {"script": "generators/scaleAiDataGenerator.py", "output": "scale_data_full.json", "depends_on": []},
+    {"script": "generators/accessCatalystDataGenerator_ai.py", "output": "accesscatalyst_data.json", "depends_on": ["employee_data_full.json"]},
+    {"script": "generators/userProfileDataGeneratorAi.py", "output": "userprofile_data.json", "depends_on": ["accesscatalyst_data.json"]},
+    {"script": "generators/userprofileFieldGenerator.py", "output": "userprofile_field_data.json", "depends_on": [], "inputs": ["userprofile_field_info2.csv"]},
+    {"script": "generators/userprofileHistoryAiGenerator.py", "output": "userprofile_history_data.json", "depends_on": ["userprofile_data.json"]},
 ]
 
+
+def pipeline_steps(artifact_format):
+    # PIPELINE_STEPS with artifact names in the run's format (.json or .jsonl)
+    return [dict(step, output=artifact_filename(step["output"], artifact_format),
+                 depends_on=[artifact_filename(a, artifact_format) for a in step["depends_on"]])
+            for step in PIPELINE_STEPS]
+
+# List of generator scripts in order
+GENERATOR_SCRIPTS = [step["script"] for step in PIPELINE_STEPS]
+
 PYTHON = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".venv", "Scripts", "python.exe")
+if not os.path.exists(PYTHON):
+    PYTHON = sys.executable
 STATUS_PATH = "data/output/pipeline_status.json"
+RUN_STATUS_FILE = "pipeline_status.json"  # per-run copy used by --resume
+EVENTS_FILE = "events.jsonl"  # structured step telemetry, see utils/telemetry.py
+DEFAULT_JOBS = 4
+DEFAULT_KEEP_RUNS = 10  # timestamped run folders kept by the retention policy
+
+print_lock = threading.Lock()
+
+
+def log(message):
+    # Steps run on worker threads; keep each message in one piece
+    with print_lock:
+        print(message)
+
 
+def get_arg_value(flag, default=None):
+    # Supports both "--flag value" and "--flag=value"
+    for idx, arg in enumerate(sys.argv):
+        if arg == flag and idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+        if arg.startswith(flag + "="):
+            return arg.split("=", 1)[1]
+    return default
 
-def get_output_dirs(dry_run=False):
+
+def get_output_dirs(dry_run=False, resume_dir=None):
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     base_dir = os.path.abspath(os.path.dirname(__file__))
     output_root = os.path.join(base_dir, "data", "output")
-    if dry_run:
+    if resume_dir:
+        timestamp_dir = os.path.abspath(resume_dir)
+    elif dry_run:
         timestamp_dir = os.path.join(output_root, "dryRun")
     else:
         timestamp_dir = os.path.join(output_root, timestamp)
     latest_dir = os.path.join(output_root, "latest")
     os.makedirs(timestamp_dir, exist_ok=True)
-    os.makedirs(latest_dir, exist_ok=True)
     return timestamp_dir, latest_dir
 
 
-def run_script(script_path, *script_args):
-    print(f"\n▶ Running {script_path} ...")
+def resolve_dependencies(steps):
+    # Map every step to the set of steps producing the artifacts it reads
+    producers = {step["output"]: step["script"] for step in steps}
+    dependencies = {}
+    for step in steps:
+        missing = [a for a in step["depends_on"] if a not in producers]
+        if missing:
+            raise ValueError(f"{step['script']} depends on unknown artifact(s): {missing}")
+        dependencies[step["script"]] = {producers[a] for a in step["depends_on"]}
+    return dependencies
+
+
+def verify_completed_steps(steps, status, run_dir):
+    """Return the steps of an earlier run whose artifacts can be trusted.
+
+    A step counts as completed when its status entry says success/cached, its
+    artifact still exists with the recorded hash, and every upstream step is
+    completed as well (otherwise its input would be regenerated).
+    """
+    dependencies = resolve_dependencies(steps)
+    recorded = {s["step"]: s for s in status.get("steps", []) if s["status"] in ("success", "cached")}
+    candidates = set()
+    for step in steps:
+        entry = recorded.get(step["script"])
+        path = os.path.join(run_dir, step["output"])
+        if entry and entry.get("sha256") and os.path.exists(path) and file_digest(path) == entry["sha256"]:
+            candidates.add(step["script"])
+        elif entry:
+            log(f"⚠️ {step['output']} is missing or changed; {step['script']} will run again.")
+
+    verified = set()
+    changed = True
+    while changed:
+        changed = False
+        for script in candidates - verified:
+            if dependencies[script] <= verified:
+                verified.add(script)
+                changed = True
+    return verified
+
+
+def critical_path_seconds(steps, dependencies, durations):
+    # Longest chain of step durations through the dependency graph
+    finish = {}
+    def finish_time(script):
+        if script not in finish:
+            parents = dependencies[script]
+            finish[script] = durations.get(script, 0.0) + max((finish_time(p) for p in parents), default=0.0)
+        return finish[script]
+    return max((finish_time(step["script"]) for step in steps), default=0.0)
+
+
+def run_script(script_path, *script_args, env=None):
+    log(f"\n▶ Running {script_path} ...")
     try:
         result = subprocess.run(
             [PYTHON, script_path, *script_args],
+            env=env,
             capture_output=True,
             text=True,
             encoding="utf-8",
@@ -51,42 +156,377 @@ def run_script(script_path, *script_args):
             check=True
         )
         output = (result.stdout or "") + (result.stderr or "")
-        print(output)
-        tokens = extract_token_usage(output)
-        update_pipeline_status(script_path, "success", tokens, STATUS_PATH)
-        return True, tokens
+        log(output)
+        return True, {"tokens": extract_token_usage(output)}
     except subprocess.CalledProcessError as e:
         err_output = (e.stdout or "") + (e.stderr or "")
-        print(f"❌ Error in {script_path}: {err_output}")
-        update_pipeline_status(script_path, "failed", 0, STATUS_PATH)
-        return False, 0
+        log(f"❌ Error in {script_path}: {err_output}")
+        return False, {}
+
+
+def load_generator(script_path):
+    # "generators/scaletypeGenerator.py" -> module generators.scaletypeGenerator
+    module_name = os.path.splitext(script_path)[0].replace("/", ".").replace(os.sep, ".")
+    return importlib.import_module(module_name)
+
+
+def run_in_process(script_path, output_dir, dry_run=False):
+    # Same contract as run_script, but calls the generator's generate() directly so
+    # imports, the Faker instance and the AI client are shared across steps.
+    log(f"\n▶ Running {script_path} (in-process) ...")
+    try:
+        _, stats = load_generator(script_path).generate(output_dir, dry_run=dry_run)
+        return True, stats
+    except Exception as e:
+        log(f"❌ Error in {script_path}: {e}\n{traceback.format_exc()}")
+        return False, {}
+
+
+def count_rows(path):
+    # Fallback for subprocess steps, which cannot hand their stats back;
+    # streamed, large scale profiles do not fit in memory
+    return count_artifact_rows(path)
+
+
+def make_step_runner(execute, steps, output_dir, events, use_cache=True, seed=None, args=None):
+    """Wrap `execute(script) -> (ok, stats)` with the artifact store, step cache and telemetry.
+
+    The returned runner gives (status, tokens, details) where status is
+    "success", "failed" or "cached". details holds the artifact, its hash and
+    the step's aggregated telemetry (rows, AI calls, prompt/completion tokens,
+    cache hits) as read back from the `events` stream, plus process_peak_rss_mb:
+    the run-wide memory high-water mark when the step ended (see
+    telemetry.process_peak_rss_mb), not the step's own peak.
+    Every produced artifact is moved into the blob store and linked back. On a
+    cache hit the stored artifact is hard-linked into output_dir and the
+    generator is not run at all.
+    """
+    steps_by_script = {step["script"]: step for step in steps}
+
+    def finish(script, status, start, rows=None, artifact=None, digest=None):
+        telemetry.emit("step_finished", status=status, rows=rows, seconds=round(time.perf_counter() - start, 3),
+                       process_peak_rss_mb=telemetry.process_peak_rss_mb())
+        totals = events.totals_for(script)
+        details = {key: totals.get(key) for key in ("rows", "ai_calls", "ai_seconds", "prompt_tokens",
+                                                    "completion_tokens", "cache_hits", "ai_cache_hits", "budget_refused",
+                                                    "process_peak_rss_mb")}
+        if artifact:
+            details.update(artifact=artifact, sha256=digest)
+        return status, totals["total_tokens"], details
+
+    def run(script):
+        step = steps_by_script[script]
+        telemetry.set_current_step(script)  # in-process events from this worker belong to this step
+        telemetry.emit("step_started")
+        start = time.perf_counter()
+        key = compute_step_key(step, output_dir, seed, args) if use_cache else None
+        digest = restore_from_cache(step, key, output_dir) if key else None
+        if digest:
+            log(f"♻️ {script} unchanged, reused cached {step['output']}")
+            telemetry.emit("cache_hit", artifact=step["output"])
+            return finish(script, "cached", start, count_rows(os.path.join(output_dir, step["output"])),
+                          step["output"], digest)
+        # Start from a fresh file so we never write through a hard link into the store
+        output_path = os.path.join(output_dir, step["output"])
+        if os.path.lexists(output_path):
+            os.remove(output_path)
+        ok, stats = execute(script)
+        if not ok:
+            return finish(script, "failed", start)
+        rows = stats["rows"] if "rows" in stats else count_rows(output_path)
+        digest = add_to_store(output_path)
+        if key:
+            store_in_cache(step, key, digest)
+        return finish(script, "success", start, rows, step["output"], digest)
+
+    return run
+
+
+def print_event(record, totals):
+    # Live view of the event stream: step boundaries plus AI progress every 100 calls
+    step = os.path.basename(record.get("step") or "pipeline")
+    if record["event"] == "step_finished":
+        log(f"📡 {step}: {record.get('status')}, {totals['rows']} rows, {totals['ai_calls']} AI calls "
+            f"({totals['ai_cache_hits']} answered from cache), "
+            f"{totals['total_tokens']} tokens, process peak RSS so far {record.get('process_peak_rss_mb')} MB")
+    elif record["event"] == "ai_budget_exhausted":
+        log(f"💸 {step}: token budget of {record.get('limit')} spent; "
+            f"remaining AI fields come from cached answers or Faker")
+    elif record["event"] == "ai_call" and totals["ai_calls"] % 100 == 0:
+        log(f"📡 {step}: {totals['ai_calls']} AI calls, {totals['total_tokens']} tokens so far")
+
+
+def estimate_pipeline(steps, skip=()):
+    # Pre-flight AI calls/tokens per step, from each generator's estimate_ai_usage()
+    estimates = {}
+    for step in steps:
+        estimator = getattr(load_generator(step["script"]), "estimate_ai_usage", None)
+        if estimator and step["script"] not in skip:
+            estimates[step["script"]] = estimator()
+    return estimates
+
+
+def print_estimate(estimates, budget=None):
+    print("\n🧮 Pre-flight AI estimate (upper bound: completions at max_tokens, no cache hits)")
+    print(f"{'step':<50} {'calls':>6} {'tokens':>9}")
+    running = 0
+    for script, estimate in estimates.items():
+        running += estimate["total_tokens"]
+        # Pipeline order; parallel steps may spend in a different order
+        over = "  (beyond budget)" if budget is not None and running > budget else ""
+        print(f"{script:<50} {estimate['calls']:>6} {estimate['total_tokens']:>9}{over}")
+    total = add_estimates(*estimates.values())
+    print(f"{'total':<50} {total['calls']:>6} {total['total_tokens']:>9}")
+    if budget is not None:
+        if total["total_tokens"] <= budget:
+            print(f"Fits the token budget of {budget}.")
+        else:
+            print(f"⚠️ Exceeds the token budget of {budget}; AI fields fall back to cached answers or Faker once it is spent.")
+
+
+def budget_report(limit, estimates, status):
+    # Estimated vs. spent tokens per step for pipeline_status.json
+    steps = {}
+    for entry in status["steps"]:
+        steps[entry["step"]] = {"estimated_tokens": estimates.get(entry["step"], {}).get("total_tokens", 0),
+                                "spent": entry.get("tokens", 0),
+                                "ai_calls": entry.get("ai_calls") or 0,
+                                "refused": entry.get("budget_refused") or 0}
+    return {"limit": limit,
+            "estimated_tokens": add_estimates(*estimates.values())["total_tokens"],
+            "spent": sum(step["spent"] for step in steps.values()),
+            "exhausted": any(step["refused"] for step in steps.values()),
+            "steps": steps}
+
+
+def timed_run(runner, script_path):
+    start = time.perf_counter()
+    status, tokens, details = runner(script_path)
+    return status, tokens, details, time.perf_counter() - start
+
+
+def run_pipeline(steps, runner, jobs, status_path=STATUS_PATH, completed=None):
+    """Run every step whose upstream artifacts exist, up to `jobs` at a time.
+
+    `runner(script)` executes one step, see make_step_runner. Steps listed in
+    `completed` (from a resumed run) are treated as already done.
+
+    Returns (ok, total_tokens, durations). A failed step stops its dependents
+    but independent branches still run to completion.
+    """
+    dependencies = resolve_dependencies(steps)
+    completed = set(completed or ())
+    order = [step["script"] for step in steps]
+    pending = [script for script in order if script not in completed]
+    done, failed = set(completed), set()
+    durations = {}
+    total_tokens = 0
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            # Steps whose parents failed can never run
+            for script in list(pending):
+                if dependencies[script] & failed:
+                    pending.remove(script)
+                    failed.add(script)
+                    log(f"⏭ Skipping {script}: upstream step failed.")
+                    update_pipeline_status(script, "skipped", 0, status_path)
+
+            for script in [s for s in pending if dependencies[s] <= done]:
+                pending.remove(script)
+                running[pool.submit(timed_run, runner, script)] = script
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                script = running.pop(future)
+                status, tokens, details, elapsed = future.result()
+                durations[script] = elapsed
+                total_tokens += tokens
+                if status != "failed":
+                    done.add(script)
+                    update_pipeline_status(script, status, tokens, status_path, seconds=round(elapsed, 3), **details)
+                    log(f"✅ {script} finished in {elapsed:.1f}s. Tokens used: {tokens}")
+                else:
+                    failed.add(script)
+                    update_pipeline_status(script, "failed", tokens, status_path, seconds=round(elapsed, 3))
+                    log(f"Pipeline branch stopped at {script} due to error.")
+
+    return not failed, total_tokens, durations
 
 
 def main():
-    reset_pipeline_status(STATUS_PATH)
     dry_run = "--dry-run" in sys.argv
-    timestamp_dir, latest_dir = get_output_dirs(dry_run)
-    total_tokens = 0
-    for script in GENERATOR_SCRIPTS:
+    jobs = max(1, int(get_arg_value("--jobs", DEFAULT_JOBS)))
+    seed = get_arg_value("--seed")
+    seed = int(seed) if seed is not None else None
+    resume_dir = get_arg_value("--resume")
+    completed = set()
+    # Data volume: --scale small|medium|large and/or --scale-factor N, see utils/scale.py
+    try:
+        scale = resolve_scale(get_arg_value("--scale"), get_arg_value("--scale-factor"))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    # Sharded generation of the big tables (utils/sharding.py) and the reference
+    # time generated dates are relative to (default: now)
+    shards = max(1, int(get_arg_value("--shards", 1)))
+    as_of = get_arg_value("--as-of")
+    try:
+        as_of = datetime.datetime.fromisoformat(as_of).isoformat() if as_of else None
+    except ValueError:
+        print(f"❌ --as-of must be an ISO date or date-time, got '{as_of}'")
+        sys.exit(1)
+    # Artifact format: json (indented arrays, default) | jsonl (one row per line)
+    artifact_format = get_arg_value("--artifact-format", "json")
+    if artifact_format not in ARTIFACT_FORMATS:
+        print(f"❌ Unknown artifact format '{artifact_format}' (choose from {', '.join(ARTIFACT_FORMATS)})")
+        sys.exit(1)
+    if get_arg_value("--ai-concurrency"):
+        # Parallel AI requests per step; read by llm_client, inherited by subprocess steps
+        os.environ["LLM_CONCURRENCY"] = get_arg_value("--ai-concurrency")
+    for flag, env in (("--rpm", "LLM_RPM"), ("--tpm", "LLM_TPM")):
+        if get_arg_value(flag):
+            # Deployment quota; AI calls are paced by utils/rate_limiter.py
+            os.environ[env] = get_arg_value(flag)
+    if get_arg_value("--ai-batch-size"):
+        # Rows per batched AI request (1 = one request per row)
+        os.environ["LLM_BATCH_SIZE"] = get_arg_value("--ai-batch-size")
+    if get_arg_value("--ai-cache"):
+        # reuse (default) | refresh | off, see utils/prompt_cache.py
+        os.environ["LLM_CACHE"] = get_arg_value("--ai-cache")
+    if get_arg_value("--ai-cache-variants"):
+        os.environ["LLM_CACHE_VARIANTS"] = get_arg_value("--ai-cache-variants")
+
+    if resume_dir:
+        # Continue an interrupted run in place, keeping the steps that already succeeded
+        if not os.path.isdir(resume_dir):
+            print(f"❌ Run folder not found: {resume_dir}")
+            sys.exit(1)
+        previous = load_pipeline_status(os.path.join(resume_dir, RUN_STATUS_FILE))
+        dry_run = previous.get("dry_run", dry_run)
+        seed = previous.get("seed", seed)
+        scale = previous.get("scale", scale)
+        artifact_format = previous.get("artifact_format", artifact_format)
+        as_of = previous.get("as_of", as_of)
+        steps = pipeline_steps(artifact_format)
+        completed = verify_completed_steps(steps, previous, resume_dir)
+        kept = [s for s in previous.get("steps", []) if s["step"] in completed]
+        print(f"🔁 Resuming {resume_dir}: {len(completed)} of {len(steps)} steps already done.")
+    else:
+        steps = pipeline_steps(artifact_format)
+        kept = []
+    os.environ[ARTIFACT_FORMAT_ENV] = artifact_format  # read by the generators, see utils/artifacts.py
+    os.environ[SHARDS_ENV] = str(shards)
+    # One reference time for every step and shard; only a pinned --as-of is part of the cache key
+    pinned_as_of = as_of
+    as_of = as_of or run_time().isoformat()
+    os.environ[AS_OF_ENV] = as_of
+    if seed is not None:
+        os.environ[SEED_ENV] = str(seed)  # the large-table generators derive their per-row seeds from it
+
+    # Read by the generators through utils/scale.py, inherited by subprocess steps
+    os.environ[SCALE_ENV] = scale["profile"]
+    os.environ[SCALE_FACTOR_ENV] = str(scale["factor"])
+    print(f"📏 Scale {scale['profile']} x{scale['factor']:g}: {scale['organizations']} organizations, "
+          f"{scale['employees']} employees, {scale['scale_titles']} titles")
+
+    if get_arg_value("--llm-backend"):
+        # Also overrides the offline backend (utils/mock_llm.py) a dry run picks for itself
+        os.environ["LLM_BACKEND"] = get_arg_value("--llm-backend")  # azure | mock
+
+    token_budget = get_arg_value("--token-budget")
+    token_budget = int(token_budget) if token_budget is not None else None
+    estimates = {}
+    if token_budget is not None or "--estimate-only" in sys.argv:
+        estimates = estimate_pipeline(steps, skip=completed)
+        print_estimate(estimates, token_budget)
+        if "--estimate-only" in sys.argv:
+            return
+    if token_budget is not None:
+        # Read by llm_client; a resumed run has already spent what its kept steps used
+        os.environ["LLM_TOKEN_BUDGET"] = str(max(0, token_budget - sum(s.get("tokens", 0) for s in kept)))
+
+    timestamp_dir, latest_dir = get_output_dirs(dry_run, resume_dir)
+    status_path = os.path.join(timestamp_dir, RUN_STATUS_FILE)
+    reset_pipeline_status(status_path, keep_steps=kept, run_dir=timestamp_dir, dry_run=dry_run, seed=seed,
+                          scale=scale, artifact_format=artifact_format, shards=shards, as_of=as_of)
+    seed_all(seed)
+
+    events_path = os.path.join(timestamp_dir, EVENTS_FILE)
+    if not resume_dir and os.path.exists(events_path):
+        os.remove(events_path)  # dryRun folder is reused between runs
+    telemetry.set_event_path(events_path)
+    events = telemetry.EventStream(events_path, on_event=print_event).start()
+
+    subprocess_mode = "--subprocess" in sys.argv
+    if subprocess_mode:
+        # Legacy mode: one interpreter per generator
         args = [timestamp_dir]
         if dry_run:
             args.append("--dry-run")
-        ok, tokens = run_script(script, *args)
-        total_tokens += tokens
-        if not ok:
-            print(f"Pipeline stopped at {script} due to error.")
-            break
-        print(f"✅ {script} finished. Tokens used: {tokens}")
-    # After all scripts, copy timestamp_dir to latest_dir (overwrite)
-    if os.path.exists(latest_dir):
-        shutil.rmtree(latest_dir)
-    shutil.copytree(timestamp_dir, latest_dir)
-    print(f"\nPipeline complete. Total tokens used: {total_tokens}")
-    print(f"Output saved to: {timestamp_dir}\nAlso copied to: {latest_dir}")
+        def step_env(script):
+            env = dict(os.environ, **{telemetry.EVENTS_ENV: events_path, telemetry.STEP_ENV: script})
+            if token_budget is not None:
+                # Each interpreter gets what is left of the budget when it starts
+                env["LLM_TOKEN_BUDGET"] = str(max(0, int(os.environ["LLM_TOKEN_BUDGET"]) - events.total("total_tokens")))
+            return env
+        execute = lambda script: run_script(script, *args, env=step_env(script))
+    else:
+        for step in steps:
+            load_generator(step["script"])  # import once, up front
+        execute = lambda script: run_in_process(script, timestamp_dir, dry_run)
+    with use_backend(backend_for(dry_run)):
+        llm_backend = get_backend()  # the backend the steps' generate() will use
+    runner = make_step_runner(execute, steps, timestamp_dir, events,
+                              use_cache="--no-cache" not in sys.argv,
+                              # not --shards: the output does not depend on the shard count. The AI backend,
+                              # budget and batch size do: mock or budget-truncated output must never be
+                              # served to a live run
+                              seed=seed, args={"dry_run": dry_run, "scale": scale, "artifact_format": artifact_format,
+                                                "as_of": pinned_as_of, "llm_backend": llm_backend,
+                                                "token_budget": token_budget, "ai_batch_size": get_batch_size()})
+
+    start = time.perf_counter()
+    ok, session_tokens, durations = run_pipeline(steps, runner, jobs, status_path, completed)
+    wall_time = time.perf_counter() - start
+    events.stop()
+    if not subprocess_mode:
+        update_llm_usage(get_usage(), status_path)  # subprocess steps report through events only
+    if token_budget is not None:
+        update_token_budget(budget_report(token_budget, estimates, load_pipeline_status(status_path)), status_path)
+    critical_path = critical_path_seconds(steps, resolve_dependencies(steps), durations)
+    print(f"\n⏱ Wall time {wall_time:.1f}s with {jobs} job(s) "
+          f"(sum of steps {sum(durations.values()):.1f}s, critical path {critical_path:.1f}s)")
+    shutil.copyfile(status_path, STATUS_PATH)
+    status = load_pipeline_status(status_path)
+    write_manifest(timestamp_dir, {s["artifact"]: s["sha256"] for s in status["steps"] if s.get("sha256")})
+
+    if ok and dry_run:
+        # dryRun is rewritten in place by every dry run, so latest never points at it
+        print(f"\nDry run complete. Total tokens used: {status['total_tokens']} (this session: {session_tokens})")
+        print(f"Output saved to: {timestamp_dir}\n'{latest_dir}' is only moved by real runs "
+              f"(load the dry run with utils/load_generated_data.py --dry-run)")
+    elif ok:
+        # Only a complete run replaces latest, and it is switched in one step
+        promote_latest(timestamp_dir, latest_dir)
+        print(f"\nPipeline complete. Total tokens used: {status['total_tokens']} (this session: {session_tokens})")
+        print(f"Output saved to: {timestamp_dir}\nlatest now points at it: {latest_dir}")
+    else:
+        print(f"\n⚠️ Pipeline incomplete; '{latest_dir}' was left untouched.")
+        print(f"Resume with: python main.py --resume \"{timestamp_dir}\"")
+
+    keep_runs = int(get_arg_value("--keep-runs", DEFAULT_KEEP_RUNS))
+    removed_runs, removed_blobs = collect_garbage(keep_runs, protect=[timestamp_dir], cache_dir=CACHE_DIR)
+    if removed_runs or removed_blobs:
+        print(f"🧹 Retention: removed {removed_runs} old run(s) and {removed_blobs} unreferenced artifact(s).")
     # Print status summary
-    with open(STATUS_PATH) as f:
-        status = json.load(f)
-        print(json.dumps(status, indent=2))
+    print(json.dumps(status, indent=2))
+    if not ok:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,22 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils import llm_client
+from utils.mock_llm import MockLLM
+
+
+@pytest.fixture
+def mock_backend(monkeypatch):
+    """A fresh offline client for llm_client: no prompt cache, quota or token budget."""
+    monkeypatch.setenv("LLM_BACKEND", "mock")
+    monkeypatch.setenv("LLM_CACHE", "off")
+    for name in ("LLM_RPM", "LLM_TPM", "LLM_TOKEN_BUDGET", "LLM_BATCH_SIZE", "LLM_CONCURRENCY"):
+        monkeypatch.delenv(name, raising=False)
+    backend = MockLLM()
+    monkeypatch.setitem(llm_client._clients, "mock", backend)
+    llm_client.reset_usage()
+    yield backend
+    llm_client.reset_usage()
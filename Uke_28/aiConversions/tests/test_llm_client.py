@@ -0,0 +1,72 @@
+import threading
+import time
+from contextlib import closing
+from utils import llm_client
+from utils.llm_client import chat, chat_batch, imap_concurrent
+from utils.mock_llm import mock_reply
+
+TASK = "Describe each city in one sentence."
+INPUTS = ["Oslo", "Bergen", "Trondheim", "Stavanger", "Tromsø"]
+
+
+def describe(city):
+    return chat(f"Describe {city} in one sentence.", max_tokens=30)
+
+
+def test_chat_batch_answers_all_inputs_in_one_request(mock_backend):
+    results = chat_batch(TASK, INPUTS, fallback=describe, batch_size=10)
+
+    assert all(results)
+    assert llm_client.get_usage()["calls"] == 1
+
+
+def test_malformed_batch_answer_falls_back_to_per_item_calls(mock_backend, monkeypatch):
+    def no_json_for_batches(fake, prompt, max_tokens, drop_rate=0.0):
+        if "Inputs:\n" in prompt:
+            return "Sure! Here is one sentence about every city."
+        return mock_reply(fake, prompt, max_tokens, drop_rate)
+    monkeypatch.setattr("utils.mock_llm.mock_reply", no_json_for_batches)
+
+    results = chat_batch(TASK, INPUTS, fallback=describe, batch_size=10)
+
+    # Every batch attempt, then one request per input, answered in input order
+    assert llm_client.get_usage()["calls"] == llm_client.BATCH_ATTEMPTS + len(INPUTS)
+    assert results == [describe(city) for city in INPUTS]
+
+
+def test_missing_batch_items_are_asked_for_again(mock_backend):
+    mock_backend.drop_rate = 0.5
+
+    results = chat_batch(TASK, INPUTS * 4, batch_size=20)
+
+    assert llm_client.get_usage()["calls"] > 1
+    assert sum(value is not None for value in results) > len(INPUTS * 4) // 2
+
+
+def test_imap_concurrent_stops_handing_out_items_once_closed():
+    started, lock = [], threading.Lock()
+
+    def slow_square(x):
+        with lock:
+            started.append(x)
+        time.sleep(0.01)
+        return x * x
+
+    with closing(imap_concurrent(slow_square, range(100), concurrency=4)) as results:
+        first = [next(results) for _ in range(3)]
+
+    assert first == [0, 1, 4]
+    # The three consumed items plus at most one pool's worth already in flight
+    assert len(started) <= 3 + 4
+
+
+def test_department_names_stop_once_enough_are_unique(mock_backend, monkeypatch):
+    from generators.organizationAiDataGenerator import generate_department_names_batch, organization_random
+    monkeypatch.setenv("LLM_CONCURRENCY", "1")
+
+    names = generate_department_names_batch(90, *organization_random(7))
+
+    # 90 names overprovisioned to chunks of 50, 50 and 13: the first two are enough
+    assert len(set(names)) == 90
+    assert llm_client.get_usage()["calls"] == 2
+    assert names == generate_department_names_batch(90, *organization_random(7))
@@ -0,0 +1,83 @@
+import pytest
+from utils import rate_limiter
+from utils.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() only moves monotonic() forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # Like a real clock it moves at least one tick, also for a rounding-error wait
+        self.now += max(seconds, 1e-9)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    return fake
+
+
+def assert_within_rate(grants, per_window, window, burst):
+    # In any span of d seconds at most the bucket plus d seconds of refill is spent,
+    # apart from the oversize part of the span's last grant: a debt paid off after it
+    capacity, rate = max(1.0, per_window * burst), per_window / window
+    for i, (start, _) in enumerate(grants):
+        spent = 0
+        for at, amount in grants[i:]:
+            spent += amount
+            assert spent - max(0, amount - capacity) <= capacity + rate * (at - start) + 1e-6
+
+
+def test_requests_never_exceed_rpm(clock):
+    limiter = RateLimiter(rpm=60, window=60)
+    grants = []
+    for _ in range(200):
+        limiter.acquire(0)
+        grants.append((clock.now, 1))
+
+    assert_within_rate(grants, 60, 60, rate_limiter.DEFAULT_BURST)
+    # 10 up front from the full bucket, then one per second
+    assert clock.now - 1000.0 == pytest.approx(190)
+
+
+def test_tokens_never_exceed_tpm(clock):
+    limiter = RateLimiter(tpm=6000, window=60)
+    sizes = [50, 400, 120, 999, 10, 300] * 20
+    grants = []
+    for tokens in sizes:
+        limiter.acquire(tokens)
+        grants.append((clock.now, tokens))
+
+    assert_within_rate(grants, 6000, 60, rate_limiter.DEFAULT_BURST)
+
+
+def test_oversize_requests_are_charged_in_full(clock):
+    # 3000 tokens is three buckets of a 6000 TPM quota (1000 per 10 s slice)
+    limiter = RateLimiter(tpm=6000, window=60)
+    grants = []
+    for tokens in [3000] * 60 + [1500, 20, 2500] * 10:
+        limiter.acquire(tokens)
+        grants.append((clock.now, tokens))
+
+    assert_within_rate(grants, 6000, 60, rate_limiter.DEFAULT_BURST)
+    # All but the first bucket and the last request's debt came from the 100 tokens/s refill
+    spent = sum(amount for _, amount in grants)
+    assert clock.now - 1000.0 >= (spent - 1000 - 2500) / 100 - 1e-6
+
+
+def test_throttled_holds_callers_until_retry_after(clock):
+    limiter = RateLimiter(rpm=600, window=60)
+    limiter.throttled(retry_after=5)
+
+    waited = limiter.acquire(0)
+
+    assert waited == pytest.approx(5)
+    assert clock.now == pytest.approx(1005)
+    assert limiter.scale == pytest.approx(rate_limiter.DECREASE)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+
+# Always resolve paths relative to the aiConversions folder
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+OUTPUT_ROOT = os.path.join(PROJECT_ROOT, 'data', 'output')
+BLOB_DIR = os.path.join(OUTPUT_ROOT, '.blobs')
+MANIFEST_FILE = 'manifest.json'
+RUN_DIR_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}$')
+
+# Artifacts in run folders are hard links into BLOB_DIR, so a file must be
+# replaced (remove + write) and never rewritten in place.
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def blob_path(digest):
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+
+def remove_path(path):
+    if os.path.islink(path) or os.path.isfile(path):
+        os.remove(path)
+    elif os.path.isdir(path):
+        shutil.rmtree(path)
+
+
+def link_or_copy(src, dst):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)  # e.g. store and run folder on different drives
+
+
+def add_to_store(path):
+    """Move a freshly written artifact into the store and link it back.
+
+    Identical content from earlier runs is stored once; the run folder keeps a
+    hard link to the shared blob. Returns the content digest.
+    """
+    digest = file_digest(path)
+    blob = blob_path(digest)
+    if not os.path.exists(blob):
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        link_or_copy(path, blob)
+    elif not os.path.samefile(path, blob):
+        link_or_copy(blob, path)
+    return digest
+
+
+def link_from_store(digest, dst):
+    # Returns False if the blob has been garbage-collected
+    blob = blob_path(digest)
+    if not os.path.exists(blob):
+        return False
+    link_or_copy(blob, dst)
+    return True
+
+
+def write_manifest(run_dir, artifacts):
+    with open(os.path.join(run_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(artifacts, f, indent=2, sort_keys=True)
+
+
+def read_manifest(run_dir):
+    path = os.path.join(run_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def promote_latest(run_dir, latest_dir):
+    """Point latest at run_dir in one step.
+
+    Uses a symlink swapped with os.replace, which is atomic. Where symlinks are
+    not available (Windows without developer mode) a hard-linked copy is staged
+    next to latest and swapped in by rename, so latest is never half-written.
+    """
+    tmp = latest_dir + '.tmp'
+    remove_path(tmp)
+    try:
+        os.symlink(os.path.relpath(run_dir, os.path.dirname(latest_dir)), tmp, target_is_directory=True)
+        if os.path.isdir(latest_dir) and not os.path.islink(latest_dir):
+            # One-off migration from the old copied folder
+            old = latest_dir + '.old'
+            remove_path(old)
+            os.rename(latest_dir, old)
+            os.replace(tmp, latest_dir)
+            shutil.rmtree(old)
+        else:
+            os.replace(tmp, latest_dir)
+        return
+    except (OSError, NotImplementedError):
+        remove_path(tmp)
+
+    os.makedirs(tmp)
+    for name in os.listdir(run_dir):
+        src = os.path.join(run_dir, name)
+        if os.path.isfile(src):
+            link_or_copy(src, os.path.join(tmp, name))
+    old = latest_dir + '.old'
+    remove_path(old)
+    if os.path.lexists(latest_dir):
+        os.rename(latest_dir, old)
+    os.rename(tmp, latest_dir)
+    remove_path(old)
+
+
+def list_runs():
+    # Timestamped run folders, oldest first
+    if not os.path.isdir(OUTPUT_ROOT):
+        return []
+    return sorted(name for name in os.listdir(OUTPUT_ROOT)
+                  if RUN_DIR_PATTERN.match(name) and os.path.isdir(os.path.join(OUTPUT_ROOT, name)))
+
+
+def collect_garbage(keep_runs, protect=(), cache_dir=None):
+    """Delete all but the newest `keep_runs` run folders and unreferenced blobs.
+
+    Folders in `protect` and whatever latest points at are never deleted. Step
+    cache entries pointing at a deleted blob are dropped with it.
+    """
+    protected = {os.path.realpath(p) for p in protect}
+    protected.add(os.path.realpath(os.path.join(OUTPUT_ROOT, 'latest')))
+    runs = list_runs()
+    expired = runs[:-keep_runs] if keep_runs > 0 else runs
+    removed_runs = 0
+    for name in expired:
+        path = os.path.join(OUTPUT_ROOT, name)
+        if os.path.realpath(path) not in protected:
+            shutil.rmtree(path)
+            removed_runs += 1
+
+    # Everything still on disk that may hold a manifest keeps its blobs alive
+    referenced = set()
+    for name in os.listdir(OUTPUT_ROOT):
+        path = os.path.join(OUTPUT_ROOT, name)
+        if os.path.isdir(path) and not name.startswith('.'):
+            referenced.update(read_manifest(path).values())
+
+    if cache_dir and os.path.isdir(cache_dir):
+        for root, _, files in os.walk(cache_dir):
+            for name in files:
+                entry = os.path.join(root, name)
+                with open(entry) as f:
+                    if f.read().strip() not in referenced:
+                        os.remove(entry)
+
+    removed_blobs = 0
+    if os.path.isdir(BLOB_DIR):
+        for root, _, files in os.walk(BLOB_DIR):
+            for digest in files:
+                if digest not in referenced:
+                    os.remove(os.path.join(root, digest))
+                    removed_blobs += 1
+    return removed_runs, removed_blobs
@@ -0,0 +1,162 @@
+import json
+import os
+import re
+from itertools import islice
+
+# Always resolve paths relative to the aiConversions folder
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+LATEST_DIR = os.path.join(PROJECT_ROOT, 'data', 'output', 'latest')
+
+
+# Table artifacts are JSON arrays (indent 2, the default) or JSON Lines, one
+# compact object per line: main.py --artifact-format, PIPELINE_ARTIFACT_FORMAT.
+# Steps and the pipeline name artifacts in their .json form; artifact_filename()
+# maps that to the run's format, and the readers below accept either.
+ARTIFACT_FORMAT_ENV = "PIPELINE_ARTIFACT_FORMAT"
+ARTIFACT_FORMATS = ("json", "jsonl")
+DEFAULT_ARTIFACT_FORMAT = "json"
+
+
+def get_artifact_format():
+    artifact_format = os.environ.get(ARTIFACT_FORMAT_ENV) or DEFAULT_ARTIFACT_FORMAT
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise ValueError(f"Unknown artifact format '{artifact_format}' (choose from {', '.join(ARTIFACT_FORMATS)})")
+    return artifact_format
+
+
+def artifact_filename(filename, artifact_format=None):
+    """'employee_data_full.json' in the given (default: this run's) artifact format."""
+    base, ext = os.path.splitext(filename)
+    if ext not in (".json", ".jsonl"):
+        return filename
+    return f"{base}.{artifact_format or get_artifact_format()}"
+
+
+def find_artifact(directory, filename, artifact_format=None):
+    """Path of `filename` in directory, preferring the given format; None if neither format exists."""
+    preferred = artifact_filename(filename, artifact_format)
+    for name in dict.fromkeys([preferred] + [artifact_filename(filename, f) for f in ARTIFACT_FORMATS]):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def artifact_path(output_dir, filename):
+    """Return the path of an upstream artifact.
+
+    Prefers the file produced in the current run (output_dir) so steps running
+    in parallel see their parents' fresh output, and falls back to 'latest'
+    when a generator is run on its own. Either artifact format is accepted.
+    """
+    return (find_artifact(output_dir, filename) or find_artifact(LATEST_DIR, filename)
+            or os.path.join(LATEST_DIR, artifact_filename(filename)))
+
+
+def write_rows(path, rows, **dump_kwargs):
+    """Write rows as JSON Lines or a JSON array, by the path's extension. Returns the row count."""
+    if path.endswith(".jsonl"):
+        return write_json_lines(path, rows, **dump_kwargs)
+    return write_json_array(path, rows, **dump_kwargs)
+
+
+def read_rows(path, start=0, stop=None):
+    """Iterate the rows of a JSON Lines or JSON array artifact lazily, optionally only rows [start, stop)."""
+    if path.endswith(".jsonl"):
+        return iter_json_lines(path, start, stop)
+    return islice(iter_json_array(path), start, stop)
+
+
+def count_artifact_rows(path):
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
+    return sum(1 for _ in iter_json_array(path))
+
+
+def write_json_lines(path, rows, **dump_kwargs):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, separators=(",", ":"), **dump_kwargs))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def iter_json_lines(path, start=0, stop=None):
+    # Rows before `start` are skipped without being parsed
+    index = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if stop is not None and index >= stop:
+                return
+            if index >= start:
+                yield json.loads(line)
+            index += 1
+
+
+# JSON array artifacts written and read a row at a time, so tables at the
+# large scale profile never have to fit in memory. The output is the same as
+# json.dump(rows, f, indent=2).
+READ_CHUNK_SIZE = 1024 * 1024
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def write_json_array(path, rows, **dump_kwargs):
+    """Write an iterable of rows as a JSON array with indent 2. Returns the row count."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(",\n  " if count else "[\n  ")
+            f.write(json.dumps(row, indent=2, **dump_kwargs).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "[]")
+    return count
+
+
+def iter_json_array(path, chunk_size=READ_CHUNK_SIZE):
+    """Yield the items of a JSON array file one by one, reading it in chunks."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, pos, eof = "", 0, False
+
+        def skip(chars):
+            # Move past whitespace and any of `chars`, reading on while the buffer runs dry
+            nonlocal buffer, pos, eof
+            while True:
+                pos = _WHITESPACE.match(buffer, pos).end()
+                if pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                    continue
+                if pos < len(buffer) or eof:
+                    return
+                more = f.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + more, 0, not more
+
+        skip("")
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"{path} does not hold a JSON array")
+        pos += 1
+        while True:
+            skip(",")
+            if pos >= len(buffer):
+                raise ValueError(f"{path} ends inside the JSON array")
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                # Only a delimiter proves the item is whole; "12" may continue as "12.5"
+                complete = eof or (end < len(buffer) and buffer[end] in " \t\n\r,]")
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                more = f.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + more, 0, not more
+                continue
+            pos = end
+            yield item
@@ -0,0 +1,551 @@
+import os
+import sys
+import tempfile
+import time
+
+# Always resolve paths relative to the aiConversions folder
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import main as pipeline
+
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark_startup(dry_run=True):
+    """Compare one-interpreter-per-step against in-process generate() calls.
+
+    Both modes run the steps sequentially in PIPELINE_STEPS order (a valid
+    dependency order) into separate temp folders. In-process timings include the
+    one-off import of each generator module, which is the cost the subprocess
+    mode pays on every step.
+    """
+    os.chdir(PROJECT_ROOT)
+    if dry_run:
+        os.environ["LLM_BACKEND"] = "mock"
+    subprocess_dir = tempfile.mkdtemp(prefix="bench_subprocess_")
+    in_process_dir = tempfile.mkdtemp(prefix="bench_in_process_")
+    script_args = [subprocess_dir] + (["--dry-run"] if dry_run else [])
+
+    results = []
+    for step in pipeline.PIPELINE_STEPS:
+        script = step["script"]
+        (ok_sub, _), sub_time = time_call(pipeline.run_script, script, *script_args)
+        (ok_in, _), in_time = time_call(pipeline.run_in_process, script, in_process_dir, dry_run)
+        results.append((script, sub_time, in_time, ok_sub and ok_in))
+
+    print("\nStartup benchmark (seconds)")
+    print(f"{'step':<50} {'subprocess':>11} {'in-process':>11}")
+    for script, sub_time, in_time, ok in results:
+        flag = "" if ok else "  (failed)"
+        print(f"{script:<50} {sub_time:>11.3f} {in_time:>11.3f}{flag}")
+    total_sub = sum(r[1] for r in results)
+    total_in = sum(r[2] for r in results)
+    print(f"{'total':<50} {total_sub:>11.3f} {total_in:>11.3f}")
+    if total_in:
+        print(f"In-process speedup: {total_sub / total_in:.1f}x")
+    return results
+
+
+def benchmark_ai_concurrency(latency=0.2, pairs=20, concurrency=8):
+    """Time per-row AI enrichment serially and on the bounded pool.
+
+    Runs userprofileHistoryAiGenerator.generate_history against the local mock
+    endpoint (utils/mock_llm_server.py) with a fixed latency per request, and
+    checks that every reason came back on the row whose value it was asked for.
+    """
+    from utils.mock_llm_server import start_mock_server
+    from utils.runtime import seed_all
+    server, url = start_mock_server(latency)
+    os.environ["AZURE_OPENAI_ENDPOINT"] = url
+    os.environ["AZURE_OPENAI_API_KEY"] = "mock"
+    os.environ["LLM_CACHE"] = "off"  # measure the round trips, not the prompt cache
+    os.environ["LLM_BATCH_SIZE"] = "1"  # one request per row, as this compares row-level concurrency
+    history = pipeline.load_generator("generators/userprofileHistoryAiGenerator.py")
+    profile_pairs = [(i, i) for i in range(1, pairs + 1)]
+
+    results = []
+    for workers in (1, concurrency):
+        os.environ["LLM_CONCURRENCY"] = str(workers)
+        server.max_in_flight = 0
+        seed_all(0)  # same rows in both runs
+        rows, seconds = time_call(history.generate_history, profile_pairs)
+        in_order = all(row["REASON_FOR_CHANGE_IN_VALUE"] == f"Mock reply for '{row['FIELD_VALUE']}'" for row in rows)
+        results.append((workers, len(rows), seconds, server.max_in_flight, in_order))
+    server.shutdown()
+
+    print(f"\nAI concurrency benchmark ({latency}s mock latency, {pairs} profile pairs)")
+    print(f"{'workers':>8} {'rows':>6} {'seconds':>9} {'max in flight':>14} {'order ok':>9}")
+    for workers, rows, seconds, in_flight, in_order in results:
+        print(f"{workers:>8} {rows:>6} {seconds:>9.2f} {in_flight:>14} {str(in_order):>9}")
+    print(f"Speedup: {results[0][2] / results[1][2]:.1f}x")
+    return results
+
+
+def benchmark_ai_cache(latency=0.2, pairs=20):
+    """Run history enrichment twice against the mock endpoint with an empty prompt cache.
+
+    The first run fills the cache (value_pool has 13 values, each kept in up to
+    LLM_CACHE_VARIANTS variants); the second should be answered from it.
+    """
+    from utils import llm_client
+    from utils.mock_llm_server import start_mock_server
+    from utils.runtime import seed_all
+    server, url = start_mock_server(latency)
+    os.environ["AZURE_OPENAI_ENDPOINT"] = url
+    os.environ["AZURE_OPENAI_API_KEY"] = "mock"
+    os.environ["LLM_CACHE"] = "reuse"
+    os.environ["LLM_BATCH_SIZE"] = "1"
+    os.environ["LLM_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_prompt_cache_"), "responses.sqlite")
+    history = pipeline.load_generator("generators/userprofileHistoryAiGenerator.py")
+    profile_pairs = [(i, i) for i in range(1, pairs + 1)]
+
+    results = []
+    for label in ("cold cache", "warm cache"):
+        llm_client.reset_usage()
+        seed_all(0)
+        rows, seconds = time_call(history.generate_history, profile_pairs)
+        usage = llm_client.get_usage()
+        results.append((label, len(rows), usage["calls"], usage["cache_hits"], usage["total_tokens"], seconds))
+    server.shutdown()
+
+    print(f"\nPrompt cache benchmark ({latency}s mock latency, {pairs} profile pairs)")
+    print(f"{'run':<12} {'rows':>6} {'AI calls':>9} {'hits':>6} {'tokens':>7} {'seconds':>8}")
+    for label, rows, calls, hits, tokens, seconds in results:
+        print(f"{label:<12} {rows:>6} {calls:>9} {hits:>6} {tokens:>7} {seconds:>8.2f}")
+    return results
+
+
+def benchmark_offline(latency=0.05, error_rate=0.0):
+    """Run every step in-process against the offline mock backend.
+
+    Same code path and volume as a live run; only the model is simulated with
+    a fixed latency and optional injected errors. Reports time, AI calls and
+    retries per step.
+    """
+    from utils import llm_client
+    from utils.runtime import seed_all
+    os.chdir(PROJECT_ROOT)
+    os.environ.update(LLM_BACKEND="mock", LLM_CACHE="off", LLM_MOCK_LATENCY=str(latency),
+                      LLM_MOCK_ERROR_RATE=str(error_rate))
+    llm_client.RETRY_BASE_DELAY = 0.01  # injected errors should not turn into sleep time
+    output_dir = tempfile.mkdtemp(prefix="bench_offline_")
+    seed_all(0)
+
+    results = []
+    for step in pipeline.PIPELINE_STEPS:
+        llm_client.reset_usage()
+        (ok, stats), seconds = time_call(pipeline.run_in_process, step["script"], output_dir)
+        usage = llm_client.get_usage()
+        results.append((step["script"], stats.get("rows"), usage["calls"], usage["retries"], seconds, ok))
+
+    print(f"\nOffline pipeline benchmark ({latency}s mock latency, error rate {error_rate})")
+    print(f"{'step':<50} {'rows':>6} {'AI calls':>9} {'retries':>8} {'seconds':>8}")
+    for script, rows, calls, retries, seconds, ok in results:
+        flag = "" if ok else "  (failed)"
+        print(f"{script:<50} {rows or 0:>6} {calls:>9} {retries:>8} {seconds:>8.2f}{flag}")
+    print(f"{'total':<50} {'':>6} {sum(r[2] for r in results):>9} {sum(r[3] for r in results):>8} "
+          f"{sum(r[4] for r in results):>8.2f}")
+    return results
+
+
+def benchmark_ai_batch(pairs=1000, batch_size=50, drop_rate=0.02):
+    """Compare per-row and batched history reasons on the offline mock backend.
+
+    Counts requests and prompt tokens for the same rows; the mock leaves out
+    `drop_rate` of the batch items so the re-asking is part of the numbers.
+    """
+    from utils import llm_client
+    from utils.runtime import seed_all
+    os.environ.update(LLM_BACKEND="mock", LLM_CACHE="off", LLM_MOCK_DROP_RATE=str(drop_rate))
+    history = pipeline.load_generator("generators/userprofileHistoryAiGenerator.py")
+    profile_pairs = [(i, i) for i in range(1, pairs + 1)]
+
+    results = []
+    for size in (1, batch_size):
+        os.environ["LLM_BATCH_SIZE"] = str(size)
+        llm_client.reset_usage()
+        seed_all(0)
+        rows, seconds = time_call(history.generate_history, profile_pairs)
+        usage = llm_client.get_usage()
+        filled = sum(1 for row in rows if row["REASON_FOR_CHANGE_IN_VALUE"])
+        results.append((size, len(rows), filled, usage["calls"], usage["prompt_tokens"], usage["completion_tokens"], seconds))
+
+    print(f"\nBatched prompting benchmark ({pairs} profile pairs, mock drop rate {drop_rate})")
+    print(f"{'batch':>6} {'rows':>6} {'filled':>7} {'requests':>9} {'prompt tok':>11} {'compl. tok':>11} {'seconds':>8}")
+    for size, rows, filled, calls, prompt_tokens, completion_tokens, seconds in results:
+        print(f"{size:>6} {rows:>6} {filled:>7} {calls:>9} {prompt_tokens:>11} {completion_tokens:>11} {seconds:>8.2f}")
+    print(f"Requests cut {results[0][3] / results[1][3]:.1f}x, prompt tokens cut {results[0][4] / results[1][4]:.1f}x")
+    return results
+
+
+def benchmark_rate_limit(pairs=30, rpm=20, window=2.0, concurrency=8):
+    """Run history enrichment against the mock endpoint with a quota, with and without pacing.
+
+    The mock server enforces `rpm` requests per `window` seconds (a short
+    stand-in for Azure's minute) and answers 429 beyond it. Without the limiter
+    the pool bursts into the quota and lives off Retry-After; with LLM_RPM set
+    the calls are spread out up front.
+    """
+    from utils import llm_client
+    from utils.mock_llm_server import start_mock_server
+    from utils.runtime import seed_all
+    os.environ.update(LLM_CACHE="off", LLM_BATCH_SIZE="1", LLM_CONCURRENCY=str(concurrency),
+                      LLM_QUOTA_WINDOW=str(window), AZURE_OPENAI_API_KEY="mock")
+    history = pipeline.load_generator("generators/userprofileHistoryAiGenerator.py")
+    profile_pairs = [(i, i) for i in range(1, pairs + 1)]
+
+    results = []
+    for label, limit in (("no limiter", None), ("limiter", rpm)):
+        server, url = start_mock_server(0.05, rpm=rpm, window=window)
+        os.environ["AZURE_OPENAI_ENDPOINT"] = url
+        llm_client._client = llm_client._rate_limiter = None  # new endpoint, new limiter state
+        if limit:
+            os.environ["LLM_RPM"] = str(limit)
+        else:
+            os.environ.pop("LLM_RPM", None)
+        llm_client.reset_usage()
+        seed_all(0)
+        rows, seconds = time_call(history.generate_history, profile_pairs)
+        results.append((label, len(rows), server.requests, server.throttled, seconds))
+        server.shutdown()
+
+    print(f"\nRate limit benchmark (quota {rpm} requests per {window}s, {concurrency} workers)")
+    print(f"{'run':<12} {'rows':>6} {'requests':>9} {'429s':>6} {'seconds':>8} {'req/window':>11}")
+    for label, rows, requests, throttled, seconds in results:
+        print(f"{label:<12} {rows:>6} {requests:>9} {throttled:>6} {seconds:>8.2f} {requests / seconds * window:>11.1f}")
+    return results
+
+
+def benchmark_departments(latency=0.3, counts=(100, 1000, 10000)):
+    """Time department-name generation for growing organization counts on the offline mock.
+
+    Names come in parallel chunks of DEPARTMENT_CHUNK_SIZE, so the time should
+    grow with chunks / LLM_CONCURRENCY round trips instead of one huge reply.
+    """
+    from utils import llm_client
+    from utils.runtime import seed_all
+    os.environ.update(LLM_BACKEND="mock", LLM_CACHE="off", LLM_MOCK_LATENCY=str(latency))
+    organization = pipeline.load_generator("generators/organizationAiDataGenerator.py")
+
+    results = []
+    for n in counts:
+        llm_client.reset_usage()
+        seed_all(0)
+        names, seconds = time_call(organization.generate_department_names_batch, n)
+        unique = len({organization.normalize_department_name(name.rsplit(" ", 1)[0]) for name in names})
+        results.append((n, len(names), unique, llm_client.get_usage()["calls"], seconds))
+
+    print(f"\nDepartment names benchmark ({latency}s mock latency, {llm_client.get_concurrency()} workers)")
+    print(f"{'orgs':>7} {'names':>7} {'unique':>7} {'requests':>9} {'seconds':>8}")
+    for n, count, unique, calls, seconds in results:
+        print(f"{n:>7} {count:>7} {unique:>7} {calls:>9} {seconds:>8.2f}")
+    return results
+
+
+def benchmark_employees(rows=1_000_000, legacy_rows=5000):
+    """Compare row-at-a-time and columnar EMPLOYEE generation (no AI fields).
+
+    The row-at-a-time loop is timed on `legacy_rows` rows, enough for a stable
+    rate; the columnar engine on all `rows`, consuming its batches as they come
+    so memory stays at one batch.
+    """
+    import random
+    from datetime import timedelta
+    from faker import Faker
+    from utils.runtime import run_time, seed_all
+    employee = pipeline.load_generator("generators/employeeAiDataGenerator.py")
+    organization_ids = list(range(1, 101))
+
+    # The old row-at-a-time loop (no AI fields): a Faker call per cell
+    def row_at_a_time(num_employees):
+        fake, rng = Faker(), random.Random(0)
+        fake.seed_instance(0)
+        now = run_time()
+        today = now.date()
+        employees = []
+        for emp_id in range(1, num_employees + 1):
+            birth_date = fake.date_of_birth(minimum_age=22, maximum_age=65)
+            birth_date_str = birth_date.strftime("%Y-%m-%d")
+            min_employment_date = birth_date + timedelta(days=365 * 18)
+            employment_date = fake.date_between_dates(date_start=min_employment_date, date_end=today)
+            employment_date_str = employment_date.strftime("%Y-%m-%d")
+
+            # Ensure manager is not self
+            manager_id = rng.randint(1, num_employees)
+            while manager_id == emp_id:
+                manager_id = rng.randint(1, num_employees)
+
+            row = {
+                "EMPLOYEE": emp_id,
+                "ORGANIZATION": rng.choice(organization_ids),
+                "EMPLOYEENO": f"EMP{emp_id:05d}",
+                "SURNAME": fake.last_name(),
+                "GIVENNAME": fake.first_name(),
+                "MIDDLENAME": fake.first_name(),
+                "COMMONNAME": fake.first_name(),
+                "MAIL": fake.email(),
+                "PRIVATEMAIL": fake.email(),
+                "BIRTHDATE": birth_date_str,
+                "EMPLOYMENTDATE": employment_date_str,
+                "EMPLOYMENTEND": None,
+                "ADDRESS1": fake.street_address(),
+                "ADDRESS2": fake.secondary_address(),
+                "ADDRESS3": None,
+                "ADDRESS4": None,
+                "ZIPCODE": fake.postcode(),
+                "NICKNAME": fake.first_name(),
+                "USERID": f"user{emp_id}",
+                "PASSWORD": fake.password(),
+                "BUILDINGNAME": fake.word(),
+                "EMPLOYEETYPE": rng.choice(employee.scale_employeetype_ids),
+                "PHOTOURL": fake.image_url(),
+                "TITLE": rng.choice(employee.scale_title_ids()),
+                "PROFILE_TITLE": fake.job(),
+                "MANAGER": manager_id,
+                "TEMPMANAGER": None,
+                "ONVACATION": rng.randint(0,1),
+                "LASTLOGON": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "LASTUSEDOBJECT": None,
+                "LASTUSEDACTIVITY": None,
+                "MODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "MODIFIEDBY": fake.user_name(),
+                "MODIFICATIONNO": rng.randint(1, 10),
+                "SECRETARY": None,
+                "SUPERVISOR": None,
+                "SECONDARYORG": None,
+                "PRIMARYMANAGER": None,
+                "SECONDARYMANAGER": None,
+                "HRMANAGER": None,
+                "DIRECTORYDN": f"CN={fake.name()},OU=People,DC=example,DC=com",
+                "DIRECTORYMODIFIED": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "PHOTO_ID": None,
+                "JOB_DESCRIPTION": fake.job(),
+                "POSITION_LEVEL": rng.choice(employee.scale_position_level_ids),
+                "GENDER": rng.choice(employee.scale_gender_ids),
+                "HOMEADDRESS": fake.address(),
+                "DATEOFBIRTH": birth_date_str,
+                "SOCIALSECURITYNUMBER": fake.ssn(),
+                "NATIONALITY": rng.choice(employee.nationality_ids),
+                "COUNTRY": rng.choice(employee.country_ids),
+                "MARITALSTATUS": rng.choice(employee.marital_status_ids),
+                "POSITION": rng.randint(1, 5),
+                "MOBILITY": rng.randint(0, 1),
+                "FLIGHT_RISK": rng.randint(0, 1),
+                "CAREER_AMBITIONS": rng.randint(1, 3),
+                "CAREER_PLANNING_TOPICS": None,
+                "DEPARTMENTMANAGER": None,
+                "BASIC_SALARY": str(fake.random_number(digits=5)),
+                "POSITION_CODE": fake.lexify(text='POS????'),
+                "MARKET_VALUE": str(fake.random_number(digits=5)),
+                "HIRING_DATE": employment_date_str,
+                "TERMINATION_DATE": None,
+                "WORKING_HOURS": str(rng.randint(20, 40)),
+                "STATUS": 1,
+                "TYPE_OF_PAY": 1,
+                "WEEKLY_WORK_HOURS": rng.randint(20, 40),
+                "GUID": str(fake.uuid4())
+            }
+
+            employees.append(row)
+        return employees
+
+    _, legacy_seconds = time_call(row_at_a_time, legacy_rows)
+
+    def consume():
+        return sum(len(batch) for batch in employee.iter_employee_batches(rows, organization_ids))
+
+    seed_all(0)
+    columnar_rows, columnar_seconds = time_call(consume)
+
+    legacy_rate, columnar_rate = legacy_rows / legacy_seconds, columnar_rows / columnar_seconds
+    print("\nEMPLOYEE generation benchmark")
+    print(f"{'engine':<14} {'rows':>9} {'seconds':>9} {'rows/s':>10}")
+    print(f"{'row-at-a-time':<14} {legacy_rows:>9} {legacy_seconds:>9.2f} {legacy_rate:>10.0f}")
+    print(f"{'columnar':<14} {columnar_rows:>9} {columnar_seconds:>9.2f} {columnar_rate:>10.0f}")
+    print(f"Speedup: {columnar_rate / legacy_rate:.1f}x, process peak RSS {pipeline.telemetry.process_peak_rss_mb()} MB")
+    return legacy_rate, columnar_rate
+
+
+def benchmark_shards(rows=100_000, shards=None):
+    """Time ACCESSCATALYST generation (CPU-bound Faker per row) with 1 and `shards` shards.
+
+    Runs both twice with the same seed and checks that every run gives
+    byte-identical output, whatever the shard count. Speedup is bounded by the
+    machine's cores.
+    """
+    import hashlib
+    from utils.artifacts import write_rows
+    from utils.runtime import SEED_ENV, AS_OF_ENV
+    from utils.sharding import sharded_rows
+    employee = pipeline.load_generator("generators/employeeAiDataGenerator.py")
+    access = pipeline.load_generator("generators/accessCatalystDataGenerator_ai.py")
+    shards = shards or os.cpu_count() or 1
+    os.environ.setdefault(SEED_ENV, "0")
+    os.environ.setdefault(AS_OF_ENV, "2025-01-01T00:00:00")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        employee_path = os.path.join(tmp, "employee_data_full.jsonl")
+        write_rows(employee_path, (row for batch in employee.iter_employee_batches(rows, [1]) for row in batch))
+
+        def run(count):
+            sha = hashlib.sha256()
+            for row in sharded_rows("accesscatalyst", rows, access.accesscatalyst_shard,
+                                    {"employee_path": employee_path}, tmp, shards=count):
+                sha.update(repr(row).encode("utf-8"))
+            return sha.hexdigest()
+
+        results, reference = [], None
+        for count in dict.fromkeys([1, shards]):
+            (first, seconds), (second, _) = time_call(run, count), time_call(run, count)
+            reference = reference or first
+            results.append((count, seconds, first == second == reference))
+
+    print(f"\nSharded ACCESSCATALYST generation, {rows} rows on {os.cpu_count()} core(s)")
+    print(f"{'shards':>6} {'seconds':>9} {'rows/s':>10} {'reproducible':>13}")
+    for count, seconds, same in results:
+        print(f"{count:>6} {seconds:>9.2f} {rows / seconds:>10.0f} {str(same):>13}")
+    return results
+
+
+def benchmark_loader(rows=200_000, batch_sizes=(1000, 5000, 20000)):
+    """Compare the old row-by-row INSERT loop with load_generated_data.bulk_insert on SQLite.
+
+    Loads `rows` USERPROFILE_HISTORY rows into temporary SQLite databases with
+    the schema from sql/automated_test.sql (utils/db_backend.py): once
+    with one execute per row (rebuilding the statement each time, like the old
+    loader), then with bulk_insert at each batch size.
+    """
+    from utils import load_generated_data as loader
+    from utils.db_backend import SqliteBackend
+    history = pipeline.load_generator("generators/userprofileHistoryAiGenerator.py")
+    columns = [col for col in loader.table_columns_dict['USERPROFILE_HISTORY']
+               if col not in ('USERPROFILE_HISTORY_ID', 'RECORD_NUMBER')]
+    pairs = [(1 + i % 4, 1 + i) for i in range(rows)]
+    data = list(history.iter_history_rows(pairs))[:rows]
+
+    def fresh_db(tmp, name):
+        backend = SqliteBackend(os.path.join(tmp, name))
+        conn = backend.connect()
+        backend.create_schema(conn)
+        return backend, conn
+
+    def row_by_row(conn):
+        cursor = conn.cursor()
+        for row in data:
+            placeholders = ', '.join(['?'] * len(columns))
+            col_list = ', '.join(columns)
+            cursor.execute(f"INSERT INTO USERPROFILE_HISTORY ({col_list}) VALUES ({placeholders})",
+                           [row.get(col) for col in columns])
+        conn.commit()
+        return len(data)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        backend, conn = fresh_db(tmp, "row.db")
+        _, seconds = time_call(row_by_row, conn)
+        results.append(("row-by-row", seconds))
+        conn.close()
+        for size in batch_sizes:
+            backend, conn = fresh_db(tmp, f"bulk{size}.db")
+            _, seconds = time_call(loader.bulk_insert, conn, 'USERPROFILE_HISTORY', columns, data, size, None, backend)
+            results.append((f"batch {size}", seconds))
+            conn.close()
+
+    print(f"\nLoader benchmark, {len(data)} USERPROFILE_HISTORY rows into SQLite")
+    print(f"{'mode':<12} {'seconds':>9} {'rows/s':>10}")
+    for mode, seconds in results:
+        print(f"{mode:<12} {seconds:>9.2f} {len(data) / seconds:>10.0f}")
+    return results
+
+
+def benchmark_reset(rows=200_000):
+    """Time clean_database (DELETE) against fast_reset_database + restore_database on SQLite.
+
+    Each mode gets a temporary database holding `rows` USERPROFILE_HISTORY
+    rows with an index on ACCESSCATALYST (standing in for SQL Server's
+    non-clustered indexes), resets it and loads the rows again.
+    """
+    from utils import load_generated_data as loader
+    from utils.db_backend import SqliteBackend
+    history = pipeline.load_generator("generators/userprofileHistoryAiGenerator.py")
+    columns = [col for col in loader.table_columns_dict['USERPROFILE_HISTORY']
+               if col not in ('USERPROFILE_HISTORY_ID', 'RECORD_NUMBER')]
+    pairs = [(1 + i % 4, 1 + i) for i in range(rows)]
+    data = list(history.iter_history_rows(pairs))[:rows]
+
+    def filled_db(tmp, name):
+        backend = SqliteBackend(os.path.join(tmp, name))
+        conn = backend.connect()
+        backend.create_schema(conn)
+        conn.execute("CREATE INDEX IX_USERPROFILE_HISTORY_ACCESSCATALYST ON USERPROFILE_HISTORY (ACCESSCATALYST)")
+        loader.bulk_insert(conn, 'USERPROFILE_HISTORY', columns, data, None, None, backend)
+        return backend, conn
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        backend, conn = filled_db(tmp, "delete.db")
+        _, reset = time_call(loader.clean_database, conn.cursor(), backend)
+        _, load = time_call(loader.bulk_insert, conn, 'USERPROFILE_HISTORY', columns, data, None, None, backend)
+        results.append(("delete", reset, load, 0.0))
+        conn.close()
+
+        backend, conn = filled_db(tmp, "fast.db")
+        state, reset = time_call(loader.fast_reset_database, conn, backend)
+        _, load = time_call(loader.bulk_insert, conn, 'USERPROFILE_HISTORY', columns, data, None, None, backend)
+        _, restore = time_call(loader.restore_database, conn, state, backend)
+        results.append(("fast", reset, load, restore))
+        conn.close()
+
+    print(f"\nReset benchmark, {len(data)} USERPROFILE_HISTORY rows in SQLite")
+    print(f"{'mode':<8} {'reset':>8} {'load':>8} {'restore':>8} {'total':>8}")
+    for mode, reset, load, restore in results:
+        print(f"{mode:<8} {reset:>8.2f} {load:>8.2f} {restore:>8.2f} {reset + load + restore:>8.2f}")
+    return results
+
+BENCHMARKS = {
+    "startup": lambda: benchmark_startup(dry_run="--live" not in sys.argv),
+    "ai_concurrency": lambda: benchmark_ai_concurrency(
+        latency=float(pipeline.get_arg_value("--latency", 0.2)),
+        concurrency=int(pipeline.get_arg_value("--ai-concurrency", 8))),
+    "offline": lambda: benchmark_offline(
+        latency=float(pipeline.get_arg_value("--latency", 0.05)),
+        error_rate=float(pipeline.get_arg_value("--error-rate", 0.0))),
+    "ai_batch": lambda: benchmark_ai_batch(
+        batch_size=int(pipeline.get_arg_value("--ai-batch-size", 50)),
+        drop_rate=float(pipeline.get_arg_value("--drop-rate", 0.02))),
+    "ai_cache": lambda: benchmark_ai_cache(latency=float(pipeline.get_arg_value("--latency", 0.2))),
+    "rate_limit": lambda: benchmark_rate_limit(
+        rpm=int(pipeline.get_arg_value("--rpm", 20)),
+        window=float(pipeline.get_arg_value("--window", 2.0))),
+    "departments": lambda: benchmark_departments(latency=float(pipeline.get_arg_value("--latency", 0.3))),
+    "employees": lambda: benchmark_employees(
+        rows=int(pipeline.get_arg_value("--rows", 1_000_000)),
+        legacy_rows=int(pipeline.get_arg_value("--legacy-rows", 5000))),
+    "shards": lambda: benchmark_shards(
+        rows=int(pipeline.get_arg_value("--rows", 100_000)),
+        shards=int(pipeline.get_arg_value("--shards", 0)) or None),
+    "loader": lambda: benchmark_loader(rows=int(pipeline.get_arg_value("--rows", 200_000))),
+    "reset": lambda: benchmark_reset(rows=int(pipeline.get_arg_value("--rows", 200_000))),
+}
+
+# Usage: python utils/benchmark.py startup [--live]
+#        python utils/benchmark.py ai_concurrency [--latency 0.2] [--ai-concurrency 8]
+#        python utils/benchmark.py ai_cache [--latency 0.2]
+#        python utils/benchmark.py offline [--latency 0.05] [--error-rate 0.0]
+#        python utils/benchmark.py ai_batch [--ai-batch-size 50] [--drop-rate 0.02]
+#        python utils/benchmark.py rate_limit [--rpm 20] [--window 2]
+#        python utils/benchmark.py departments [--latency 0.3]
+#        python utils/benchmark.py employees [--rows 1000000] [--legacy-rows 5000]
+#        python utils/benchmark.py shards [--rows 100000] [--shards <cores>]
+#        python utils/benchmark.py loader [--rows 200000]
+#        python utils/benchmark.py reset [--rows 200000]
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python utils/benchmark.py <{'|'.join(BENCHMARKS)}> [--live]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]]()
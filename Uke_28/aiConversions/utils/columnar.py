@@ -0,0 +1,97 @@
+import copy
+from itertools import repeat
+import numpy as np
+from utils.counter_rng import derive_key
+
+# Building blocks for generating a table a column at a time with NumPy instead
+# of one Python call per cell. Numbers, categories, flags, dates and random
+# strings are drawn as arrays. Faker only fills bounded pools of text values
+# that rows sample by index, so a million rows cost the same Faker time as a
+# thousand. With a utils.counter_rng.CounterRNG as `rng` (the employee table)
+# a row's values do not depend on which batch it is generated in.
+TEXT_POOL_SIZE = 1000
+HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+UUID_HEX_POSITIONS = [i for i in range(36) if i not in (8, 13, 18, 23)]
+
+
+class TextPools:
+    """Faker values per provider method, built on first use and sampled by index.
+
+    With `seed`, Faker is reseeded from (seed, method) before each pool is
+    built, so a pool's values do not depend on the order pools are first used.
+    """
+
+    def __init__(self, fake, rng, size=TEXT_POOL_SIZE, seed=None):
+        self.fake = fake
+        self.rng = rng
+        self.size = max(1, size)
+        self.seed = seed
+        self.pools = {}
+
+    def with_rng(self, rng):
+        # Same pools, sampled with another generator (one per batch for counter-based rows)
+        view = copy.copy(self)
+        view.rng = rng
+        return view
+
+    def column(self, method, n, **kwargs):
+        key = (method, tuple(sorted(kwargs.items())))
+        pool = self.pools.get(key)
+        if pool is None:
+            if self.seed is not None:
+                self.fake.seed_instance(derive_key(self.seed, *key))
+            make = getattr(self.fake, method)
+            pool = self.pools[key] = np.array([make(**kwargs) for _ in range(self.size)], dtype=object)
+        return pool[self.rng.integers(0, len(pool), n)]
+
+
+def years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - years, day=28)
+
+
+def random_dates(rng, low, high, n):
+    """Uniform dates between low and high (inclusive); either bound may be an array."""
+    low = np.asarray(low, dtype="datetime64[D]")
+    high = np.asarray(high, dtype="datetime64[D]")
+    span = (high - low).astype(np.int64) + 1
+    return low + (rng.random(n) * span).astype(np.int64)
+
+
+def date_strings(dates):
+    return np.datetime_as_string(dates, unit="D")
+
+
+def days(n):
+    return np.timedelta64(n, "D")
+
+
+def random_strings(rng, n, length, alphabet):
+    codes = np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)
+    return codes[rng.integers(0, len(codes), (n, length))].view(f"S{length}").ravel().astype(str)
+
+
+def uuid4_strings(rng, n):
+    """Random version 4 UUIDs in canonical form, without a uuid.UUID per row."""
+    data = rng.integers(0, 256, (n, 16), dtype=np.uint8)
+    data[:, 6] = (data[:, 6] & 0x0F) | 0x40
+    data[:, 8] = (data[:, 8] & 0x3F) | 0x80
+    nibbles = np.empty((n, 32), dtype=np.uint8)
+    nibbles[:, 0::2] = data >> 4
+    nibbles[:, 1::2] = data & 0x0F
+    chars = np.full((n, 36), ord("-"), dtype=np.uint8)
+    chars[:, UUID_HEX_POSITIONS] = HEX_DIGITS[nibbles]
+    return chars.view("S36").ravel().astype(str)
+
+
+def rows_from_columns(columns, n):
+    """Turn {name: array, list or constant} into n row dicts with native Python values, in column order."""
+    names = list(columns)
+    values = []
+    for column in columns.values():
+        if isinstance(column, np.ndarray):
+            column = column.tolist()
+        values.append(column if isinstance(column, list) else repeat(column, n))
+    return [dict(zip(names, row)) for row in zip(*values)]
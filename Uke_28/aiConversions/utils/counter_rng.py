@@ -0,0 +1,76 @@
+import hashlib
+import numpy as np
+
+# Counter-based random numbers: every value is a pure function of a table key,
+# the row number and which draw it is, instead of the next value of a stream.
+# Any row can therefore be rebuilt on its own in O(1) (employee_row(seed, i)),
+# and batches, shards and slices come out the same wherever they are cut.
+#
+# The mixing function is SplitMix64's finalizer, which is plenty for test
+# data and vectorizes in NumPy.
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK = 0xFFFFFFFFFFFFFFFF
+DRAWS_PER_CALL = 1 << 20  # values one row may take from a single call
+
+
+def derive_key(*parts):
+    """64-bit key for ("run seed", "table", ...), stable across processes and platforms."""
+    digest = hashlib.sha256(":".join(map(str, parts)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def splitmix64(x):
+    x = (x + _GOLDEN) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+def row_seed(key, row, stream=0):
+    # Seed for one row's random.Random / Faker; `stream` separates several generators per row
+    return splitmix64(splitmix64(key ^ splitmix64(row)) ^ stream)
+
+
+def mix64(x):
+    """splitmix64 over a uint64 array (wrapping arithmetic)."""
+    with np.errstate(over="ignore"):
+        x = x + np.uint64(_GOLDEN)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+class CounterRNG:
+    """The parts of np.random.Generator the columnar engine uses, for one batch of rows.
+
+    Call k on this object draws value j of row r as mix(key, r, k, j). Every
+    batch makes the same sequence of calls, so a row gets the same values in
+    any batch it lands in. `size` must be the batch length or (length, m).
+    """
+
+    def __init__(self, key, rows):
+        self.rows = np.asarray(rows, dtype=np.uint64)
+        self.row_hash = mix64(np.uint64(key) ^ mix64(self.rows))
+        self.calls = 0
+
+    def bits(self, size):
+        shape = (size,) if np.isscalar(size) else tuple(size)
+        if shape[0] != len(self.rows):
+            raise ValueError(f"CounterRNG draws per row: size {shape} for {len(self.rows)} rows")
+        per_row = int(np.prod(shape[1:], dtype=np.int64))
+        self.calls += 1
+        lanes = np.uint64(self.calls * DRAWS_PER_CALL) + np.arange(per_row, dtype=np.uint64)
+        return mix64(self.row_hash[:, None] ^ mix64(lanes)[None, :]).reshape(shape)
+
+    def random(self, size):
+        # 53 random bits -> [0, 1), like Generator.random
+        return (self.bits(size) >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def integers(self, low, high=None, size=None, dtype=np.int64):
+        if high is None:
+            low, high = 0, low
+        return (low + np.floor(self.random(size) * (high - low))).astype(dtype)
+
+    def choice(self, a, size):
+        a = np.asarray(a)
+        return a[self.integers(0, len(a), size)]
@@ -0,0 +1,458 @@
+import os
+import re
+import sqlite3
+
+# Databases the loader (utils/load_generated_data.py) and the schema-driven
+# generator (generators/autoDataGenerator.py) can write to. A backend owns
+# everything database specific: connecting, bulk-insert setup, clearing
+# tables, identity reseeding, catalog introspection and creating the schema
+# from sql/automated_test.sql.
+#
+# DB_BACKEND=sqlserver (default) uses pyodbc with DB_SERVER, DB_NAME, DB_USER,
+# DB_PASSWORD and DB_DRIVER. DB_BACKEND=sqlite uses the file DB_PATH, so both
+# scripts run, and can be benchmarked, without a SQL Server. The scripts'
+# --db-backend / --db-path flags set the same variables.
+DB_BACKEND_ENV = "DB_BACKEND"
+DB_PATH_ENV = "DB_PATH"
+DB_BACKENDS = ("sqlserver", "sqlite")
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+SCHEMA_PATH = os.path.join(PROJECT_ROOT, 'sql', 'automated_test.sql')
+DEFAULT_SQLITE_PATH = os.path.join(PROJECT_ROOT, 'data', 'output', 'automated_test.db')
+
+SQLSERVER_DEFAULTS = {"DB_DRIVER": "ODBC Driver 17 for SQL Server", "DB_SERVER": "DESKTOP-R9S4CFK",
+                      "DB_USER": "sa", "DB_PASSWORD": "(catalystone123)"}
+CHARACTER_TYPES = ("varchar", "nvarchar", "char", "nchar")
+
+
+def read_sql_file(path):
+    # SSMS scripts are saved as UTF-16
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        with open(path, encoding='utf-16') as f:
+            return f.read()
+
+
+COLUMN_RE = re.compile(r"^\s*\[([^\]]+)\]\s+\[(\w+)\](?:\(([^)]*)\))?(\s+IDENTITY\(\d+,\s*\d+\))?\s+(NOT NULL|NULL)",
+                       re.IGNORECASE | re.MULTILINE)
+KEY_RE = re.compile(r"(PRIMARY KEY|UNIQUE)\s+(?:NON)?CLUSTERED\s*\((.*?)\)", re.IGNORECASE | re.DOTALL)
+FOREIGN_KEY_RE = re.compile(r"ALTER TABLE \[dbo\]\.\[(\w+)\]\s+WITH (?:NO)?CHECK ADD\s+CONSTRAINT \[\w+\] "
+                            r"FOREIGN KEY\((.*?)\)\s*REFERENCES \[dbo\]\.\[(\w+)\] \((.*?)\)", re.IGNORECASE)
+DEFAULT_RE = re.compile(r"ALTER TABLE \[dbo\]\.\[(\w+)\] ADD\s+DEFAULT \((.*)\) FOR \[([^\]]+)\]", re.IGNORECASE)
+
+
+def bracketed(text):
+    return re.findall(r"\[([^\]]+)\]", text)
+
+
+def parse_schema(sql):
+    """Tables of a T-SQL script as {TABLE: {"columns", "primary_key", "unique", "foreign_keys"}}.
+
+    Columns are dicts with name, type, length ("255", "max", "18, 2" or None),
+    nullable, identity and default. Keys are lists of column names; foreign
+    keys are (columns, parent table, parent columns).
+    """
+    tables = {}
+    for match in re.finditer(r"CREATE TABLE \[dbo\]\.\[(\w+)\]\((.*?)\n\s*GO\b", sql, re.DOTALL | re.IGNORECASE):
+        table, body = match.group(1).upper(), match.group(2)
+        columns, seen = [], set()
+        for name, typ, length, identity, null in COLUMN_RE.findall(body):
+            if name not in seen:
+                seen.add(name)
+                columns.append({"name": name, "type": typ.lower(), "length": length or None,
+                                "nullable": null.upper() == "NULL", "identity": bool(identity), "default": None})
+        keys = [(kind.upper(), bracketed(cols)) for kind, cols in KEY_RE.findall(body)]
+        tables[table] = {"columns": columns,
+                         "primary_key": next((cols for kind, cols in keys if kind == "PRIMARY KEY"), []),
+                         "unique": [cols for kind, cols in keys if kind == "UNIQUE"],
+                         "foreign_keys": []}
+    for table, cols, parent, parent_cols in FOREIGN_KEY_RE.findall(sql):
+        if table.upper() in tables:
+            tables[table.upper()]["foreign_keys"].append((bracketed(cols), parent.upper(), bracketed(parent_cols)))
+    for table, default, column in DEFAULT_RE.findall(sql):
+        for col in tables.get(table.upper(), {}).get("columns", []):
+            if col["name"] == column:
+                col["default"] = default.strip()
+    return tables
+
+
+def load_schema(path=SCHEMA_PATH):
+    return parse_schema(read_sql_file(path))
+
+
+class SqlServerBackend:
+    name = "sqlserver"
+    default_connections = 4  # tables the loader writes concurrently
+
+    def __init__(self, database):
+        self.database = os.environ.get("DB_NAME", database)
+
+    def connect(self):
+        import pyodbc
+        settings = {key: os.environ.get(key, default) for key, default in SQLSERVER_DEFAULTS.items()}
+        return pyodbc.connect(
+            f"DRIVER={{{settings['DB_DRIVER']}}};SERVER={settings['DB_SERVER']};DATABASE={self.database};"
+            f"UID={settings['DB_USER']};PWD={settings['DB_PASSWORD']};"
+        )
+
+    def prepare_bulk(self, cursor):
+        cursor.fast_executemany = True  # send a batch as one parameter array
+
+    def clear_table(self, cursor, table):
+        cursor.execute(f"DELETE FROM {table}")
+
+    def reseed_identity(self, cursor, table):
+        cursor.execute(f"DBCC CHECKIDENT ('{table}', RESEED, 0)")
+
+    def table_names(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE='BASE TABLE'")
+        return [row[0] for row in cursor.fetchall()]
+
+    def columns(self, conn, table):
+        # [{name, type, max_length, nullable, identity}] in column order
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, IS_NULLABLE,
+                   COLUMNPROPERTY(object_id(TABLE_SCHEMA + '.' + TABLE_NAME), COLUMN_NAME, 'IsIdentity')
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_NAME = ?
+            ORDER BY ORDINAL_POSITION
+        ''', (table,))
+        return [{"name": name, "type": typ, "max_length": max_length, "nullable": nullable == 'YES',
+                 "identity": identity == 1} for name, typ, max_length, nullable, identity in cursor.fetchall()]
+
+    def primary_key(self, conn, table):
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+            WHERE TABLE_NAME = ? AND OBJECTPROPERTY(OBJECT_ID(CONSTRAINT_SCHEMA + '.' + CONSTRAINT_NAME), 'IsPrimaryKey') = 1
+            ORDER BY ORDINAL_POSITION
+        ''', (table,))
+        return [row[0] for row in cursor.fetchall()]
+
+    def unique_columns(self, conn, table):
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT kcu.COLUMN_NAME
+            FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+            JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME
+            WHERE tc.TABLE_NAME = ? AND tc.CONSTRAINT_TYPE = 'UNIQUE'
+        ''', (table,))
+        return [row[0] for row in cursor.fetchall()]
+
+    def foreign_keys(self, conn):
+        # [{table, column, parent_table, parent_column}] for every FK column
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT fk.TABLE_NAME, fk.COLUMN_NAME, pkc.TABLE_NAME, pkc.COLUMN_NAME
+            FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc
+            JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE fk ON rc.CONSTRAINT_NAME = fk.CONSTRAINT_NAME
+            JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE pkc
+              ON rc.UNIQUE_CONSTRAINT_NAME = pkc.CONSTRAINT_NAME AND pkc.ORDINAL_POSITION = fk.ORDINAL_POSITION
+        ''')
+        return [{"table": table, "column": column, "parent_table": parent_table, "parent_column": parent_column}
+                for table, column, parent_table, parent_column in cursor.fetchall()]
+
+    def _foreign_key_column_types(self, conn):
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT
+                OBJECT_NAME(fk_col.object_id) AS TableName,
+                fk_col.name AS ColumnName,
+                typ.name AS DataType,
+                fk_col.max_length,
+                fk_col.precision,
+                fk_col.scale
+            FROM sys.foreign_key_columns fkc
+            JOIN sys.columns fk_col ON fkc.parent_object_id = fk_col.object_id AND fkc.parent_column_id = fk_col.column_id
+            JOIN sys.types typ ON fk_col.user_type_id = typ.user_type_id
+        ''')
+        for table, col, dtype, maxlen, precision, scale in cursor.fetchall():
+            # Bygg riktig ALTER TABLE-setning for datatype
+            if dtype.lower() in ["varchar", "nvarchar", "char"]:
+                type_str = f"{dtype}({int(maxlen) // 2 if dtype.lower() == 'nvarchar' else int(maxlen)})"
+            elif dtype.lower() in ["decimal", "numeric"]:
+                type_str = f"{dtype}({precision},{scale})"
+            else:
+                type_str = dtype
+            yield table, col, type_str
+
+    def set_foreign_keys_nullable(self, conn, nullable):
+        # Første runde med FK satt til NULL, så tabellene kan fylles i vilkårlig rekkefølge
+        cursor = conn.cursor()
+        null = "NULL" if nullable else "NOT NULL"
+        for table, col, type_str in list(self._foreign_key_column_types(conn)):
+            try:
+                cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {col} {type_str} {null}")
+                print(f"[INFO] FK-kolonne satt til {null}: {table}.{col} ({type_str})")
+            except Exception as e:
+                print(f"[WARNING] Klarte ikke sette {table}.{col} til {null}: {e}")
+        conn.commit()
+
+    def fast_reset(self, conn, tables):
+        """Empty `tables` with TRUNCATE instead of a logged DELETE.
+
+        TRUNCATE needs every FK that references the tables gone, so those are
+        dropped (their definitions are returned), and non-clustered indexes are
+        disabled so the load does not maintain them row by row. TRUNCATE also
+        resets the identity seeds. Pass the result to restore_after_reset.
+        """
+        names = ", ".join("?" * len(tables))
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT fk.name, OBJECT_NAME(fk.parent_object_id), COL_NAME(fkc.parent_object_id, fkc.parent_column_id),
+                   OBJECT_NAME(fk.referenced_object_id), COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id)
+            FROM sys.foreign_keys fk
+            JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
+            WHERE OBJECT_NAME(fk.parent_object_id) IN ({names}) OR OBJECT_NAME(fk.referenced_object_id) IN ({names})
+            ORDER BY fk.name, fkc.constraint_column_id
+        ''', (*tables, *tables))
+        foreign_keys = {}
+        for name, table, column, parent, parent_column in cursor.fetchall():
+            fk = foreign_keys.setdefault(name, {"table": table, "columns": [], "parent_table": parent, "parent_columns": []})
+            fk["columns"].append(column)
+            fk["parent_columns"].append(parent_column)
+        cursor.execute(f'''
+            SELECT i.name, OBJECT_NAME(i.object_id) FROM sys.indexes i
+            WHERE i.type_desc = 'NONCLUSTERED' AND i.is_primary_key = 0 AND i.is_disabled = 0
+              AND OBJECT_NAME(i.object_id) IN ({names})
+        ''', tables)
+        indexes = cursor.fetchall()
+        for name, fk in foreign_keys.items():
+            cursor.execute(f"ALTER TABLE [{fk['table']}] DROP CONSTRAINT [{name}]")
+        for name, table in indexes:
+            cursor.execute(f"ALTER INDEX [{name}] ON [{table}] DISABLE")
+        for table in tables:
+            cursor.execute(f"TRUNCATE TABLE [{table}]")
+        conn.commit()
+        return {"foreign_keys": foreign_keys, "indexes": [tuple(index) for index in indexes]}
+
+    def restore_after_reset(self, conn, state):
+        """Rebuild the indexes and re-add the FKs fast_reset removed, validating the loaded rows.
+
+        Returns the constraints that failed validation; they are added
+        WITH NOCHECK so the schema is complete but they are not trusted.
+        """
+        cursor = conn.cursor()
+        for name, table in state["indexes"]:
+            cursor.execute(f"ALTER INDEX [{name}] ON [{table}] REBUILD")
+        conn.commit()
+        invalid = []
+        for name, fk in state["foreign_keys"].items():
+            definition = (f"CONSTRAINT [{name}] FOREIGN KEY ({', '.join(f'[{c}]' for c in fk['columns'])}) "
+                          f"REFERENCES [{fk['parent_table']}] ({', '.join(f'[{c}]' for c in fk['parent_columns'])})")
+            try:
+                cursor.execute(f"ALTER TABLE [{fk['table']}] WITH CHECK ADD {definition}")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"[WARNING] {name} failed validation, added WITH NOCHECK: {e}")
+                cursor.execute(f"ALTER TABLE [{fk['table']}] WITH NOCHECK ADD {definition}")
+                conn.commit()
+                invalid.append(name)
+        return invalid
+
+    def create_schema(self, conn, path=SCHEMA_PATH):
+        # Only the table statements of the script; the database itself must exist
+        existing = {name.upper() for name in self.table_names(conn)}
+        cursor = conn.cursor()
+        for statement in re.split(r"^\s*GO\s*$", read_sql_file(path), flags=re.MULTILINE):
+            target = re.match(r"\s*(?:/\*.*?\*/\s*)?(?:CREATE|ALTER) TABLE \[dbo\]\.\[(\w+)\]", statement, re.DOTALL)
+            if target and target.group(1).upper() not in existing:
+                cursor.execute(statement)
+        conn.commit()
+
+
+class SqliteBackend:
+    """Embedded stand-in for SQL Server, with the schema translated from sql/automated_test.sql.
+
+    Columns keep their T-SQL type names (nvarchar(max) is stored as
+    nvarchar(-1), like CHARACTER_MAXIMUM_LENGTH reports it), so catalog
+    introspection answers like SQL Server's INFORMATION_SCHEMA does.
+    """
+
+    name = "sqlite"
+    default_connections = 1  # SQLite takes one writer at a time
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get(DB_PATH_ENV) or DEFAULT_SQLITE_PATH
+        self.enforce_foreign_keys = True  # off between fast_reset and restore_after_reset
+
+    def connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Concurrent loader connections wait for the write lock instead of failing
+        conn = sqlite3.connect(self.path, timeout=300, check_same_thread=False)
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if self.enforce_foreign_keys else 'OFF'}")
+        return conn
+
+    def prepare_bulk(self, cursor):
+        pass  # in-process, executemany has no round trips to save
+
+    def clear_table(self, cursor, table):
+        cursor.execute(f"DELETE FROM {table}")
+
+    def reseed_identity(self, cursor, table):
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_sequence'")
+        if cursor.fetchone():
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+
+    def table_names(self, conn):
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        return [row[0] for row in rows.fetchall()]
+
+    def columns(self, conn, table):
+        columns = []
+        for _, name, declared, notnull, _, pk in conn.execute(f"PRAGMA table_info([{table}])").fetchall():
+            match = re.match(r"\s*(\w+)\s*(?:\(\s*(-?\d+))?", declared or "")
+            typ = match.group(1).lower() if match else ""
+            # Only an INTEGER PRIMARY KEY is an auto-numbered rowid column
+            identity = typ == "integer" and pk == 1
+            length = int(match.group(2)) if match and match.group(2) and typ in CHARACTER_TYPES else None
+            columns.append({"name": name, "type": "int" if identity else typ, "max_length": length,
+                            "nullable": not notnull and not identity, "identity": identity})
+        return columns
+
+    def primary_key(self, conn, table):
+        rows = conn.execute(f"PRAGMA table_info([{table}])").fetchall()
+        return [row[1] for row in sorted(rows, key=lambda row: row[5]) if row[5]]
+
+    def unique_columns(self, conn, table):
+        columns = []
+        for _, index, unique, origin, _ in conn.execute(f"PRAGMA index_list([{table}])").fetchall():
+            if unique and origin == "u":
+                columns += [row[2] for row in conn.execute(f"PRAGMA index_info([{index}])").fetchall()]
+        return columns
+
+    def foreign_keys(self, conn):
+        keys = []
+        for table in self.table_names(conn):
+            for row in conn.execute(f"PRAGMA foreign_key_list([{table}])").fetchall():
+                keys.append({"table": table, "column": row[3], "parent_table": row[2], "parent_column": row[4]})
+        return keys
+
+    def set_foreign_keys_nullable(self, conn, nullable):
+        """Like the SQL Server ALTER COLUMN round trip, for every FK column.
+
+        SQLite cannot alter a column, so the NOT NULL flag is edited in the
+        stored CREATE TABLE (dropping or adding a NOT NULL is a change
+        writable_schema allows). A column with NULLs left keeps them and gets
+        a warning, as on SQL Server. FK enforcement is off while relaxed.
+        """
+        conn.commit()
+        conn.execute("PRAGMA foreign_keys = OFF")
+        null = "NULL" if nullable else "NOT NULL"
+        statements = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall())
+        changed = {}
+        for fk in self.foreign_keys(conn):
+            table, col = fk["table"], fk["column"]
+            if nullable and col in self.primary_key(conn, table):
+                # SQL Server refuses a nullable key column; so do we
+                print(f"[WARNING] Klarte ikke sette {table}.{col} til {null}: kolonnen er en del av primærnøkkelen")
+                continue
+            if not nullable and conn.execute(f"SELECT 1 FROM [{table}] WHERE [{col}] IS NULL LIMIT 1").fetchone():
+                print(f"[WARNING] Klarte ikke sette {table}.{col} til {null}: kolonnen har NULL-verdier")
+                continue
+            sql = changed.get(table, statements[table])
+            changed[table] = re.sub(rf"(\[{re.escape(col)}\] \w+(?:\(-?\d+(?:,\s*\d+)?\))?)(?: NOT NULL)?",
+                                    lambda m: m.group(1) + ("" if nullable else " NOT NULL"), sql, count=1)
+            print(f"[INFO] FK-kolonne satt til {null}: {table}.{col}")
+        if changed:
+            version = conn.execute("PRAGMA schema_version").fetchone()[0]
+            conn.execute("PRAGMA writable_schema = ON")
+            for table, sql in changed.items():
+                conn.execute("UPDATE sqlite_master SET sql = ? WHERE type = 'table' AND name = ?", (sql, table))
+            conn.execute(f"PRAGMA schema_version = {version + 1}")
+            conn.execute("PRAGMA writable_schema = OFF")
+            conn.commit()
+        if not nullable:
+            conn.execute("PRAGMA foreign_keys = ON")
+
+    def fast_reset(self, conn, tables):
+        """SQLite has no TRUNCATE; a DELETE without WHERE on a connection with
+        foreign keys off takes the same shortcut and drops the pages wholesale.
+
+        Explicit indexes are dropped (their SQL is returned) and connections
+        opened until restore_after_reset do not enforce foreign keys.
+        """
+        names = ", ".join("?" * len(tables))
+        indexes = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+                               f"AND tbl_name IN ({names})", tables).fetchall()
+        self.enforce_foreign_keys = False
+        conn.commit()
+        conn.execute("PRAGMA foreign_keys = OFF")
+        cursor = conn.cursor()
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX [{name}]")
+        for table in tables:
+            self.clear_table(cursor, table)
+            self.reseed_identity(cursor, table)
+        conn.commit()
+        return {"indexes": indexes, "tables": list(tables)}
+
+    def restore_after_reset(self, conn, state):
+        # Recreate the indexes, then check the loaded rows against every FK
+        cursor = conn.cursor()
+        for _, sql in state["indexes"]:
+            cursor.execute(sql)
+        conn.commit()
+        self.enforce_foreign_keys = True
+        conn.execute("PRAGMA foreign_keys = ON")
+        invalid = []
+        for table in state["tables"]:
+            violations = conn.execute(f"PRAGMA foreign_key_check([{table}])").fetchall()
+            if violations:
+                print(f"[WARNING] {table}: {len(violations)} rows violate a foreign key")
+                invalid.append(table)
+        return invalid
+
+    def create_schema(self, conn, path=SCHEMA_PATH):
+        for table, spec in load_schema(path).items():
+            conn.execute(sqlite_table_ddl(table, spec))
+        conn.commit()
+
+
+def sqlite_table_ddl(table, spec):
+    """CREATE TABLE for SQLite from a parse_schema() entry.
+
+    Keys, foreign keys and defaults naming columns the table does not have
+    (the script has a few) are left out, as SQLite would reject them.
+    """
+    names = {col["name"] for col in spec["columns"]}
+    primary_key = [col for col in spec["primary_key"] if col in names]
+    identity = next((col["name"] for col in spec["columns"] if col["identity"]), None)
+    rowid = identity if identity and primary_key in ([], [identity]) else None
+    lines = []
+    for col in spec["columns"]:
+        if col["name"] == rowid:
+            lines.append(f"[{col['name']}] INTEGER PRIMARY KEY AUTOINCREMENT")
+            continue
+        length = col["length"]
+        typ = col["type"] + (f"({-1 if length.lower() == 'max' else length})" if length else "")
+        line = f"[{col['name']}] {typ}{'' if col['nullable'] else ' NOT NULL'}"
+        if col["default"]:
+            default = col["default"]
+            line += " DEFAULT CURRENT_TIMESTAMP" if default.lower() == "getdate()" else f" DEFAULT ({default})"
+        lines.append(line)
+    if primary_key and not rowid:
+        lines.append(f"PRIMARY KEY ({', '.join(f'[{c}]' for c in primary_key)})")
+    for unique in spec["unique"]:
+        if set(unique) <= names:
+            lines.append(f"UNIQUE ({', '.join(f'[{c}]' for c in unique)})")
+    for columns, parent, parent_columns in spec["foreign_keys"]:
+        if set(columns) <= names:
+            lines.append(f"FOREIGN KEY ({', '.join(f'[{c}]' for c in columns)}) "
+                         f"REFERENCES [{parent}] ({', '.join(f'[{c}]' for c in parent_columns)})")
+    return f"CREATE TABLE IF NOT EXISTS [{table}] (\n    " + ",\n    ".join(lines) + "\n)"
+
+
+def get_db_backend(database, name=None, path=None):
+    """The configured backend; `database` is the SQL Server database the calling script uses."""
+    name = name or os.environ.get(DB_BACKEND_ENV, "sqlserver")
+    if name == "sqlserver":
+        return SqlServerBackend(database)
+    if name == "sqlite":
+        return SqliteBackend(path)
+    raise ValueError(f"{DB_BACKEND_ENV} must be one of {', '.join(DB_BACKENDS)}, got '{name}'")
@@ -0,0 +1,489 @@
+import contextlib
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import openai
+from openai import AzureOpenAI
+from utils.telemetry import emit, record_ai_call
+from utils.mock_llm import MockLLM, MockServiceError
+from utils.rate_limiter import RateLimiter, retry_after_seconds
+from utils.token_logger import estimate_tokens
+from utils.token_budget import TokenBudget, BudgetExhausted, estimate_requests, add_estimates
+from utils.prompt_cache import PromptCache, CACHE_PATH, MODES, DEFAULT_VARIANTS, DEFAULT_TTL_DAYS, DEFAULT_MAX_ENTRIES, request_key
+
+# Load API key from external file (override with AZURE_OPENAI_API_KEY_PATH).
+# AZURE_OPENAI_ENDPOINT/AZURE_OPENAI_API_KEY point the client somewhere else,
+# e.g. the local mock in utils/mock_llm_server.py.
+# LLM_BACKEND=mock swaps the client for the offline backend in utils/mock_llm.py;
+# without it, a dry run's generate() selects it for its own calls with use_backend().
+API_KEY_PATH = os.environ.get("AZURE_OPENAI_API_KEY_PATH", "C:/Users/FredrikVillo/repos/TestDataGeneration/api_key.txt")
+API_VERSION = "2025-01-01-preview"
+AZURE_ENDPOINT = "https://azureopenai-sin-dev.openai.azure.com"
+DEFAULT_MODEL = "gpt-4o"
+TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "30"))
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = 1.0  # seconds, doubled on every attempt
+MAX_THROTTLE_RETRIES = int(os.environ.get("LLM_MAX_THROTTLE_RETRIES", "10"))  # 429s are expected near quota
+DEFAULT_CONCURRENCY = 8  # parallel requests in map_concurrent(); main.py --ai-concurrency sets LLM_CONCURRENCY
+DEFAULT_BATCH_SIZE = 50  # rows per request in chat_batch(); main.py --ai-batch-size sets LLM_BATCH_SIZE, 1 = per row
+BATCH_ATTEMPTS = 3
+
+# chat_batch() prompt: the task, then one "id: input" line per input. The model answers
+# with one item per id, which lets us validate the count and re-ask for gaps.
+BATCH_PROMPT = (
+    "{task}\n"
+    "Answer every input below. Respond with only a JSON object of the form "
+    '{{"items": [{{"id": 1, "value": "..."}}]}} with exactly one item per input id, '
+    "no markdown and no other text.\n"
+    "Inputs:\n{inputs}"
+)
+
+# Worth another attempt; anything else (bad request, auth) fails immediately.
+# 429s (openai.RateLimitError) are handled separately with Retry-After.
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    MockServiceError,
+)
+
+_jitter = random.Random()  # own generator so retries never shift seeded data
+_clients = {}  # backend name -> client
+_client_lock = threading.Lock()
+_prompt_cache = None
+_rate_limiter = None
+_token_budget = None
+_usage_lock = threading.Lock()
+
+
+def empty_usage():
+    return {"calls": 0, "failed_calls": 0, "retries": 0, "seconds": 0.0,
+            "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+            "cache_hits": 0, "tokens_saved": 0, "throttled": 0, "limiter_wait_seconds": 0.0, "budget_refused": 0}
+
+
+_usage = empty_usage()
+
+
+# Backend chosen for the calls made in this context (a step's generate(), and the
+# map_concurrent tasks it starts, which run in copies of its context)
+_backend = contextvars.ContextVar("llm_backend", default=None)
+
+
+def backend_for(dry_run):
+    # Dry runs never reach Azure
+    return "mock" if dry_run else None
+
+
+@contextlib.contextmanager
+def use_backend(backend):
+    """Send the AI calls made inside the block to `backend` ("azure", "mock" or None for the default)."""
+    token = _backend.set(backend)
+    try:
+        yield
+    finally:
+        _backend.reset(token)
+
+
+def get_backend(backend=None):
+    # Explicit argument, then LLM_BACKEND (main.py --llm-backend), then use_backend(), then azure
+    backend = backend or os.environ.get("LLM_BACKEND") or _backend.get() or "azure"
+    if backend not in ("azure", "mock"):
+        raise ValueError(f"LLM_BACKEND must be 'azure' or 'mock', got '{backend}'")
+    return backend
+
+
+def get_client(backend=None):
+    """Return the shared client for the backend (see get_backend), creating it on first use.
+
+    The key file is only read when an AI call is actually made, so dry runs
+    and pure CSV steps never need it. The SDK's own retries are switched off
+    because chat() retries itself and counts every attempt.
+    """
+    backend = get_backend(backend)
+    with _client_lock:
+        if backend not in _clients and backend == "mock":
+            _clients[backend] = MockLLM.from_env()
+        elif backend not in _clients:
+            api_key = os.environ.get("AZURE_OPENAI_API_KEY")
+            if not api_key:
+                with open(API_KEY_PATH, "r") as f:
+                    api_key = f.read().strip()
+            _clients[backend] = AzureOpenAI(
+                api_key=api_key,
+                api_version=API_VERSION,
+                azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT", AZURE_ENDPOINT),
+                timeout=TIMEOUT_SECONDS,
+                max_retries=0
+            )
+    return _clients[backend]
+
+
+def get_rate_limiter():
+    """Return the shared rate limiter, or None when no quota is configured.
+
+    Quotas come from LLM_RPM / LLM_TPM (main.py --rpm / --tpm). LLM_QUOTA_WINDOW
+    replaces the 60 second minute, for tests against the local quota server.
+    """
+    global _rate_limiter
+    rpm, tpm = os.environ.get("LLM_RPM"), os.environ.get("LLM_TPM")
+    if not rpm and not tpm:
+        return None
+    with _client_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(rpm=float(rpm) if rpm else None, tpm=float(tpm) if tpm else None,
+                                        window=float(os.environ.get("LLM_QUOTA_WINDOW", 60)))
+    return _rate_limiter
+
+
+def get_token_budget():
+    """Return the run's token budget (LLM_TOKEN_BUDGET, main.py --token-budget), or None."""
+    global _token_budget
+    limit = os.environ.get("LLM_TOKEN_BUDGET")
+    if not limit:
+        return None
+    with _client_lock:
+        if _token_budget is None:
+            _token_budget = TokenBudget(int(limit))
+    return _token_budget
+
+
+def estimate_request_tokens(messages, max_tokens):
+    # What a request counts against quota and budget before it is sent
+    return sum(estimate_tokens(m["content"]) for m in messages) + (max_tokens or 0)
+
+
+def cache_mode(backend=None):
+    # LLM_CACHE=reuse (default) answers from the prompt cache, refresh always asks
+    # the model and stores the new answer, off bypasses the cache (main.py --ai-cache).
+    # The mock backend is free, so it skips the cache unless asked explicitly.
+    mode = os.environ.get("LLM_CACHE", "off" if get_backend(backend) == "mock" else "reuse")
+    if mode not in MODES:
+        raise ValueError(f"LLM_CACHE must be one of {', '.join(MODES)}, got '{mode}'")
+    return mode
+
+
+def get_prompt_cache(backend=None):
+    """Return the shared on-disk prompt cache, or None when it is switched off."""
+    global _prompt_cache
+    if cache_mode(backend) == "off":
+        return None
+    with _client_lock:
+        if _prompt_cache is None:
+            _prompt_cache = PromptCache(
+                os.environ.get("LLM_CACHE_PATH", CACHE_PATH),
+                variants=int(os.environ.get("LLM_CACHE_VARIANTS", DEFAULT_VARIANTS)),
+                ttl_days=float(os.environ.get("LLM_CACHE_TTL_DAYS", DEFAULT_TTL_DAYS)),
+                max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+            )
+    return _prompt_cache
+
+
+def _record_usage(response, seconds):
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    with _usage_lock:
+        _usage["calls"] += 1
+        _usage["seconds"] = round(_usage["seconds"] + seconds, 3)
+        _usage["prompt_tokens"] += prompt_tokens
+        _usage["completion_tokens"] += completion_tokens
+        _usage["total_tokens"] += prompt_tokens + completion_tokens
+
+
+def _count(key):
+    with _usage_lock:
+        _usage[key] += 1
+
+
+def get_usage():
+    # Counters for every call made through chat() in this process
+    with _usage_lock:
+        return dict(_usage)
+
+
+def reset_usage():
+    with _usage_lock:
+        _usage.update(empty_usage())
+
+
+def chat(prompt, model=DEFAULT_MODEL, max_tokens=100, temperature=0.7, system=None, backend=None):
+    """Send one chat completion and return the stripped reply text.
+
+    Answers come from the prompt cache when it already holds enough variants
+    for this request (see utils/prompt_cache.py and cache_mode()). Otherwise
+    the model is called and its answer stored. With a token budget (see
+    utils/token_budget.py) a request that no longer fits is answered from any
+    cached variant, or raises BudgetExhausted. `backend` overrides get_backend().
+    """
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    backend = get_backend(backend)
+    cache = get_prompt_cache(backend)
+    key = request_key(backend, model, messages, temperature, max_tokens) if cache else None
+    if cache and cache_mode(backend) == "reuse":
+        hit = cache.lookup(key)
+        if hit:
+            content, prompt_tokens, completion_tokens = hit
+            with _usage_lock:
+                _usage["cache_hits"] += 1
+                _usage["tokens_saved"] += prompt_tokens + completion_tokens
+            emit("ai_cache_hit", model=model, tokens_saved=prompt_tokens + completion_tokens)
+            return content
+
+    budget = get_token_budget()
+    estimate = estimate_request_tokens(messages, max_tokens)
+    if budget and not budget.reserve(estimate):
+        hit = cache.lookup(key, any_variant=True) if cache else None
+        if hit:
+            _count("cache_hits")
+            emit("ai_cache_hit", model=model, tokens_saved=hit[1] + hit[2])
+            return hit[0]
+        _count("budget_refused")
+        emit("ai_budget_refused", model=model, estimate=estimate)
+        raise BudgetExhausted(f"token budget of {budget.limit} spent")
+    try:
+        response = _complete(messages, model, max_tokens, temperature, backend)
+    except Exception:
+        if budget:
+            budget.settle(estimate, 0)
+        raise
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    if budget:
+        budget.settle(estimate, prompt_tokens + completion_tokens)
+    content = (response.choices[0].message.content or "").strip()
+    if cache:
+        cache.store(key, content, prompt_tokens, completion_tokens)
+    return content
+
+
+def _complete(messages, model, max_tokens, temperature, backend=None):
+    """One chat completion with retries; returns the raw response.
+
+    With a quota configured every attempt first reserves its estimated tokens
+    from the shared rate limiter. 429s wait for Retry-After (or back off) and
+    are retried up to MAX_THROTTLE_RETRIES times. Timeouts, connection errors
+    and 5xx responses are retried up to MAX_RETRIES times with exponential
+    backoff. The last error is raised. Usage and latency of every successful
+    call go to the process counters (see get_usage) and to the step's
+    telemetry events.
+    """
+    limiter = get_rate_limiter()
+    estimate = estimate_request_tokens(messages, max_tokens)
+    attempt = throttles = 0
+    while True:
+        if limiter:
+            waited = limiter.acquire(estimate)
+            if waited:
+                with _usage_lock:
+                    _usage["limiter_wait_seconds"] = round(_usage["limiter_wait_seconds"] + waited, 3)
+        start = time.perf_counter()
+        try:
+            response = get_client(backend).chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+            break
+        except openai.RateLimitError as e:
+            if throttles >= MAX_THROTTLE_RETRIES:
+                _count("failed_calls")
+                raise
+            throttles += 1
+            _count("throttled")
+            retry_after = retry_after_seconds(e)
+            emit("ai_throttled", model=model, attempt=throttles, retry_after=retry_after)
+            if limiter:
+                limiter.throttled(retry_after)  # acquire() holds everyone until then
+            else:
+                time.sleep(retry_after or RETRY_BASE_DELAY * 2 ** min(throttles - 1, 5))
+        except RETRYABLE_ERRORS as e:
+            if attempt >= MAX_RETRIES:
+                _count("failed_calls")
+                raise
+            attempt += 1
+            _count("retries")
+            delay = RETRY_BASE_DELAY * 2 ** (attempt - 1) * (1 + _jitter.random() / 2)
+            emit("ai_retry", model=model, attempt=attempt, error=type(e).__name__, delay=round(delay, 2))
+            time.sleep(delay)
+        except Exception:
+            _count("failed_calls")
+            raise
+    seconds = time.perf_counter() - start
+    if limiter:
+        limiter.succeeded()
+    _record_usage(response, seconds)
+    record_ai_call(response, seconds, model)
+    return response
+
+
+def get_concurrency():
+    return max(1, int(os.environ.get("LLM_CONCURRENCY", DEFAULT_CONCURRENCY)))
+
+
+def map_concurrent(fn, items, concurrency=None):
+    """Run fn over items on a bounded thread pool and return results in input order.
+
+    Meant for per-row AI enrichment where every call is an independent round
+    trip. Each task runs in a copy of the caller's context so telemetry events
+    are still tagged with the calling step. With a concurrency of 1 the calls
+    are made inline, one after the other.
+    """
+    items = list(items)
+    return list(imap_concurrent(fn, items, max(1, min(concurrency or get_concurrency(), len(items)))))
+
+
+def imap_concurrent(fn, items, concurrency=None):
+    """map_concurrent() as a generator: yields results in input order as they are ready.
+
+    Items are handed to the pool lazily, never more than `concurrency` ahead of
+    the caller, so a caller that has what it needs can stop early: once the
+    generator is closed (contextlib.closing) no further item is started and
+    calls still queued are cancelled; calls already running are waited for.
+    """
+    items = iter(items)
+    workers = concurrency or get_concurrency()
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm")
+    pending = deque()
+
+    def submit(count):
+        for item in islice(items, count):
+            pending.append(pool.submit(contextvars.copy_context().run, fn, item))
+
+    try:
+        submit(workers)
+        while pending:
+            result = pending.popleft().result()
+            submit(1)
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def get_batch_size():
+    return max(1, int(os.environ.get("LLM_BATCH_SIZE", DEFAULT_BATCH_SIZE)))
+
+
+def parse_batch_reply(content):
+    """Return {id: value} for the well-formed items of a batch answer.
+
+    Tolerates code fences and text around the JSON object; items without a
+    non-empty string value are left out so they get asked for again.
+    """
+    start, end = content.find("{"), content.rfind("}")
+    if start < 0 or end < start:
+        return {}
+    try:
+        data = json.loads(content[start:end + 1])
+    except ValueError:
+        return {}
+    items = data.get("items") if isinstance(data, dict) else None
+    values = {}
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and isinstance(item.get("value"), str) and item["value"].strip():
+            values[str(item.get("id"))] = item["value"].strip()
+    return values
+
+
+def batch_prompt(task, inputs):
+    lines = "\n".join(f"{i}: {value}" for i, value in enumerate(inputs, start=1))
+    return BATCH_PROMPT.format(task=task, inputs=lines)
+
+
+def _ask_batch(task, inputs, tokens_per_item, model, temperature, backend=None):
+    try:
+        content = chat(batch_prompt(task, inputs), model=model,
+                       max_tokens=tokens_per_item * len(inputs) + 50, temperature=temperature, backend=backend)
+    except BudgetExhausted:
+        return [None] * len(inputs)
+    values = parse_batch_reply(content)
+    return [values.get(str(i)) for i in range(1, len(inputs) + 1)]
+
+
+def chat_batch(task, inputs, fallback=None, tokens_per_item=40, model=DEFAULT_MODEL, temperature=0.7,
+               batch_size=None, offline=None, backend=None):
+    """Get one short answer per input with one request per batch instead of per row.
+
+    Inputs are sent in batches of get_batch_size() (concurrently, see
+    map_concurrent), each asking for a JSON list of {id, value} items. Items
+    that are missing or malformed are asked for again, in new batches of just
+    those inputs, up to BATCH_ATTEMPTS times. Whatever is still missing is
+    produced by `fallback(input)` if given, else left as None. Once the token
+    budget is spent, the inputs still open are filled by `offline(input)`
+    (Faker or a template, no AI), one after the other. Results are in input
+    order. The batch requests go to `backend` (see get_backend); `fallback`
+    runs in the caller's context, so use_backend() covers its calls too.
+    """
+    inputs = list(inputs)
+    size = batch_size or get_batch_size()
+    budget = get_token_budget()
+    results = [None] * len(inputs)
+    pending = list(range(len(inputs)))
+    for attempt in range(1, BATCH_ATTEMPTS + 1):
+        if (size <= 1 and fallback) or (budget and budget.exhausted):
+            break
+        batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+        answers = map_concurrent(
+            lambda batch: _ask_batch(task, [inputs[i] for i in batch], tokens_per_item, model, temperature, backend),
+            batches)
+        for batch, values in zip(batches, answers):
+            for index, value in zip(batch, values):
+                results[index] = value
+        pending = [i for i in pending if results[i] is None]
+        if not pending:
+            break
+        emit("ai_batch_incomplete", attempt=attempt, missing=len(pending))
+
+    def ask_fallback(value):
+        try:
+            return fallback(value)
+        except BudgetExhausted:
+            return None
+
+    if pending and fallback and not (budget and budget.exhausted and offline):
+        for index, value in zip(pending, map_concurrent(ask_fallback, [inputs[i] for i in pending])):
+            results[index] = value
+    if budget and budget.exhausted and offline:
+        for index in pending:
+            if results[index] is None:
+                results[index] = offline(inputs[index])
+    return results
+
+
+def estimate_chat(prompt, max_tokens=100, calls=1, system=None):
+    """Pre-flight calls and tokens for `calls` chat() requests with this prompt."""
+    messages = [{"role": "user", "content": prompt}] + ([{"role": "system", "content": system}] if system else [])
+    return estimate_requests(calls, estimate_request_tokens(messages, 0), max_tokens)
+
+
+def estimate_chat_batch(task, count, sample_input, tokens_per_item=40, fallback_prompt=None, fallback_max_tokens=50,
+                        batch_size=None):
+    """Pre-flight calls and tokens for chat_batch() over `count` inputs like `sample_input`.
+
+    Assumes complete answers, so no re-asking; in per-row mode (batch size 1)
+    the fallback prompt is what gets sent.
+    """
+    size = batch_size or get_batch_size()
+    if size <= 1 and fallback_prompt:
+        return estimate_chat(fallback_prompt, fallback_max_tokens, calls=count)
+    full, rest = divmod(count, size)
+    estimates = [estimate_chat(batch_prompt(task, [sample_input] * size), tokens_per_item * size + 50, calls=full)]
+    if rest:
+        estimates.append(estimate_chat(batch_prompt(task, [sample_input] * rest), tokens_per_item * rest + 50))
+    return add_estimates(*estimates)
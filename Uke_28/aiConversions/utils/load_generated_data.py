@@ -1,12 +1,20 @@
-import pyodbc
+import hashlib
 import json
 import os
+import queue
 import re
 import sys
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Always resolve paths relative to the project root
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+sys.path.append(os.path.join(SCRIPT_DIR, '..'))
+from utils.artifacts import ARTIFACT_FORMATS, find_artifact, read_rows
+from utils.db_backend import DB_BACKEND_ENV, DB_PATH_ENV, get_db_backend, load_schema, read_sql_file
+from utils.sharding import in_batches
 
 def rel_path(*parts):
     return os.path.join(PROJECT_ROOT, *parts)
@@ -22,57 +30,118 @@ else:
     DATA_DIR = rel_path('aiConversions', 'data', 'output', 'latest')
     print("[INFO] Loading data from 'latest' folder.")
 
-# Koble til SQL Server med sa-login
-conn = pyodbc.connect(
-    "DRIVER={ODBC Driver 17 for SQL Server};SERVER=DESKTOP-R9S4CFK;DATABASE=dry_run_test;UID=sa;PWD=(catalystone123);"
-)
-cursor = conn.cursor()
-
-def clean_database(cursor):
-    # Slett i omvendt FK-rekkefølge og reset identity
-    tables_with_identity = [
-        'USERPROFILE_HISTORY',
-        'USERPROFILE_FIELD',
-        'ACCESSCATALYST'
-    ]
-    # Sletting i omvendt rekkefølge av avhengigheter
-    delete_order = [
-        'USERPROFILE_HISTORY',
-        'USERPROFILE',
-        'USERPROFILE_FIELD',
-        'ACCESSCATALYST',
-        'EMPLOYEE',
-        'ORGANIZATION',
-        'SCALE',
-        'SCALETYPE'
-    ]
+# Artifact format: --artifact-format json|jsonl, otherwise the one the run recorded
+def get_artifact_format():
+    if '--artifact-format' in sys.argv:
+        idx = sys.argv.index('--artifact-format')
+        if idx + 1 < len(sys.argv) and sys.argv[idx + 1] in ARTIFACT_FORMATS:
+            return sys.argv[idx + 1]
+    try:
+        with open(os.path.join(DATA_DIR, 'pipeline_status.json'), encoding='utf-8') as f:
+            return json.load(f).get('artifact_format', 'json')
+    except (OSError, ValueError):
+        return 'json'
+
+ARTIFACT_FORMAT = get_artifact_format()
+
+# Rader per executemany-kall (--batch-size N). Hver batch er én transaksjon.
+DEFAULT_BATCH_SIZE = 5000
+
+def get_arg_value(flag, default=None):
+    if flag in sys.argv:
+        idx = sys.argv.index(flag)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+BATCH_SIZE = max(1, int(get_arg_value('--batch-size', DEFAULT_BATCH_SIZE)))
+
+# Database: --db-backend sqlserver|sqlite og --db-path FIL (eller DB_BACKEND/DB_PATH, se utils/db_backend.py).
+# --sqlite FIL er en snarvei for --db-backend sqlite --db-path FIL.
+if get_arg_value('--sqlite'):
+    os.environ[DB_BACKEND_ENV], os.environ[DB_PATH_ENV] = 'sqlite', get_arg_value('--sqlite')
+if get_arg_value('--db-backend'):
+    os.environ[DB_BACKEND_ENV] = get_arg_value('--db-backend')
+if get_arg_value('--db-path'):
+    os.environ[DB_PATH_ENV] = get_arg_value('--db-path')
+
+def get_backend():
+    return get_db_backend('dry_run_test')
+
+# Slett i omvendt FK-rekkefølge og reset identity
+TABLES_WITH_IDENTITY = [
+    'USERPROFILE_HISTORY',
+    'USERPROFILE_FIELD',
+    'ACCESSCATALYST'
+]
+# Sletting i omvendt rekkefølge av avhengigheter
+DELETE_ORDER = [
+    'USERPROFILE_HISTORY',
+    'USERPROFILE',
+    'USERPROFILE_FIELD',
+    'ACCESSCATALYST',
+    'EMPLOYEE',
+    'ORGANIZATION',
+    'SCALE',
+    'SCALETYPE'
+]
+
+# --reset delete (standard): DELETE + identity-reseed per tabell, se clean_database.
+# --reset fast: TRUNCATE med FK-er fjernet og indekser deaktivert under innlastingen, se fast_reset_database.
+RESET_MODES = ('delete', 'fast')
+
+def clean_database(cursor, backend=None):
+    backend = backend or get_backend()
     print('Cleaning database...')
-    for table in delete_order:
+    for table in DELETE_ORDER:
         try:
-            cursor.execute(f"DELETE FROM {table}")
+            backend.clear_table(cursor, table)
         except Exception as e:
             print(f"[WARNING] Could not delete from {table}: {e}")
     # Reset identity seed for tabeller med identity
-    for table in tables_with_identity:
+    for table in TABLES_WITH_IDENTITY:
         try:
-            cursor.execute(f"DBCC CHECKIDENT ('{table}', RESEED, 0)")
+            backend.reseed_identity(cursor, table)
         except Exception as e:
             print(f"[WARNING] Could not reseed identity for {table}: {e}")
     cursor.connection.commit()
     print('Database cleaned and identity reseeded.')
 
-# Hjelpefunksjon for å laste JSON
+def fast_reset_database(conn, backend=None):
+    """Empty every table the fast way and return what restore_database must put back.
+
+    The backend removes the FK constraints and non-clustered indexes of the
+    tables and truncates them (utils/db_backend.py: fast_reset).
+    """
+    backend = backend or get_backend()
+    print('Cleaning database (fast reset)...')
+    start = time.perf_counter()
+    state = backend.fast_reset(conn, DELETE_ORDER)
+    print(f"Database truncated in {time.perf_counter() - start:.2f}s; constraints and indexes off until the load is done.")
+    return state
+
+def restore_database(conn, state, backend=None):
+    # Bygg indekser og valider FK-er etter innlasting; returnerer constraints som feilet
+    backend = backend or get_backend()
+    print('Rebuilding indexes and validating foreign keys...')
+    start = time.perf_counter()
+    invalid = backend.restore_after_reset(conn, state)
+    print(f"Indexes and foreign keys restored in {time.perf_counter() - start:.2f}s.")
+    return invalid
+
+# Hjelpefunksjon for å laste JSON: radene leses én og én (JSON-array eller JSON Lines),
+# så minnebruken er den samme uansett datavolum
+def artifact_exists(filename):
+    return find_artifact(DATA_DIR, filename, ARTIFACT_FORMAT) is not None
+
 def load_json(filename):
-    with open(os.path.join(DATA_DIR, filename), encoding='utf-8') as f:
-        return json.load(f)
+    path = find_artifact(DATA_DIR, filename, ARTIFACT_FORMAT)
+    if path is None:
+        raise FileNotFoundError(f"{filename} (or its .jsonl form) not found in {DATA_DIR}")
+    return read_rows(path)
 
 def get_table_columns_from_sql(sql_path, table_name):
-    try:
-        with open(sql_path, encoding='utf-8') as f:
-            sql = f.read()
-    except UnicodeDecodeError:
-        with open(sql_path, encoding='utf-16') as f:
-            sql = f.read()
+    sql = read_sql_file(sql_path)
     # Find the CREATE TABLE statement for the table
     pattern = rf"CREATE TABLE \[dbo\]\.\[{table_name}\]\((.*?)\)WITH"  # non-greedy match
     match = re.search(pattern, sql, re.DOTALL | re.IGNORECASE)
@@ -92,12 +161,7 @@ def get_table_columns_from_sql(sql_path, table_name):
     return columns
 
 def get_all_table_columns_from_sql(sql_path):
-    try:
-        with open(sql_path, encoding='utf-8') as f:
-            sql = f.read()
-    except UnicodeDecodeError:
-        with open(sql_path, encoding='utf-16') as f:
-            sql = f.read()
+    sql = read_sql_file(sql_path)
     # Finn alle CREATE TABLE ... ( ... )WITH ... blokker
     pattern = r"CREATE TABLE \[dbo\]\.\[(\w+)\]\((.*?)\)WITH"  # non-greedy match
     matches = re.findall(pattern, sql, re.DOTALL | re.IGNORECASE)
@@ -115,216 +179,397 @@ def get_all_table_columns_from_sql(sql_path):
         table_columns[table.upper()] = columns
     return table_columns
 
+# Tilstand som vokser med datavolumet holdes kompakt: duplikatsjekk på 64-bits
+# hasher av nøkkelen i stedet for tupler av hele raden, og ID-sett som bitmap.
+# Sammen med at radene strømmes (load_json) er minnebruken per rad noen få byte.
+MAX_BITMAP_ID = 1 << 28  # 32 MB bitmap; større ID-er havner i et vanlig sett
+MAX_ERROR_TYPES = 20  # distinkte feilmeldinger som telles hver for seg
+DEDUP_BATCH_SIZE = 5000  # rader per vektorisert duplikatsjekk
+
+def key_hash(values):
+    """64-bit hash of a row key (a tuple of column values); the key itself is not kept."""
+    return int.from_bytes(hashlib.blake2b(repr(values).encode('utf-8'), digest_size=8).digest(), 'big')
+
+class KeyHashes:
+    """Seen-set of row keys: key_hash values in an open-addressing NumPy table.
+
+    At most 16 bytes per key and no row data, against a set of tuples that
+    keeps every key's values alive. unique() checks a batch of rows at a time.
+    """
+
+    def __init__(self, key, capacity=1 << 16):
+        self.key = key  # row -> tuple of key values
+        self.table = np.zeros(capacity, dtype=np.uint64)  # 0 = tom plass
+        self.count = 0
+        self.duplicates = 0
+
+    def unique(self, rows, batch_size=DEDUP_BATCH_SIZE):
+        # The rows whose key has not been seen before, in their original order
+        for batch in in_batches(rows, batch_size):
+            digests = np.fromiter((key_hash(self.key(row)) for row in batch), dtype=np.uint64, count=len(batch))
+            new = self.add(digests)
+            self.duplicates += len(batch) - int(new.sum())
+            for row, keep in zip(batch, new):
+                if keep:
+                    yield row
+
+    def add(self, digests):
+        """Insert digests; True where a digest is new (and first in the batch)."""
+        digests = np.where(digests == 0, np.uint64(1), digests)
+        keys, first = np.unique(digests, return_index=True)
+        while 2 * (self.count + len(keys)) > len(self.table):
+            self._resize(2 * len(self.table))
+        new = np.zeros(len(digests), dtype=bool)
+        new[first[self._insert(keys)]] = True
+        return new
+
+    def _insert(self, keys):
+        # Linear probing for all keys at once; returns which keys were not already present
+        mask = np.uint64(len(self.table) - 1)
+        slots = keys & mask
+        inserted = np.zeros(len(keys), dtype=bool)
+        pending = np.arange(len(keys))
+        while len(pending):
+            current = self.table[slots[pending]]
+            empty = current == 0
+            # Several keys may probe the same empty slot; the first one takes it, the rest probe on
+            claim = pending[empty]
+            _, winners = np.unique(slots[claim], return_index=True)
+            winners = claim[winners]
+            self.table[slots[winners]] = keys[winners]
+            inserted[winners] = True
+            taken = ~empty & (current != keys[pending])
+            slots[pending[taken]] = (slots[pending[taken]] + np.uint64(1)) & mask
+            pending = pending[taken | (empty & ~inserted[pending])]
+        self.count += int(inserted.sum())
+        return inserted
+
+    def _resize(self, capacity):
+        old = self.table[self.table != 0]
+        self.table = np.zeros(capacity, dtype=np.uint64)
+        self.count = 0
+        self._insert(old)
+
+class IdSet:
+    """Set of integer IDs as a bitmap: one bit per possible ID instead of a set entry per member."""
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.overflow = set()
+
+    def add(self, value):
+        if not 0 <= value < MAX_BITMAP_ID:
+            self.overflow.add(value)
+            return
+        byte = value >> 3
+        if byte >= len(self.bits):
+            # Grow geometrically so filling the bitmap stays linear
+            self.bits.extend(bytes(max(byte + 1, 2 * len(self.bits)) - len(self.bits)))
+        self.bits[byte] |= 1 << (value & 7)
+
+    def __contains__(self, value):
+        if not 0 <= value < MAX_BITMAP_ID:
+            return value in self.overflow
+        byte = value >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (value & 7) & 1)
+
+def insert_sql(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+
+def bulk_insert(conn, table, columns, rows, batch_size=None, on_error=None, backend=None):
+    """Insert dict rows into `table` with one prepared INSERT, batch_size rows per executemany.
+
+    Each batch is committed on its own. A batch that fails is rolled back and
+    retried row by row, so good rows still go in and on_error(row, exc) gets
+    the bad ones. Prints rows/s and returns the number of rows inserted.
+    """
+    sql = insert_sql(table, columns)
+    cursor = conn.cursor()
+    (backend or get_backend()).prepare_bulk(cursor)
+    inserted = failed = 0
+    start = time.perf_counter()
+    for batch in in_batches(rows, batch_size or BATCH_SIZE):
+        values = [[row.get(col) for col in columns] for row in batch]
+        try:
+            cursor.executemany(sql, values)
+            conn.commit()
+            inserted += len(batch)
+            continue
+        except Exception:
+            conn.rollback()
+        for row, row_values in zip(batch, values):
+            try:
+                cursor.execute(sql, row_values)
+                inserted += 1
+            except Exception as e:
+                failed += 1
+                if on_error:
+                    on_error(row, e)
+        conn.commit()
+    seconds = time.perf_counter() - start
+    rate = inserted / seconds if seconds > 0 else 0
+    print(f"{table}: {inserted} rows in {seconds:.2f}s ({rate:.0f} rows/s)" + (f", {failed} failed" if failed else ""))
+    cursor.close()
+    return inserted
+
+def table_dependencies(schema, tables):
+    # {tabell: foreldretabeller} fra FK-ene i DDL-en, begrenset til tabellene som lastes.
+    # Selvreferanser (ORGANIZATION.MOTHERORG) er ikke en avhengighet mellom tabeller.
+    return {table: {parent for _, parent, _ in schema.get(table, {}).get('foreign_keys', [])
+                    if parent != table and parent in tables}
+            for table in tables}
+
+def load_tables(backend, loaders, dependencies, connections):
+    """Run loaders[table](conn) for every table, up to `connections` at a time.
+
+    A table starts as soon as all its parents have committed; each worker
+    borrows a connection from a pool of `connections`. A failed table stops
+    the tables that depend on it, independent tables still load. Returns the
+    tables that failed or were skipped.
+    """
+    connections = max(1, min(connections, len(loaders)))
+    pool = queue.Queue()
+    for _ in range(connections):
+        pool.put(backend.connect())
+
+    def run(table):
+        conn = pool.get()
+        start = time.perf_counter()
+        try:
+            loaders[table](conn)
+            return time.perf_counter() - start
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.put(conn)
+
+    pending = list(loaders)
+    done, failed = set(), []
+    running = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        while pending or running:
+            # Tabeller med en feilet forelder kan aldri lastes
+            for table in list(pending):
+                if dependencies[table] & set(failed):
+                    pending.remove(table)
+                    failed.append(table)
+                    print(f"[WARNING] Skipping {table}: parent table failed.")
+
+            for table in [t for t in pending if dependencies[t] <= done]:
+                pending.remove(table)
+                running[executor.submit(run, table)] = table
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                try:
+                    print(f"{table} committed after {future.result():.2f}s.")
+                    done.add(table)
+                except Exception as e:
+                    print(f"[ERROR] Loading {table} failed: {e}")
+                    failed.append(table)
+    while not pool.empty():
+        pool.get().close()
+    print(f"Loaded {len(done)} tables in {time.perf_counter() - start:.2f}s on {connections} connection(s).")
+    return failed
+
 # Les alle tabellkolonner fra masterfilen
 sql_master_path = rel_path('aiConversions', 'sql', 'automated_test.sql')
 table_columns_dict = get_all_table_columns_from_sql(sql_master_path)
 
-# Kjør automatisk database-clean før innlasting
-clean_database(cursor)
-
-# 1. SCALETYPE
-print('Inserting SCALETYPE...')
-scaletypes = load_json('scaletype_data.json')
-scaletype_cols = table_columns_dict['SCALETYPE']
-for row in scaletypes:
-    values = [row.get(col) for col in scaletype_cols]
-    placeholders = ', '.join(['?'] * len(scaletype_cols))
-    col_list = ', '.join(scaletype_cols)
-    cursor.execute(
-        f"INSERT INTO SCALETYPE ({col_list}) VALUES ({placeholders})",
-        values
-    )
-conn.commit()
-
-# 2. SCALE
-print('Inserting SCALE...')
-if os.path.exists(os.path.join(DATA_DIR, 'scale_data_full.json')):
-    scales = load_json('scale_data_full.json')
-    scale_cols = table_columns_dict['SCALE']
-    for row in scales:
-        values = [row.get(col) for col in scale_cols]
-        placeholders = ', '.join(['?'] * len(scale_cols))
-        col_list = ', '.join(scale_cols)
-        cursor.execute(
-            f"INSERT INTO SCALE ({col_list}) VALUES ({placeholders})",
-            values
-        )
-    conn.commit()
-
-# 3. ORGANIZATION
-print('Inserting ORGANIZATION...')
-orgs = load_json('organization_data_with_gpt.json')
-org_cols = table_columns_dict['ORGANIZATION']
-for row in orgs:
-    values = [row.get(col) for col in org_cols]
-    placeholders = ', '.join(['?'] * len(org_cols))
-    col_list = ', '.join(org_cols)
-    cursor.execute(
-        f"INSERT INTO ORGANIZATION ({col_list}) VALUES ({placeholders})",
-        values
-    )
-conn.commit()
-
-# 4. EMPLOYEE
-print('Inserting EMPLOYEE...')
-employees = load_json('employee_data_full.json')
-emp_cols = table_columns_dict['EMPLOYEE']
-for row in employees:
-    values = [row.get(col) for col in emp_cols]
-    placeholders = ', '.join(['?'] * len(emp_cols))
-    col_list = ', '.join(emp_cols)
-    cursor.execute(
-        f"INSERT INTO EMPLOYEE ({col_list}) VALUES ({placeholders})",
-        values
-    )
-conn.commit()
-
-# 5. ACCESSCATALYST
-print('Inserting ACCESSCATALYST...')
-access = load_json('accesscatalyst_data.json')
-access_cols = [col for col in table_columns_dict['ACCESSCATALYST'] if col.upper() != 'ACCESSCATALYST']  # ekskluder identity
-access_seen = set()
-access_skipped = 0
-for idx, row in enumerate(access):
-    # Deduplication: use tuple of all non-identity columns as key
-    key = tuple(row.get(col) for col in access_cols)
-    if key in access_seen:
-        access_skipped += 1
-        continue
-    access_seen.add(key)
-    values = [row.get(col) for col in access_cols]
-    placeholders = ', '.join(['?'] * len(access_cols))
-    col_list = ', '.join(access_cols)
-    cursor.execute(
-        f"INSERT INTO ACCESSCATALYST ({col_list}) VALUES ({placeholders})",
-        values
-    )
-conn.commit()
-if access_skipped:
-    print(f"[WARNING] Skipped {access_skipped} duplicate ACCESSCATALYST rows.")
-
-# 6. USERPROFILE_FIELD
-print('Inserting USERPROFILE_FIELD...')
-fields = load_json('userprofile_field_data.json')
-userprofile_field_cols = [col for col in table_columns_dict['USERPROFILE_FIELD'] if col.upper() != 'USERPROFILE_FIELD_ID']  # ekskluder identity
-skipped_rows = []
-inserted_count = 0
-field_seen = set()
-for idx, row in enumerate(fields):
-    # Only use keys that are in the SQL schema
-    filtered_row = {col: row.get(col) for col in userprofile_field_cols}
-    # Warn if there are extra fields in the JSON row
-    extra_fields = set(row.keys()) - set(userprofile_field_cols)
-    if extra_fields:
-        print(f"[WARNING] Row {idx} contains extra fields not in schema: {extra_fields}")
-    # Validation: FIELD_NAME must not be None or empty
-    fieldname_val = filtered_row.get('FIELD_NAME')
-    if fieldname_val is None or (isinstance(fieldname_val, str) and not fieldname_val.strip()):
-        skipped_rows.append({'index': idx, 'row': row})
-        continue
-    # Deduplication: use tuple of all non-identity columns as key (from schema only)
-    key = tuple(filtered_row.get(col) for col in userprofile_field_cols)
-    if key in field_seen:
-        continue
-    field_seen.add(key)
-    values = [filtered_row.get(col) for col in userprofile_field_cols]
-    placeholders = ', '.join(['?'] * len(userprofile_field_cols))
-    col_list = ', '.join(userprofile_field_cols)
-    cursor.execute(
-        f"INSERT INTO USERPROFILE_FIELD ({col_list}) VALUES ({placeholders})",
-        values
-    )
-    inserted_count += 1
-conn.commit()
-if skipped_rows:
-    print(f"[WARNING] Skipped {len(skipped_rows)} USERPROFILE_FIELD rows due to missing FIELD_NAME:")
-    for item in skipped_rows:
-        print(f"  Row {item['index']}: {item['row']}")
-else:
-    print(f"Inserted {inserted_count} USERPROFILE_FIELD rows.")
-
-# 7. USERPROFILE
-print('Inserting USERPROFILE...')
-profiles = load_json('userprofile_data.json')
-userprofile_cols = table_columns_dict['USERPROFILE']
-# Load valid ACCESSCATALYST IDs from accesscatalyst_data.json
-access_rows = load_json('accesscatalyst_data.json')
-valid_accesscatalyst_ids = set(row['ACCESSCATALYST'] for row in access_rows)
-skipped_profiles = []
-profile_seen = set()
-for idx, row in enumerate(profiles):
-    ac_val = row.get('ACCESSCATALYST')
-    # Stricter validation: must be int (not bool/float/str), not None, and in valid set
-    if ac_val is None or type(ac_val) is not int or ac_val not in valid_accesscatalyst_ids:
-        if len(skipped_profiles) < 5:
-            print(f"[ERROR] Skipping USERPROFILE row {idx}: Invalid ACCESSCATALYST value: {ac_val} (type: {type(ac_val)}) | Row: {row}")
-        elif len(skipped_profiles) == 5:
-            print("[ERROR] ... (more skipped rows, see summary below)")
-        skipped_profiles.append({'index': idx, 'row': row})
-        continue
-    # Deduplication: use only the primary key columns as key
-    pk_key = (row.get('USERFIELD'), row.get('ACCESSCATALYST'))
-    if pk_key in profile_seen:
-        continue
-    profile_seen.add(pk_key)
-    values = [row.get(col) for col in userprofile_cols]
-    placeholders = ', '.join(['?'] * len(userprofile_cols))
-    col_list = ', '.join(userprofile_cols)
-    try:
-        cursor.execute(
-            f"INSERT INTO USERPROFILE ({col_list}) VALUES ({placeholders})",
-            values
-        )
-    except Exception as e:
-        if len(skipped_profiles) < 5:
-            print(f"[EXCEPTION] Insert failed for USERPROFILE row {idx}: {row}\n  Error: {e}")
-        elif len(skipped_profiles) == 5:
-            print("[EXCEPTION] ... (more skipped rows, see summary below)")
-        skipped_profiles.append({'index': idx, 'row': row, 'error': str(e)})
-conn.commit()
-if skipped_profiles:
-    print(f"[WARNING] Skipped {len(skipped_profiles)} USERPROFILE rows due to invalid ACCESSCATALYST, duplicates, or insert errors. Showing first 5 only.")
-else:
-    print(f"Inserted {len(profile_seen)} USERPROFILE rows.")
-
-# 8. USERPROFILE_HISTORY
-print('Inserting USERPROFILE_HISTORY...')
-history = load_json('userprofile_history_data.json')
-userprofile_history_cols = [col for col in table_columns_dict['USERPROFILE_HISTORY'] if col.upper() not in ('USERPROFILE_HISTORY_ID', 'RECORD_NUMBER')]  # ekskluder identity
-error_messages = {}
-error_count = 0
-for idx, row in enumerate(history):
-    # Map old field name to new if present
-    if 'USERPROFILE_FIELD_ID' not in row and 'USERPROFILE_FIELD' in row:
-        row['USERPROFILE_FIELD_ID'] = row['USERPROFILE_FIELD']
-    # Remove identity columns if present
-    if 'USERPROFILE_HISTORY_ID' in row:
-        del row['USERPROFILE_HISTORY_ID']
-    if 'RECORD_NUMBER' in row:
-        del row['RECORD_NUMBER']
+def main():
+    backend = get_backend()
+    conn = backend.connect()
+    cursor = conn.cursor()
+    if '--create-schema' in sys.argv or backend.name == 'sqlite':
+        backend.create_schema(conn)
+
+    # Kjør automatisk database-clean før innlasting
+    reset = get_arg_value('--reset', 'delete')
+    if reset not in RESET_MODES:
+        print(f"❌ Unknown reset mode '{reset}' (choose from {', '.join(RESET_MODES)})")
+        sys.exit(1)
+    reset_state = None
+    if reset == 'fast':
+        reset_state = fast_reset_database(conn, backend)
+    else:
+        clean_database(cursor, backend)
+    cursor.close()
+
+    # Én funksjon per tabell; load_tables kjører dem i FK-rekkefølge.
+    # ACCESSCATALYST-ID-ene samles mens tabellen lastes, og brukes av USERPROFILE (som venter på den).
+    valid_accesscatalyst_ids = IdSet()
+
+    # 1. SCALETYPE
+    def load_scaletype(conn):
+        print('Inserting SCALETYPE...')
+        bulk_insert(conn, 'SCALETYPE', table_columns_dict['SCALETYPE'], load_json('scaletype_data.json'))
+
+    # 2. SCALE
+    def load_scale(conn):
+        print('Inserting SCALE...')
+        if artifact_exists('scale_data_full.json'):
+            bulk_insert(conn, 'SCALE', table_columns_dict['SCALE'], load_json('scale_data_full.json'))
+
+    # 3. ORGANIZATION
+    def load_organization(conn):
+        print('Inserting ORGANIZATION...')
+        bulk_insert(conn, 'ORGANIZATION', table_columns_dict['ORGANIZATION'], load_json('organization_data_with_gpt.json'))
+
+    # 4. EMPLOYEE
+    def load_employee(conn):
+        print('Inserting EMPLOYEE...')
+        bulk_insert(conn, 'EMPLOYEE', table_columns_dict['EMPLOYEE'], load_json('employee_data_full.json'))
+
+    # 5. ACCESSCATALYST
+    def load_accesscatalyst(conn):
+        print('Inserting ACCESSCATALYST...')
+        access_cols = [col for col in table_columns_dict['ACCESSCATALYST'] if col.upper() != 'ACCESSCATALYST']  # ekskluder identity
+        # Deduplication: hash of all non-identity columns as key
+        access_seen = KeyHashes(lambda row: tuple(row.get(col) for col in access_cols))
+
+        def collect_ids(rows):
+            for row in rows:
+                ac_val = row.get('ACCESSCATALYST')
+                if type(ac_val) is int:
+                    valid_accesscatalyst_ids.add(ac_val)
+                yield row
+
+        bulk_insert(conn, 'ACCESSCATALYST', access_cols, access_seen.unique(collect_ids(load_json('accesscatalyst_data.json'))))
+        if access_seen.duplicates:
+            print(f"[WARNING] Skipped {access_seen.duplicates} duplicate ACCESSCATALYST rows.")
+
+    # 6. USERPROFILE_FIELD
+    def load_userprofile_field(conn):
+        print('Inserting USERPROFILE_FIELD...')
+        userprofile_field_cols = [col for col in table_columns_dict['USERPROFILE_FIELD'] if col.upper() != 'USERPROFILE_FIELD_ID']  # ekskluder identity
+        skipped_rows = []
+        # Deduplication: hash of all non-identity columns as key (from schema only)
+        field_seen = KeyHashes(lambda row: tuple(row.get(col) for col in userprofile_field_cols))
+
+        def valid_fields(rows):
+            for idx, row in enumerate(rows):
+                # Only use keys that are in the SQL schema
+                filtered_row = {col: row.get(col) for col in userprofile_field_cols}
+                # Warn if there are extra fields in the JSON row
+                extra_fields = set(row.keys()) - set(userprofile_field_cols)
+                if extra_fields:
+                    print(f"[WARNING] Row {idx} contains extra fields not in schema: {extra_fields}")
+                # Validation: FIELD_NAME must not be None or empty
+                fieldname_val = filtered_row.get('FIELD_NAME')
+                if fieldname_val is None or (isinstance(fieldname_val, str) and not fieldname_val.strip()):
+                    skipped_rows.append({'index': idx, 'row': row})
+                    continue
+                yield filtered_row
+
+        inserted_count = bulk_insert(conn, 'USERPROFILE_FIELD', userprofile_field_cols,
+                                     field_seen.unique(valid_fields(load_json('userprofile_field_data.json'))))
+        if skipped_rows:
+            print(f"[WARNING] Skipped {len(skipped_rows)} USERPROFILE_FIELD rows due to missing FIELD_NAME:")
+            for item in skipped_rows:
+                print(f"  Row {item['index']}: {item['row']}")
+        else:
+            print(f"Inserted {inserted_count} USERPROFILE_FIELD rows.")
+
+    # 7. USERPROFILE
+    def load_userprofile(conn):
+        print('Inserting USERPROFILE...')
+        userprofile_cols = table_columns_dict['USERPROFILE']
+        # Valid ACCESSCATALYST IDs were collected while ACCESSCATALYST was loaded
+        skipped_profiles = 0
+        # Deduplication: use only the primary key columns as key
+        profile_seen = KeyHashes(lambda row: (row.get('USERFIELD'), row.get('ACCESSCATALYST')))
+
+        def valid_profiles(rows):
+            nonlocal skipped_profiles
+            for idx, row in enumerate(rows):
+                ac_val = row.get('ACCESSCATALYST')
+                # Stricter validation: must be int (not bool/float/str), not None, and in valid set
+                if ac_val is None or type(ac_val) is not int or ac_val not in valid_accesscatalyst_ids:
+                    if skipped_profiles < 5:
+                        print(f"[ERROR] Skipping USERPROFILE row {idx}: Invalid ACCESSCATALYST value: {ac_val} (type: {type(ac_val)}) | Row: {row}")
+                    elif skipped_profiles == 5:
+                        print("[ERROR] ... (more skipped rows, see summary below)")
+                    skipped_profiles += 1
+                    continue
+                yield row
+
+        def profile_failed(row, e):
+            nonlocal skipped_profiles
+            if skipped_profiles < 5:
+                print(f"[EXCEPTION] Insert failed for USERPROFILE row: {row}\n  Error: {e}")
+            elif skipped_profiles == 5:
+                print("[EXCEPTION] ... (more skipped rows, see summary below)")
+            skipped_profiles += 1
+
+        profiles_inserted = bulk_insert(conn, 'USERPROFILE', userprofile_cols, profile_seen.unique(valid_profiles(load_json('userprofile_data.json'))),
+                                        on_error=profile_failed)
+        if skipped_profiles:
+            print(f"[WARNING] Skipped {skipped_profiles} USERPROFILE rows due to invalid ACCESSCATALYST, duplicates, or insert errors. Showing first 5 only.")
+        else:
+            print(f"Inserted {profiles_inserted} USERPROFILE rows.")
+
+    # 8. USERPROFILE_HISTORY
+    def load_userprofile_history(conn):
+        print('Inserting USERPROFILE_HISTORY...')
+        userprofile_history_cols = [col for col in table_columns_dict['USERPROFILE_HISTORY'] if col.upper() not in ('USERPROFILE_HISTORY_ID', 'RECORD_NUMBER')]  # ekskluder identity
+        error_messages = {}
+        error_count = 0
+
+        def history_rows(rows):
+            for row in rows:
+                # Map old field name to new if present
+                if 'USERPROFILE_FIELD_ID' not in row and 'USERPROFILE_FIELD' in row:
+                    row['USERPROFILE_FIELD_ID'] = row['USERPROFILE_FIELD']
+                # Identity columns are not in userprofile_history_cols, so they are never sent
+                yield row
+
+        def history_failed(row, e):
+            nonlocal error_count
+            msg = str(e)
+            if msg not in error_messages and len(error_messages) >= MAX_ERROR_TYPES:
+                # Meldinger med radverdier i seg skal ikke fylle minnet
+                msg = '(other error types)'
+            if msg not in error_messages:
+                if len(error_messages) < 5:
+                    print(f"[ERROR] USERPROFILE_HISTORY row failed: {e}\n  Row: {row}")
+                elif len(error_messages) == 5:
+                    print("[ERROR] ... (more unique error types, see summary below)")
+            error_messages[msg] = error_messages.get(msg, 0) + 1
+            error_count += 1
+
+        bulk_insert(conn, 'USERPROFILE_HISTORY', userprofile_history_cols, history_rows(load_json('userprofile_history_data.json')),
+                    on_error=history_failed)
+        if error_messages:
+            print(f"[SUMMARY] {error_count} USERPROFILE_HISTORY rows failed to insert. Unique error types:")
+            for msg, count in error_messages.items():
+                print(f"  {count} rows: {msg}")
+
+    loaders = {'SCALETYPE': load_scaletype, 'SCALE': load_scale, 'ORGANIZATION': load_organization,
+               'EMPLOYEE': load_employee, 'ACCESSCATALYST': load_accesscatalyst,
+               'USERPROFILE_FIELD': load_userprofile_field, 'USERPROFILE': load_userprofile,
+               'USERPROFILE_HISTORY': load_userprofile_history}
+    connections = max(1, int(get_arg_value('--connections', backend.default_connections)))
     try:
-        values = [row.get(col) for col in userprofile_history_cols]
-        placeholders = ', '.join(['?'] * len(userprofile_history_cols))
-        col_list = ', '.join(userprofile_history_cols)
-        cursor.execute(
-            f"INSERT INTO USERPROFILE_HISTORY ({col_list}) VALUES ({placeholders})",
-            values
-        )
-    except Exception as e:
-        msg = str(e)
-        if msg not in error_messages:
-            if len(error_messages) < 5:
-                print(f"[ERROR] USERPROFILE_HISTORY row {idx} failed: {e}\n  Row: {row}")
-            elif len(error_messages) == 5:
-                print("[ERROR] ... (more unique error types, see summary below)")
-        error_messages[msg] = error_messages.get(msg, 0) + 1
-        error_count += 1
-conn.commit()
-if error_messages:
-    print(f"[SUMMARY] {error_count} USERPROFILE_HISTORY rows failed to insert. Unique error types:")
-    for msg, count in error_messages.items():
-        print(f"  {count} rows: {msg}")
-
-print('✅ All data loaded successfully!')
-cursor.close()
-conn.close()
+        failed = load_tables(backend, loaders, table_dependencies(load_schema(sql_master_path), loaders), connections)
+    finally:
+        # Constraints og indekser må tilbake også når innlastingen feiler
+        invalid = restore_database(conn, reset_state, backend) if reset_state is not None else []
+        conn.close()
+    if invalid:
+        print(f"[WARNING] Foreign keys not valid after load: {', '.join(invalid)}")
+    if failed:
+        print(f"❌ Loading failed for: {', '.join(failed)}")
+        sys.exit(1)
+    print('✅ All data loaded successfully!')
+
+# Usage: python utils/load_generated_data.py [--dry-run] [--artifact-format json|jsonl] [--batch-size 5000]
+#            [--db-backend sqlserver|sqlite] [--db-path FILE | --sqlite FILE] [--create-schema] [--connections N]
+#            [--reset delete|fast]
+if __name__ == "__main__":
+    main()
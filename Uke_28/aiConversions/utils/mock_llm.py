@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from faker import Faker
+from utils.token_logger import estimate_tokens
+
+# Offline stand-in for the AzureOpenAI client, selected with LLM_BACKEND=mock
+# (dry runs use it by default). It exposes the same chat.completions.create()
+# so the generators run their real code path at production volume, only
+# without network and cost. Answers depend only on the request, so a seeded
+# run gives the same data whatever the concurrency.
+#
+#   LLM_MOCK_LATENCY            seconds per call (default 0)
+#   LLM_MOCK_ERROR_RATE         share of calls failing with a retryable error (default 0)
+#   LLM_MOCK_COMPLETION_TOKENS  fixed completion token count (default: estimated from the reply)
+#   LLM_MOCK_DROP_RATE          share of items left out of chat_batch() answers (default 0)
+
+
+class MockServiceError(Exception):
+    """Transient failure injected by the mock; llm_client retries it like a 5xx."""
+
+
+def _list_item(fake, prompt):
+    item = fake.job() if "job title" in prompt.lower() else fake.bs().title()
+    return item.replace(",", "")
+
+
+def mock_reply(fake, prompt, max_tokens, drop_rate=0.0):
+    """Shape the answer like the generators expect from the real model.
+
+    Batch prompts from llm_client.chat_batch() get a JSON object with one item
+    per input id (minus `drop_rate` of them, to exercise the re-asking).
+    "Generate N ... separated by commas" prompts get N comma-separated items
+    and "Generate N ... JSON array" prompts a JSON array of N strings;
+    everything else gets one short sentence.
+    """
+    if '"items"' in prompt and "Inputs:\n" in prompt:
+        ids = [int(line.split(":", 1)[0]) for line in prompt.split("Inputs:\n", 1)[1].splitlines() if line.strip()]
+        items = [{"id": i, "value": fake.sentence(nb_words=8)} for i in ids if fake.random.random() >= drop_rate]
+        return json.dumps({"items": items})
+    count = re.search(r"\bgenerate (?:exactly )?(\d+)\b", prompt, re.IGNORECASE)
+    if count and "json array" in prompt.lower():
+        return json.dumps([fake.word().title() + " " + fake.word() for _ in range(int(count.group(1)))])
+    if count and "comma" in prompt.lower():
+        return ", ".join(_list_item(fake, prompt) for _ in range(int(count.group(1))))
+    words = min(12, max(3, (max_tokens or 50) // 4))
+    return fake.sentence(nb_words=words)
+
+
+class MockCompletions:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def create(self, model, messages, max_tokens=None, temperature=None, **kwargs):
+        return self.backend.complete(model, messages, max_tokens, temperature)
+
+
+class MockLLM:
+    def __init__(self, latency=0.0, error_rate=0.0, completion_tokens=None, drop_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.completion_tokens = completion_tokens
+        self.errors = random.Random(seed)
+        self.fake = Faker()
+        self.lock = threading.Lock()  # one Faker instance, reseeded per request
+        self.chat = SimpleNamespace(completions=MockCompletions(self))
+
+    @classmethod
+    def from_env(cls):
+        tokens = os.environ.get("LLM_MOCK_COMPLETION_TOKENS")
+        return cls(latency=float(os.environ.get("LLM_MOCK_LATENCY", 0)),
+                   error_rate=float(os.environ.get("LLM_MOCK_ERROR_RATE", 0)),
+                   completion_tokens=int(tokens) if tokens else None,
+                   drop_rate=float(os.environ.get("LLM_MOCK_DROP_RATE", 0)))
+
+    def complete(self, model, messages, max_tokens, temperature):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            failed = self.error_rate and self.errors.random() < self.error_rate
+        if failed:
+            raise MockServiceError("mock backend: injected transient error")
+
+        request = json.dumps([model, messages, max_tokens, temperature], sort_keys=True)
+        seed = int(hashlib.sha256(request.encode("utf-8")).hexdigest()[:16], 16)
+        prompt = messages[-1]["content"]
+        with self.lock:
+            self.fake.seed_instance(seed)
+            content = mock_reply(self.fake, prompt, max_tokens, self.drop_rate)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = self.completion_tokens or estimate_tokens(content)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens)
+        )
@@ -0,0 +1,137 @@
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Importable both as utils.mock_llm_server and as a standalone script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+from utils.token_logger import estimate_tokens
+
+# Minimal stand-in for the Azure OpenAI chat completions endpoint, used to
+# exercise utils/llm_client.py without a key or network access. Every request
+# waits `latency` seconds. The reply echoes the first quoted value in the
+# prompt (e.g. the field value in generate_reason), so callers can check that
+# answers come back on the right rows.
+#
+# With `rpm`/`tpm` it enforces quotas like the real deployment: requests and
+# tokens (prompt estimate + max_tokens) are counted over a sliding `window`
+# (60 seconds by default) and anything over quota gets a 429 with
+# Retry-After / retry-after-ms headers.
+#
+# Point the pipeline at it with
+#   AZURE_OPENAI_ENDPOINT=http://127.0.0.1:<port> AZURE_OPENAI_API_KEY=mock
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if not self.path.split("?")[0].endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        server = self.server
+        retry_after = server.over_quota(estimate_tokens(prompt) + (body.get("max_tokens") or 0))
+        if retry_after is not None:
+            self.send_response(429)
+            self.send_header("Retry-After", str(math.ceil(retry_after)))
+            self.send_header("retry-after-ms", str(int(retry_after * 1000)))
+            self.send_header("Content-Type", "application/json")
+            data = json.dumps({"error": {"code": "429", "message": "Rate limit exceeded"}}).encode("utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            number = server.requests
+        try:
+            time.sleep(server.latency)
+            quoted = re.search(r"'([^']*)'", prompt)
+            content = f"Mock reply for '{quoted.group(1)}'" if quoted else f"Mock reply {number}"
+            prompt_tokens = len(prompt.split())
+            completion_tokens = len(content.split())
+            payload = {
+                "id": f"mock-{number}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output readable
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.2, rpm=None, tpm=None, window=60.0):
+        super().__init__(address, MockHandler)
+        self.latency = latency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttled = 0
+        self.admitted = deque()  # (time, tokens) of requests inside the window
+
+    def over_quota(self, tokens):
+        # Admit the request and return None, or return seconds until it would fit
+        with self.lock:
+            now = time.monotonic()
+            while self.admitted and self.admitted[0][0] <= now - self.window:
+                self.admitted.popleft()
+            used = sum(t for _, t in self.admitted)
+            if (self.rpm and len(self.admitted) + 1 > self.rpm) or (self.tpm and used + tokens > self.tpm):
+                self.throttled += 1
+                oldest = self.admitted[0][0] if self.admitted else now
+                return max(0.001, oldest + self.window - now)
+            self.admitted.append((now, tokens))
+            return None
+
+
+def start_mock_server(latency=0.2, port=0, rpm=None, tpm=None, window=60.0):
+    """Serve on 127.0.0.1 from a daemon thread. Returns (server, endpoint_url)."""
+    server = MockServer(("127.0.0.1", port), latency, rpm, tpm, window)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Usage: python utils/mock_llm_server.py [--port 8765] [--latency 0.2] [--rpm N] [--tpm N] [--window 60]
+if __name__ == "__main__":
+    def arg(flag, default):
+        return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv else default
+
+    rpm, tpm = arg("--rpm", None), arg("--tpm", None)
+    server, url = start_mock_server(float(arg("--latency", 0.2)), int(arg("--port", 8765)),
+                                    rpm=int(rpm) if rpm else None, tpm=int(tpm) if tpm else None,
+                                    window=float(arg("--window", 60)))
+    print(f"Mock chat completions endpoint on {url} (latency {server.latency}s, "
+          f"quota {rpm or '-'} RPM / {tpm or '-'} TPM), Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
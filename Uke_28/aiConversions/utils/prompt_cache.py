@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from utils.artifact_store import OUTPUT_ROOT
+
+# On-disk cache of chat completions shared by all runs. A key is the backend,
+# model, messages, temperature and max_tokens of a request. Each key keeps up to
+# `variants` different answers so repeated prompts (the same career topic
+# prompt for every employee) still get some variety; once a key is full, hits
+# rotate through its variants, least recently used first.
+#
+# Kept outside data/output/.cache, which holds step-cache pointer files only
+# and is swept by collect_garbage().
+CACHE_PATH = os.path.join(OUTPUT_ROOT, '.llm_cache', 'responses.sqlite')
+MODES = ("reuse", "refresh", "off")
+DEFAULT_VARIANTS = 3
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 20000
+
+
+def request_key(backend, model, messages, temperature, max_tokens):
+    parts = {"backend": backend, "model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class PromptCache:
+    """SQLite-backed response store with TTL and LRU eviction.
+
+    Entries older than `ttl_days` are never returned and are deleted on the
+    next eviction pass; beyond `max_entries` the least recently used rows go
+    first. One connection is shared by all threads behind a lock.
+    """
+
+    def __init__(self, path=CACHE_PATH, variants=DEFAULT_VARIANTS, ttl_days=DEFAULT_TTL_DAYS,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.variants = max(1, variants)
+        self.ttl_seconds = ttl_days * 24 * 3600 if ttl_days else None
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")  # parallel pipeline steps read while one writes
+        self.db.execute('''CREATE TABLE IF NOT EXISTS responses (
+            key TEXT NOT NULL,
+            variant INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            created REAL NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (key, variant))''')
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.db.commit()
+        self.evict()
+
+    def _oldest_allowed(self):
+        return time.time() - self.ttl_seconds if self.ttl_seconds else 0
+
+    def lookup(self, key, any_variant=False):
+        """Return (content, prompt_tokens, completion_tokens) or None.
+
+        Misses while the key still has room for another variant, so the caller
+        asks the model again and stores the new answer. With `any_variant`
+        (the token budget is spent) one stored answer is enough.
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT variant, content, prompt_tokens, completion_tokens FROM responses "
+                "WHERE key = ? AND created >= ? ORDER BY last_used, variant",
+                (key, self._oldest_allowed())).fetchall()
+            if not rows or (len(rows) < self.variants and not any_variant):
+                return None
+            variant, content, prompt_tokens, completion_tokens = rows[0]
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ? AND variant = ?",
+                            (time.time(), key, variant))
+            self.db.commit()
+            return content, prompt_tokens, completion_tokens
+
+    def store(self, key, content, prompt_tokens=0, completion_tokens=0):
+        # Fills the next free variant slot, or replaces the least recently used one
+        now = time.time()
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT variant FROM responses WHERE key = ? AND created >= ? ORDER BY last_used, variant",
+                (key, self._oldest_allowed())).fetchall()
+            used = {row[0] for row in rows}
+            free = [v for v in range(self.variants) if v not in used]
+            variant = free[0] if free else rows[0][0]
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (key, variant, content, prompt_tokens, completion_tokens, now, now))
+            self.db.commit()
+
+    def evict(self):
+        """Drop expired rows, then the least recently used beyond max_entries."""
+        with self.lock:
+            expired = self.db.execute("DELETE FROM responses WHERE created < ?", (self._oldest_allowed(),)).rowcount
+            overflow = 0
+            if self.max_entries:
+                overflow = self.db.execute(
+                    "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses "
+                    "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,)).rowcount
+            self.db.commit()
+        return expired + overflow
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,95 @@
+import threading
+import time
+
+# Client-side pacing for the deployment's requests-per-minute (RPM) and
+# tokens-per-minute (TPM) quotas. Every call reserves one request and its
+# estimated tokens (prompt estimate + max_tokens, which is what Azure counts)
+# before it is sent. The buckets hold only a slice of the minute (`burst`)
+# because Azure enforces quotas over short sub-windows, and a full minute's
+# burst up front is exactly what causes 429 storms.
+#
+# The refill rate adapts: a 429 cuts it and pauses everybody until the
+# Retry-After time, successes slowly raise it back to the quota.
+DEFAULT_WINDOW = 60.0
+DEFAULT_BURST = 1 / 6  # Azure evaluates RPM/TPM per 10 seconds
+MIN_SCALE = 0.2
+DECREASE = 0.7  # multiplied into the rate on every 429
+INCREASE = 0.02  # added back on every success
+
+
+class TokenBucket:
+    def __init__(self, per_window, window, burst):
+        self.rate = per_window / window  # units per second at full speed
+        self.capacity = max(1.0, per_window * burst)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now, scale):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate * scale)
+        self.updated = now
+
+    def wait_time(self, amount, scale):
+        # Seconds until `amount` is available. An oversize request only waits for a full
+        # bucket but is charged in full (see spend), so the callers after it pay it off
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / (self.rate * scale)
+
+    def spend(self, amount):
+        # May go negative: a debt the refill has to cover before the next admission
+        self.level -= amount
+
+
+class RateLimiter:
+    """Shared RPM/TPM token buckets with Retry-After pauses and AIMD backoff."""
+
+    def __init__(self, rpm=None, tpm=None, window=DEFAULT_WINDOW, burst=DEFAULT_BURST):
+        self.requests = TokenBucket(rpm, window, burst) if rpm else None
+        self.tokens = TokenBucket(tpm, window, burst) if tpm else None
+        self.scale = 1.0
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Block until one request and `tokens` tokens can be spent. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                buckets = [(b, n) for b, n in ((self.requests, 1), (self.tokens, tokens)) if b]
+                for bucket, _ in buckets:
+                    bucket.refill(now, self.scale)
+                wait = max([self.paused_until - now] + [b.wait_time(n, self.scale) for b, n in buckets])
+                if wait <= 0:
+                    for bucket, amount in buckets:
+                        bucket.spend(amount)
+                    return waited
+            wait = min(wait, 1.0)  # re-check regularly, a pause may have been lifted or extended
+            time.sleep(wait)
+            waited += wait
+
+    def throttled(self, retry_after=None):
+        # A 429 came back: slow down and hold all callers until Retry-After has passed
+        with self.lock:
+            self.scale = max(MIN_SCALE, self.scale * DECREASE)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            for bucket in (self.requests, self.tokens):
+                if bucket:
+                    bucket.level = min(bucket.level, 0.0)
+
+    def succeeded(self):
+        with self.lock:
+            self.scale = min(1.0, self.scale + INCREASE)
+
+
+def retry_after_seconds(error):
+    """Retry-After from a 429 error's response headers (retry-after-ms or retry-after), or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # an HTTP date; fall back to our own backoff
+    return None
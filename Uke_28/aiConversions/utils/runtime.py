@@ -0,0 +1,53 @@
+import os
+import random
+import uuid
+from datetime import datetime
+from faker import Faker
+
+# One Faker per process. Generators running in-process under main.py share it
+# instead of each building their own provider tables on import.
+_faker = None
+
+
+def get_faker():
+    global _faker
+    if _faker is None:
+        _faker = Faker()
+    return _faker
+
+
+def seed_all(seed):
+    # Seed the global random module and the shared Faker for a reproducible run
+    if seed is None:
+        return
+    random.seed(seed)
+    Faker.seed(seed)
+    get_faker().seed_instance(seed)
+
+
+# Run-wide settings main.py hands to every step (subprocess steps inherit them):
+# the --seed the large-table generators derive their per-row seeds from, and the
+# --as-of reference time all generated dates are relative to
+SEED_ENV = "PIPELINE_SEED"
+AS_OF_ENV = "PIPELINE_AS_OF"
+_run_seed = None
+
+
+def run_seed():
+    # Without --seed every process picks its own, as unseeded runs always did
+    global _run_seed
+    if os.environ.get(SEED_ENV):
+        return int(os.environ[SEED_ENV])
+    if _run_seed is None:
+        _run_seed = random.SystemRandom().getrandbits(63)
+    return _run_seed
+
+
+def run_time():
+    as_of = os.environ.get(AS_OF_ENV)
+    return datetime.fromisoformat(as_of) if as_of else datetime.now().replace(microsecond=0)
+
+
+def random_uuid(rng):
+    # uuid4 drawn from rng, so a seeded generator reproduces it
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
@@ -0,0 +1,57 @@
+import os
+
+# How much data one pipeline run produces. A profile fixes the row count of
+# every table that is not CSV-driven; the ratios below fix how many child rows
+# each parent gets, so the tables stay consistent at any size. --scale-factor
+# multiplies a profile's counts. main.py --scale/--scale-factor sets the env
+# vars below, which subprocess steps inherit; generators read them through
+# scale_rows() whenever they are not given an explicit row count.
+SCALE_ENV = "PIPELINE_SCALE"
+SCALE_FACTOR_ENV = "PIPELINE_SCALE_FACTOR"
+DEFAULT_PROFILE = "small"
+
+PROFILES = {
+    # small matches the counts the generators always had
+    "small": {"organizations": 100, "employees": 100, "scale_titles": 5, "auto_rows": 2},
+    "medium": {"organizations": 1000, "employees": 10000, "scale_titles": 20, "auto_rows": 100},
+    "large": {"organizations": 10000, "employees": 1000000, "scale_titles": 50, "auto_rows": 10000},
+}
+
+# Child rows per parent, the same in every profile
+ACCESSCATALYSTS_PER_EMPLOYEE = 1
+MAX_PROFILES_PER_EMPLOYEE = 3  # 1..3 USERPROFILE rows per ACCESSCATALYST
+MAX_HISTORY_PER_PROFILE = 3  # 1..3 USERPROFILE_HISTORY rows per USERPROFILE
+
+
+def resolve_scale(profile=None, factor=None):
+    """Row counts for `profile` multiplied by `factor`, plus the settings they came from."""
+    profile = profile or DEFAULT_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown scale profile '{profile}' (choose from {', '.join(PROFILES)})")
+    factor = float(factor) if factor is not None else 1.0
+    if factor <= 0:
+        raise ValueError(f"--scale-factor must be positive, got {factor}")
+    counts = {table: max(1, round(rows * factor)) for table, rows in PROFILES[profile].items()}
+    return dict(counts, profile=profile, factor=factor)
+
+
+def get_scale():
+    return resolve_scale(os.environ.get(SCALE_ENV), os.environ.get(SCALE_FACTOR_ENV))
+
+
+def scale_rows(table):
+    return get_scale()[table]
+
+
+def expected_rows(table):
+    """Average row count of a child table before its parents exist (pre-flight estimates)."""
+    scale = get_scale()
+    accesscatalysts = scale["employees"] * ACCESSCATALYSTS_PER_EMPLOYEE
+    if table == "accesscatalysts":
+        return accesscatalysts
+    userprofiles = accesscatalysts * (1 + MAX_PROFILES_PER_EMPLOYEE) // 2
+    if table == "userprofiles":
+        return userprofiles
+    if table == "history":
+        return userprofiles * (1 + MAX_HISTORY_PER_PROFILE) // 2
+    return scale[table]
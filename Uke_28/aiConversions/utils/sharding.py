@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+from utils.artifacts import read_rows, write_json_lines
+from utils.counter_rng import derive_key
+from utils.runtime import run_seed, run_time
+
+# Sharded generation for the big tables (employee, accesscatalyst, userprofile,
+# history). The row range is split into --shards contiguous shards, each
+# generated by a worker process. Workers seed every row (or parent row) from
+# the table key derive_key(run seed, table) and its ID (utils/counter_rng.py),
+# so the output depends only on the seed and --as-of: not on scheduling, and
+# not on the shard count either. Shards are written to temporary JSON Lines
+# files and merged back in ID order.
+#
+# Workers build the plain columns only. AI fields are filled in by the parent
+# while it merges, so the rate limiter, token budget and usage counters stay
+# in one process.
+SHARDS_ENV = "PIPELINE_SHARDS"
+
+
+def get_shards():
+    return max(1, int(os.environ.get(SHARDS_ENV) or 1))
+
+
+def shard_ranges(count, shards):
+    # Contiguous [start, stop) ranges of range(count), sizes differing by at most one
+    shards = max(1, min(shards, count)) if count else 1
+    bounds = [count * k // shards for k in range(shards + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+class Shard:
+    """One worker's slice: rows [start, stop) of the table, plus what the worker needs to build them."""
+
+    def __init__(self, table, number, start, stop, key, as_of, path, args):
+        self.table = table
+        self.number = number
+        self.start = start
+        self.stop = stop
+        self.key = key
+        self.as_of = as_of
+        self.path = path
+        self.args = args
+
+
+def _run_shard(build, shard):
+    # Top-level so the spawn start method can pickle it
+    return write_json_lines(shard.path, build(shard))
+
+
+def sharded_rows(table, count, build, args=None, output_dir=None, shards=None):
+    """Yield the rows of `table` in ID order, generated by build(shard) over `shards` shards.
+
+    `build` must be a module-level function returning an iterable of rows for
+    shard.start..shard.stop. With one shard it runs in this process. Shard
+    files go to a temporary folder in output_dir (default: the system temp folder).
+    """
+    key, as_of = derive_key(run_seed(), table), run_time()
+    ranges = shard_ranges(count, shards or get_shards())
+    tmp_dir = tempfile.mkdtemp(prefix=f".{table}-shards-", dir=output_dir)
+    tasks = [Shard(table, k, start, stop, key, as_of,
+                   os.path.join(tmp_dir, f"{table}-{k:04d}.jsonl"), args)
+             for k, (start, stop) in enumerate(ranges)]
+    try:
+        if len(tasks) == 1:
+            _run_shard(build, tasks[0])
+            yield from read_rows(tasks[0].path)
+            return
+        # spawn: forking a process that runs steps on threads is not safe, and Windows has no fork
+        workers = min(len(tasks), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            # map() hands results back in shard order, so merging starts as soon as shard 0 is done
+            for shard, _ in zip(tasks, pool.map(_run_shard, [build] * len(tasks), tasks)):
+                yield from read_rows(shard.path)
+                os.remove(shard.path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def in_batches(rows, size):
+    # Lists of up to `size` rows, for the AI fields the parent fills in while merging
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
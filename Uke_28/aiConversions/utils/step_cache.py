@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+from utils.artifact_store import file_digest, link_from_store, OUTPUT_ROOT
+
+# Always resolve paths relative to the aiConversions folder
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+INPUT_CSV_DIR = os.path.join(PROJECT_ROOT, 'data', 'input', 'csv')
+# One small file per (step, key) holding the digest of the artifact in the blob store
+CACHE_DIR = os.path.join(OUTPUT_ROOT, '.cache')
+# Shared code every generator imports from; a change anywhere in it invalidates all steps
+UTILS_DIR = os.path.join(PROJECT_ROOT, 'utils')
+
+
+def code_digest(script):
+    # The generator script plus every module under utils/, by path relative to the project
+    files = [script] + sorted(os.path.relpath(os.path.join(root, name), PROJECT_ROOT)
+                              for root, _, names in os.walk(UTILS_DIR) for name in names if name.endswith('.py'))
+    return {path.replace(os.sep, '/'): file_digest(os.path.join(PROJECT_ROOT, path)) for path in files}
+
+
+def compute_step_key(step, output_dir, seed=None, args=None):
+    """Hash everything that can change a step's output.
+
+    That is the generator's source and the utils/ modules it builds on, the
+    CSV inputs it declares, the upstream artifacts it reads from this run,
+    the seed and the step arguments.
+    """
+    parts = {
+        "code": code_digest(step["script"]),
+        "inputs": {name: file_digest(os.path.join(INPUT_CSV_DIR, name)) for name in step.get("inputs", [])},
+        "upstream": {name: file_digest(os.path.join(output_dir, name)) for name in step["depends_on"]},
+        "seed": seed,
+        "args": args or {},
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def cache_entry_path(step, key):
+    step_name = os.path.splitext(os.path.basename(step["script"]))[0]
+    return os.path.join(CACHE_DIR, step_name, key)
+
+
+def restore_from_cache(step, key, output_dir):
+    # Hard-link a cached artifact into the run folder. Returns its digest on a hit, else None.
+    entry = cache_entry_path(step, key)
+    if not os.path.exists(entry):
+        return None
+    with open(entry) as f:
+        digest = f.read().strip()
+    if not link_from_store(digest, os.path.join(output_dir, step["output"])):
+        return None
+    return digest
+
+
+def store_in_cache(step, key, digest):
+    entry = cache_entry_path(step, key)
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    with open(entry, 'w') as f:
+        f.write(digest)
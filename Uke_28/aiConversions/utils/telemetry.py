@@ -0,0 +1,154 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Steps report what they did as JSON lines appended to one events file per run.
+# main.py points PIPELINE_EVENTS at <run>/events.jsonl (env var for subprocess
+# steps, set_event_path() in-process) and tails it while the pipeline runs.
+EVENTS_ENV = "PIPELINE_EVENTS"
+STEP_ENV = "PIPELINE_STEP"
+
+_event_path = os.environ.get(EVENTS_ENV)
+_write_lock = threading.Lock()
+_current_step = contextvars.ContextVar("pipeline_step", default=os.environ.get(STEP_ENV))
+
+
+def set_event_path(path):
+    global _event_path
+    _event_path = path
+
+
+def set_current_step(step):
+    # Tags events from this thread/context with the step that produced them
+    _current_step.set(step)
+
+
+def emit(event, **fields):
+    """Append one event line. A no-op when no events file is configured."""
+    if not _event_path:
+        return
+    record = {"ts": round(time.time(), 3), "step": _current_step.get(), "event": event}
+    record.update(fields)
+    line = json.dumps(record) + "\n"
+    with _write_lock:
+        with open(_event_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def record_ai_call(response, seconds, model=None):
+    usage = getattr(response, "usage", None)
+    emit("ai_call",
+         model=model or getattr(response, "model", None),
+         prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+         completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+         seconds=round(seconds, 3))
+
+
+def process_peak_rss_mb():
+    """Run-wide memory high-water mark, not a per-step figure.
+
+    The largest resident set any one process of the run has reached so far:
+    this one (in-process steps, which share it) or a finished child process
+    (subprocess steps, shard workers). A step reports the mark as it ends, so
+    it includes every step that ran before or alongside it.
+    """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KiB on Linux
+    return round(peak / divisor, 1)
+
+
+def empty_totals():
+    return {"rows": 0, "ai_calls": 0, "ai_seconds": 0.0, "prompt_tokens": 0,
+            "completion_tokens": 0, "total_tokens": 0, "cache_hits": 0, "ai_cache_hits": 0,
+            "budget_refused": 0}
+
+
+class EventStream:
+    """Tails an events file on a background thread and aggregates per step.
+
+    `on_event(record, totals)` is called for every event as it arrives with
+    the step's running totals, which is how main.py shows progress live.
+    """
+
+    def __init__(self, path, on_event=None, interval=0.2):
+        self.path = path
+        self.on_event = on_event
+        self.interval = interval
+        self.offset = 0
+        self.buffer = ""
+        self.totals = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if os.path.exists(self.path):
+            self.offset = os.path.getsize(self.path)  # resumed run: only new events
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.poll()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        with self.lock:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                f.seek(self.offset)
+                chunk = f.read()
+                self.offset = f.tell()
+            lines = (self.buffer + chunk).split("\n")
+            self.buffer = lines.pop()  # keep a partially written line for next time
+            for line in lines:
+                if line.strip():
+                    self._aggregate(json.loads(line))
+
+    def _aggregate(self, record):
+        totals = self.totals.setdefault(record.get("step"), empty_totals())
+        event = record["event"]
+        if event == "ai_call":
+            totals["ai_calls"] += 1
+            totals["ai_seconds"] = round(totals["ai_seconds"] + record.get("seconds", 0), 3)
+            totals["prompt_tokens"] += record.get("prompt_tokens", 0)
+            totals["completion_tokens"] += record.get("completion_tokens", 0)
+            totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        elif event == "cache_hit":
+            totals["cache_hits"] += 1
+        elif event == "ai_cache_hit":
+            totals["ai_cache_hits"] += 1
+        elif event == "ai_budget_refused":
+            totals["budget_refused"] += 1
+        elif event == "step_finished":
+            for key in ("rows", "seconds", "process_peak_rss_mb"):
+                if key in record:
+                    totals[key] = record[key]
+        if self.on_event:
+            self.on_event(record, dict(totals))
+
+    def total(self, key):
+        # Sum of one counter over every step seen so far
+        self.poll()
+        with self.lock:
+            return sum(totals.get(key, 0) for totals in self.totals.values())
+
+    def totals_for(self, step):
+        self.poll()
+        with self.lock:
+            return dict(self.totals.get(step) or empty_totals())
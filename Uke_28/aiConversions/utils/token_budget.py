@@ -0,0 +1,62 @@
+import threading
+from utils.telemetry import emit
+
+# Upper bound on the tokens one pipeline run may spend on the model
+# (main.py --token-budget, LLM_TOKEN_BUDGET). Every request reserves its
+# estimate (prompt estimate + max_tokens) before it is sent and settles the
+# real usage afterwards, so parallel steps cannot overshoot together. Once a
+# request does not fit, the budget is spent for good: chat() answers from the
+# prompt cache where it can and raises BudgetExhausted otherwise, and the
+# generators fill the remaining AI fields from Faker.
+
+
+class BudgetExhausted(Exception):
+    """The run's token budget cannot cover another AI request."""
+
+
+class TokenBudget:
+    def __init__(self, limit):
+        self.limit = int(limit)
+        self.spent = 0
+        self.reserved = 0
+        self.exhausted = False
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens):
+        """Hold `tokens` for one request; False once the budget cannot cover them."""
+        with self.lock:
+            if not self.exhausted and self.spent + self.reserved + tokens > self.limit:
+                self.exhausted = True
+                emit("ai_budget_exhausted", limit=self.limit, spent=self.spent, reserved=self.reserved)
+            if self.exhausted:
+                return False
+            self.reserved += tokens
+            return True
+
+    def settle(self, reserved, used):
+        # Swap the reservation for what the request actually cost (0 when it failed)
+        with self.lock:
+            self.reserved -= reserved
+            self.spent += used
+
+    def remaining(self):
+        with self.lock:
+            return max(0, self.limit - self.spent - self.reserved)
+
+
+def estimate_requests(calls, prompt_tokens, max_tokens):
+    """Pre-flight figures for `calls` requests of one prompt shape.
+
+    Completion is counted at max_tokens, like the quota does, so the total is an
+    upper estimate; prompt cache hits make the real spend lower.
+    """
+    return {"calls": calls, "prompt_tokens": calls * prompt_tokens, "completion_tokens": calls * max_tokens,
+            "total_tokens": calls * (prompt_tokens + max_tokens)}
+
+
+def add_estimates(*estimates):
+    total = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    for estimate in estimates:
+        for key in total:
+            total[key] += estimate.get(key, 0)
+    return total
@@ -11,20 +11,53 @@ def extract_token_usage(output):
     return 0
 
 
-def update_pipeline_status(step, status, tokens, status_path="pipeline_status.json"):
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return max(1, (len(text) + 3) // 4)
+
+
+def load_pipeline_status(status_path="pipeline_status.json"):
     if os.path.exists(status_path):
         with open(status_path, "r") as f:
-            data = json.load(f)
-    else:
-        data = {"steps": [], "total_tokens": 0}
+            return json.load(f)
+    return {"steps": [], "total_tokens": 0}
+
+
+def update_pipeline_status(step, status, tokens, status_path="pipeline_status.json", **details):
+    data = load_pipeline_status(status_path)
 
-    data["steps"].append({"step": step, "status": status, "tokens": tokens})
-    data["total_tokens"] += tokens
+    entry = {"step": step, "status": status, "tokens": tokens}
+    entry.update(details)
+    # A resumed run replaces the earlier entry for the same step
+    data["steps"] = [s for s in data["steps"] if s["step"] != step] + [entry]
+    data["total_tokens"] = sum(s.get("tokens", 0) for s in data["steps"])
 
     with open(status_path, "w") as f:
         json.dump(data, f, indent=2)
 
 
-def reset_pipeline_status(status_path="pipeline_status.json"):
+def reset_pipeline_status(status_path="pipeline_status.json", keep_steps=None, **run_info):
+    # run_info (run folder, dry run flag, seed, ...) is stored next to the steps so
+    # an interrupted run can be resumed with the same settings
+    steps = keep_steps or []
+    data = {"steps": steps, "total_tokens": sum(s.get("tokens", 0) for s in steps)}
+    data.update(run_info)
     with open(status_path, "w") as f:
-        json.dump({"steps": [], "total_tokens": 0}, f, indent=2)
+        json.dump(data, f, indent=2)
+
+
+def update_token_budget(report, status_path="pipeline_status.json"):
+    # main.py --token-budget: limit, pre-flight estimate and spend per step
+    data = load_pipeline_status(status_path)
+    data["token_budget"] = report
+    with open(status_path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def update_llm_usage(usage, status_path="pipeline_status.json"):
+    # Process-wide counters from utils/llm_client.get_usage() (calls, retries,
+    # failures, latency, prompt/completion tokens) for this session
+    data = load_pipeline_status(status_path)
+    data["llm_usage"] = usage
+    with open(status_path, "w") as f:
+        json.dump(data, f, indent=2)
@@ -0,0 +1,75 @@
+import json
+import math
+import os
+import random
+import threading
+from utils.artifact_store import OUTPUT_ROOT
+
+# AI-generated candidate values per (table, column, type, max_length), built
+# once and kept on disk so later runs sample from them instead of asking the
+# model for every cell. Stored next to the prompt cache, outside the step
+# cache folder that collect_garbage() sweeps.
+POOL_PATH = os.path.join(OUTPUT_ROOT, '.llm_cache', 'value_pools.json')
+DEFAULT_POOL_SIZE = 50
+DEFAULT_DIVERSITY = 1.0
+
+
+def pool_key(table, column, field_type, max_length):
+    return f"{table}.{column}|{field_type.lower()}|{max_length or ''}"
+
+
+class ValuePools:
+    """Persisted value pools with diversity-controlled sampling.
+
+    `diversity` (0-1] is the share of a pool that rows are drawn from: 1.0
+    uses every value, 0.1 only the first tenth, so the same few values repeat.
+    With `refresh` every pool touched in this session is rebuilt once.
+    """
+
+    def __init__(self, path=POOL_PATH, pool_size=DEFAULT_POOL_SIZE, diversity=DEFAULT_DIVERSITY, refresh=False):
+        if not 0 < diversity <= 1:
+            raise ValueError(f"diversity must be in (0, 1], got {diversity}")
+        self.path = path
+        self.pool_size = pool_size
+        self.diversity = diversity
+        self.refresh = refresh
+        self.rebuilt = set()
+        self.lock = threading.Lock()
+        self.pools = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.pools = json.load(f)
+
+    def get(self, table, column, field_type, max_length, build):
+        """Return the pool for a column, calling `build(size)` to create it when needed.
+
+        A pool is (re)built when it is missing, was built for a smaller pool
+        size, or refresh is on. Each key is built at most once per session,
+        also when the build comes back empty.
+        """
+        key = pool_key(table, column, field_type, max_length)
+        with self.lock:
+            entry = self.pools.get(key)
+            needed = entry is None or entry["size"] < self.pool_size or self.refresh
+            if needed and key not in self.rebuilt:
+                self.rebuilt.add(key)
+                values = list(dict.fromkeys(v for v in build(self.pool_size) if v not in (None, '')))
+                if values:
+                    self.pools[key] = entry = {"size": self.pool_size, "values": values}
+                    self.save()
+            return entry["values"] if entry else []
+
+    def sample(self, table, column, field_type, max_length, build):
+        pool = self.get(table, column, field_type, max_length, build)
+        if not pool:
+            return None
+        distinct = max(1, math.ceil(len(pool) * self.diversity))
+        return random.choice(pool[:distinct])
+
+    def save(self):
+        # Written to a temp file and swapped in, so an interrupted run never leaves half a file
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.pools, f, indent=2, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, self.path)